@@ -1,16 +1,201 @@
-from collections.abc import Generator
+import os
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable, Generator
 
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .settings import settings
 
 
+class PoolMetrics:
+    """
+    Running counters for the engine's connection pool.
+
+    Fed by SQLAlchemy pool events (connect/checkout/checkin/invalidate) plus the
+    checkout wait time measured in InstrumentedQueuePool. Gauges (checked out,
+    overflow, ...) are read from the pool itself in snapshot().
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+        # Called with (seconds, timed_out) after every checkout, e.g. by app.metrics
+        self.wait_listeners: list[Callable[[float, bool], None]] = []
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkout_wait_seconds_total += seconds
+            if seconds > self.checkout_wait_seconds_max:
+                self.checkout_wait_seconds_max = seconds
+            if timed_out:
+                self.checkout_timeouts += 1
+        for listener in self.wait_listeners:
+            listener(seconds, timed_out)
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_seconds_total": round(self.checkout_wait_seconds_total, 6),
+                "checkout_wait_seconds_max": round(self.checkout_wait_seconds_max, 6),
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        return stats
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _WaitTimingMixin:
+    """Records how long callers wait for a connection into `metrics`."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def _connect_args() -> dict:
+    """psycopg connection parameters: application_name and server-side statement_timeout."""
+    args: dict = {"application_name": settings.db_application_name}
+    if settings.db_statement_timeout_ms > 0:
+        args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return args
+
+
+def _pool_sizes() -> tuple[int, int]:
+    """
+    (pool_size, max_overflow) per engine. Each worker process has two engines (sync
+    and async), so the backend opens at most
+
+        workers * 2 * (pool_size + max_overflow)
+
+    connections, which must stay below Postgres max_connections (100 by default).
+    Unless DB_POOL_SIZE / DB_MAX_OVERFLOW are set, DB_MAX_CONNECTIONS is split evenly
+    over WEB_CONCURRENCY workers (exported by gunicorn.conf.py; 1 otherwise), half
+    kept open and half as overflow.
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY") or 1))
+    per_engine = max(2, settings.db_max_connections // (workers * 2))
+    pool_size = settings.db_pool_size if settings.db_pool_size is not None else per_engine // 2
+    if settings.db_max_overflow is not None:
+        return pool_size, settings.db_max_overflow
+    return pool_size, max(0, per_engine - pool_size)
+
+
+_pool_size, _max_overflow = _pool_sizes()
+_pool_kwargs = dict(
+    pool_pre_ping=True,
+    pool_size=_pool_size,
+    max_overflow=_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args=_connect_args(),
+)
+
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
+    **_pool_kwargs,
+)
+
+# Async engine (psycopg async) for the public customer endpoints, so they are not
+# capped by the threadpool that runs sync endpoints.
+async_engine = create_async_engine(
+    settings.database_url,
+    poolclass=InstrumentedAsyncQueuePool,
+    **_pool_kwargs,
 )
 
 
+def _register_pool_events(sync_engine, metrics: PoolMetrics) -> None:
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        metrics.incr("connects")
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        metrics.incr("checkouts")
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        metrics.incr("checkins")
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        metrics.incr("invalidations")
+
+
+_register_pool_events(engine, pool_metrics)
+_register_pool_events(async_engine.sync_engine, async_pool_metrics)
+
+
+def get_pool_stats() -> dict:
+    """Current pool gauges and counters for this worker process."""
+    stats = pool_metrics.snapshot(engine.pool)
+    stats["async"] = async_pool_metrics.snapshot(async_engine.pool)
+    stats["pid"] = os.getpid()
+    return stats
+
+
+def reset_pools_after_fork() -> None:
+    """
+    Forget pooled connections inherited from a parent process (gunicorn preload).
+    close=False leaves the parent's sockets alone; this process opens its own.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+async def dispose_engines() -> None:
+    """Close all pooled connections (graceful worker shutdown)."""
+    await async_engine.dispose()
+    engine.dispose()
+
+
 def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
 
@@ -20,10 +205,15 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: attribute access after commit must not trigger implicit IO
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 def check_db_connection() -> None:
     """
     Raises if the DB is not reachable or credentials/DB name are wrong.
     """
     with Session(engine) as session:
         session.exec(select(1)).first()
-
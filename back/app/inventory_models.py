@@ -95,6 +95,7 @@ class TransactionType(str, Enum):
     """Types of inventory movements"""
     purchase = "purchase"          # Goods received from supplier
     sale = "sale"                  # Auto-deducted on order (COGS)
+    sale_reversal = "sale_reversal"  # Sale put back (item cancelled, removed or reduced)
     adjustment_add = "adjustment_add"      # Manual positive adjustment
     adjustment_subtract = "adjustment_subtract"  # Manual negative adjustment
     waste = "waste"                # Spoilage, breakage, theft
@@ -455,6 +456,8 @@ class InventoryTransaction(TenantMixin, table=True):
         foreign_key="order.id",
         index=True
     )
+    # Order item a sale (or its reversal) is for
+    order_item_id: int | None = Field(default=None, index=True)
     purchase_order_id: int | None = Field(
         default=None,
         foreign_key="purchase_order.id",
@@ -475,6 +478,23 @@ class InventoryTransaction(TenantMixin, table=True):
     inventory_item: InventoryItem = Relationship(back_populates="transactions")
 
 
+class InventoryDeduction(TenantMixin, table=True):
+    """
+    How many units of an order item are currently deducted from stock.
+    The inventory worker compares it with the item's quantity to deduct or
+    put back only the difference, so replayed messages change nothing.
+    """
+    __tablename__ = "inventory_deduction"
+    
+    id: int | None = Field(default=None, primary_key=True)
+    order_item_id: int = Field(unique=True)
+    order_id: int = Field(index=True)
+    quantity_deducted: int = Field(default=0)
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+
+
 # ============ REQUEST/RESPONSE SCHEMAS ============
 
 class InventoryItemCreate(SQLModel):
@@ -1033,15 +1033,20 @@ def get_inventory_transactions(
     statement = statement.offset(offset).limit(limit)
     
     transactions = session.exec(statement).all()
+
+    # Item names for the whole page in one query
+    item_ids = {txn.inventory_item_id for txn in transactions}
+    item_names = dict(session.exec(
+        select(InventoryItem.id, InventoryItem.name).where(InventoryItem.id.in_(item_ids))
+    ).all()) if item_ids else {}
     
     result = []
     for txn in transactions:
-        inv_item = session.get(InventoryItem, txn.inventory_item_id)
-        
+
         result.append({
             "id": txn.id,
             "inventory_item_id": txn.inventory_item_id,
-            "inventory_item_name": inv_item.name if inv_item else None,
+            "inventory_item_name": item_names.get(txn.inventory_item_id),
             "transaction_type": txn.transaction_type.value,
             "quantity": float(txn.quantity),
             "unit": txn.unit.value,
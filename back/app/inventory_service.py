@@ -12,11 +12,14 @@ Business logic for inventory management operations including:
 from datetime import datetime, timezone
 from decimal import Decimal
 
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, select
 
 from . import models
 from .inventory_models import (
     InventoryBatch,
+    InventoryDeduction,
     InventoryItem,
     InventoryTransaction,
     ProductRecipe,
@@ -81,6 +84,27 @@ def get_recipe_for_product(
     return list(session.exec(statement).all())
 
 
+def get_recipes_for_products(
+    session: Session,
+    product_ids,
+    tenant_id: int,
+) -> dict[int, list[ProductRecipe]]:
+    """Recipe ingredients for several products in one query: {product_id: ingredients}"""
+    product_ids = set(product_ids)
+    recipes: dict[int, list[ProductRecipe]] = {}
+    if not product_ids:
+        return recipes
+    statement = (
+        select(ProductRecipe)
+        .where(ProductRecipe.product_id.in_(product_ids))
+        .where(ProductRecipe.tenant_id == tenant_id)
+        .order_by(ProductRecipe.id)
+    )
+    for ingredient in session.exec(statement).all():
+        recipes.setdefault(ingredient.product_id, []).append(ingredient)
+    return recipes
+
+
 def convert_to_base_unit(
     quantity: Decimal,
     from_unit: UnitOfMeasure,
@@ -92,46 +116,37 @@ def convert_to_base_unit(
     return convert_units(quantity, from_unit, item.unit)
 
 
-def deduct_from_batches_fifo(
-    session: Session,
+def _consume_batches(
     inventory_item: InventoryItem,
+    batches: list[InventoryBatch],
     quantity_in_base_unit: Decimal,
     transaction_type: TransactionType,
     order_id: int | None = None,
     notes: str | None = None,
     created_by_id: int | None = None,
+    order_item_id: int | None = None,
 ) -> list[InventoryTransaction]:
     """
-    Deduct stock using FIFO from oldest batches.
-    Allows negative stock (creates warning).
-    Returns list of transactions created.
+    FIFO deduction in memory: take from the open batches (oldest first), update the
+    batches and the item's running balance, and return the transactions to record.
+    Allows negative stock once the batches run out. Nothing is added to the session.
     """
     transactions = []
     remaining_to_deduct = quantity_in_base_unit
     
-    # Get batches with remaining quantity, ordered by received_at (oldest first)
-    statement = (
-        select(InventoryBatch)
-        .where(InventoryBatch.inventory_item_id == inventory_item.id)
-        .where(InventoryBatch.quantity_remaining > 0)
-        .order_by(InventoryBatch.received_at.asc())
-    )
-    batches = list(session.exec(statement).all())
-    
     for batch in batches:
         if remaining_to_deduct <= 0:
             break
+        if batch.quantity_remaining <= 0:
+            continue  # emptied by an earlier ingredient line of the same order
         
         # Amount to take from this batch
         take_from_batch = min(batch.quantity_remaining, remaining_to_deduct)
-        
-        # Update batch
         batch.quantity_remaining -= take_from_batch
-        session.add(batch)
         
         # Create transaction for this batch usage
         new_balance = inventory_item.current_quantity - take_from_batch
-        transaction = InventoryTransaction(
+        transactions.append(InventoryTransaction(
             tenant_id=inventory_item.tenant_id,
             inventory_item_id=inventory_item.id,
             batch_id=batch.id,
@@ -142,11 +157,10 @@ def deduct_from_batches_fifo(
             total_cost_cents=int(take_from_batch * batch.cost_per_unit_cents),
             balance_after=new_balance,
             order_id=order_id,
+            order_item_id=order_item_id,
             notes=notes,
             created_by_id=created_by_id,
-        )
-        session.add(transaction)
-        transactions.append(transaction)
+        ))
         
         # Update running balance
         inventory_item.current_quantity = new_balance
@@ -155,7 +169,7 @@ def deduct_from_batches_fifo(
     # If still have remaining to deduct (no more batches), allow negative stock
     if remaining_to_deduct > 0:
         new_balance = inventory_item.current_quantity - remaining_to_deduct
-        transaction = InventoryTransaction(
+        transactions.append(InventoryTransaction(
             tenant_id=inventory_item.tenant_id,
             inventory_item_id=inventory_item.id,
             batch_id=None,  # No batch - negative stock
@@ -166,70 +180,343 @@ def deduct_from_batches_fifo(
             total_cost_cents=int(remaining_to_deduct * inventory_item.average_cost_cents),
             balance_after=new_balance,
             order_id=order_id,
+            order_item_id=order_item_id,
             notes=f"{notes or ''} [NEGATIVE STOCK]".strip(),
             created_by_id=created_by_id,
-        )
-        session.add(transaction)
-        transactions.append(transaction)
+        ))
         inventory_item.current_quantity = new_balance
     
-    session.add(inventory_item)
     return transactions
 
 
-def deduct_inventory_for_order(
+def _open_batches_statement(inventory_item_ids):
+    """Batches with stock left, oldest first per item"""
+    return (
+        select(InventoryBatch)
+        .where(InventoryBatch.inventory_item_id.in_(inventory_item_ids))
+        .where(InventoryBatch.quantity_remaining > 0)
+        .order_by(InventoryBatch.inventory_item_id, InventoryBatch.received_at.asc(), InventoryBatch.id)
+    )
+
+
+def deduct_from_batches_fifo(
     session: Session,
-    order: models.Order,
-    tenant: models.Tenant,
+    inventory_item: InventoryItem,
+    quantity_in_base_unit: Decimal,
+    transaction_type: TransactionType,
+    order_id: int | None = None,
+    notes: str | None = None,
     created_by_id: int | None = None,
 ) -> list[InventoryTransaction]:
     """
-    Deduct inventory for all items in an order based on their recipes.
-    Uses FIFO method. Allows negative stock with warning logging.
-    Called within order creation transaction.
+    Deduct stock using FIFO from oldest batches.
+    Allows negative stock (creates warning).
+    Returns list of transactions created.
     """
-    all_transactions = []
-    
-    for order_item in order.items:
-        # Get recipe for this product
-        recipe_items = get_recipe_for_product(
-            session, order_item.product_id, tenant.id
+    batches = list(session.exec(_open_batches_statement([inventory_item.id])).all())
+    transactions = _consume_batches(
+        inventory_item, batches, quantity_in_base_unit, transaction_type,
+        order_id=order_id, notes=notes, created_by_id=created_by_id,
+    )
+    session.add_all(batches)
+    session.add_all(transactions)
+    session.add(inventory_item)
+    return transactions
+
+
+def _insert_transactions(session: Session, transactions: list[InventoryTransaction]) -> None:
+    """Write ledger rows with a single multi-row INSERT (no ids are read back)"""
+    if transactions:
+        session.execute(
+            insert(InventoryTransaction.__table__),
+            [t.model_dump(exclude={"id"}) for t in transactions],
         )
-        
-        for ingredient in recipe_items:
-            # Load the inventory item
-            inv_item = session.get(InventoryItem, ingredient.inventory_item_id)
+
+
+def _lock_inventory_items(session: Session, inventory_item_ids) -> dict[int, InventoryItem]:
+    """
+    Load and lock inventory items (SELECT ... FOR UPDATE) in id order, so concurrent
+    deductions cannot deadlock. Batches are only changed by whoever holds their
+    item's lock, so they need no lock of their own.
+    """
+    return {
+        item.id: item
+        for item in session.exec(
+            select(InventoryItem)
+            .where(InventoryItem.id.in_(sorted(inventory_item_ids)))
+            .order_by(InventoryItem.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).all()
+    }
+
+
+def _plan_deductions(
+    lines: list[tuple[models.OrderItem, int]],
+    recipes: dict[int, list[ProductRecipe]],
+    inventory_items: dict[int, InventoryItem],
+    batches_by_item: dict[int, list[InventoryBatch]],
+    created_by_id: int | None = None,
+) -> list[InventoryTransaction]:
+    """FIFO deductions for (order item, units) lines, applied in memory"""
+    transactions = []
+    for order_item, units in lines:
+        for ingredient in recipes.get(order_item.product_id, []):
+            inv_item = inventory_items.get(ingredient.inventory_item_id)
             if not inv_item or inv_item.is_deleted:
                 continue
             
             # Calculate quantity needed (with waste factor)
             quantity_per_product = ingredient.quantity_required
             waste_multiplier = 1 + (ingredient.waste_percentage / 100)
-            quantity_needed = quantity_per_product * order_item.quantity * waste_multiplier
+            quantity_needed = quantity_per_product * units * waste_multiplier
             
             # Convert to item's base unit if needed
             quantity_in_base = convert_to_base_unit(
                 quantity_needed, ingredient.unit, inv_item
             )
             
-            # Check for low stock (warning, not blocking)
-            if inv_item.current_quantity < quantity_in_base:
-                # Log warning but continue
-                pass  # Could add logging here
-            
-            # Deduct using FIFO
-            transactions = deduct_from_batches_fifo(
-                session=session,
-                inventory_item=inv_item,
-                quantity_in_base_unit=quantity_in_base,
-                transaction_type=TransactionType.sale,
-                order_id=order.id,
-                notes=f"Order #{order.id} - {order_item.product_name}",
+            # Low stock is allowed (goes negative); see get_low_stock_items
+            transactions.extend(_consume_batches(
+                inv_item,
+                batches_by_item.get(inv_item.id, []),
+                quantity_in_base,
+                TransactionType.sale,
+                order_id=order_item.order_id,
+                notes=f"Order #{order_item.order_id} - {order_item.product_name}",
                 created_by_id=created_by_id,
+                order_item_id=order_item.id,
+            ))
+    return transactions
+
+
+def deduct_inventory_for_order(
+    session: Session,
+    order: models.Order,
+    tenant: models.Tenant,
+    created_by_id: int | None = None,
+) -> list[InventoryTransaction]:
+    """
+    Deduct inventory for all items in an order based on their recipes.
+    Uses FIFO method. Allows negative stock with warning logging.
+
+    A fixed number of statements whatever the order size: the recipes of all the
+    order's products, the affected inventory items (locked, see
+    _lock_inventory_items), their open batches, then the batch and stock updates
+    and one INSERT for all ledger rows. The returned transactions are not added to
+    the session and have no ids.
+
+    Orders placed through the API are deducted by the inventory worker instead
+    (sync_inventory_for_items), which also puts stock back for cancelled items.
+    """
+    lines = [(item, item.quantity) for item in order.items]
+    recipes = get_recipes_for_products(session, (item.product_id for item, _ in lines), tenant.id)
+    inventory_item_ids = {
+        ingredient.inventory_item_id
+        for ingredients in recipes.values()
+        for ingredient in ingredients
+    }
+    if not inventory_item_ids:
+        return []
+    
+    inventory_items = _lock_inventory_items(session, inventory_item_ids)
+    batches_by_item: dict[int, list[InventoryBatch]] = {}
+    for batch in session.exec(_open_batches_statement(inventory_item_ids)).all():
+        batches_by_item.setdefault(batch.inventory_item_id, []).append(batch)
+    
+    transactions = _plan_deductions(lines, recipes, inventory_items, batches_by_item, created_by_id)
+    # Batches and items were loaded into the session: their changes flush as UPDATEs
+    session.flush()
+    _insert_transactions(session, transactions)
+    return transactions
+
+
+def order_item_units(item: models.OrderItem, order_status: models.OrderStatus | None = None) -> int:
+    """Units of an order item that should be deducted from stock: none once it or its order is cancelled"""
+    if (
+        order_status == models.OrderStatus.cancelled
+        or item.removed_by_customer
+        or item.removed_by_user_id is not None
+        or item.status == models.OrderItemStatus.cancelled
+    ):
+        return 0
+    return item.quantity
+
+
+def _plan_reversals(
+    reversals: dict[int, tuple[models.OrderItem, Decimal]],
+    ledger: list[InventoryTransaction],
+    inventory_items: dict[int, InventoryItem],
+    batches_by_id: dict[int, InventoryBatch],
+) -> list[InventoryTransaction]:
+    """
+    Put back a share of what was deducted for order items ({order_item_id: (item, share)}):
+    the same share of every batch and cost it was taken from, so COGS and batch
+    levels return to what they were.
+    """
+    # Net units still deducted per (order item, inventory item, batch, unit cost)
+    net: dict[tuple, Decimal] = {}
+    order_ids = {}
+    for t in ledger:
+        key = (t.order_item_id, t.inventory_item_id, t.batch_id, t.unit_cost_cents)
+        net[key] = net.get(key, Decimal("0")) - t.quantity
+        order_ids[t.order_item_id] = t.order_id
+    
+    transactions = []
+    for (order_item_id, inventory_item_id, batch_id, unit_cost), deducted in sorted(
+        net.items(), key=lambda entry: (entry[0][0], entry[0][1], entry[0][2] or 0)
+    ):
+        item, share = reversals[order_item_id]
+        inv_item = inventory_items.get(inventory_item_id)
+        quantity = (deducted * share).quantize(Decimal("0.0001"))
+        if inv_item is None or quantity <= 0:
+            continue
+        batch = batches_by_id.get(batch_id) if batch_id is not None else None
+        if batch is not None:
+            batch.quantity_remaining += quantity
+        inv_item.current_quantity += quantity
+        order_id = order_ids[order_item_id]
+        transactions.append(InventoryTransaction(
+            tenant_id=inv_item.tenant_id,
+            inventory_item_id=inv_item.id,
+            batch_id=batch.id if batch is not None else None,
+            transaction_type=TransactionType.sale_reversal,
+            quantity=quantity,  # Positive: back in stock
+            unit=inv_item.unit,
+            unit_cost_cents=unit_cost,
+            total_cost_cents=int(quantity * (unit_cost or 0)),
+            balance_after=inv_item.current_quantity,
+            order_id=order_id,
+            order_item_id=order_item_id,
+            notes=f"Order #{order_id} - {item.product_name} [REVERSED]",
+        ))
+    return transactions
+
+
+def _claim_deductions(
+    session: Session, order_item_ids: list[int], new: list[tuple[models.OrderItem, int]]
+) -> dict[int, InventoryDeduction]:
+    """
+    Deduction rows of order items, locked in order item id order. Rows are created for
+    `new` ((order item, tenant id) about to be deducted) when missing, so two workers
+    syncing the same item wait for each other instead of both deducting it.
+    """
+    if new:
+        table = InventoryDeduction.__table__
+        dialect = session.get_bind().dialect.name
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        now = datetime.now(timezone.utc)
+        session.execute(
+            insert_(table).on_conflict_do_nothing(index_elements=[table.c.order_item_id]),
+            [
+                {"tenant_id": tenant_id, "order_item_id": item.id, "order_id": item.order_id,
+                 "quantity_deducted": 0, "updated_at": now}
+                for item, tenant_id in new
+            ],
+        )
+    return {
+        row.order_item_id: row
+        for row in session.exec(
+            select(InventoryDeduction)
+            .where(InventoryDeduction.order_item_id.in_(order_item_ids))
+            .order_by(InventoryDeduction.order_item_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).all()
+    }
+
+
+def sync_inventory_for_items(session: Session, order_item_ids) -> int:
+    """
+    Bring stock in line with the current state of order items: deduct units added
+    since the last sync, put back units that were cancelled, removed or reduced.
+
+    Idempotent: inventory_deduction records how many units of each item are deducted,
+    and only the difference to order_item_units() is applied, so running it twice, or
+    for items that did not change, does nothing. New deductions need the tenant's
+    inventory tracking; reversals always run. The caller commits.
+
+    Returns the number of order items whose deduction changed.
+    """
+    order_item_ids = sorted(set(order_item_ids))
+    if not order_item_ids:
+        return 0
+    rows = session.exec(
+        select(models.OrderItem, models.Order.status, models.Tenant)
+        .join(models.Order, models.Order.id == models.OrderItem.order_id)
+        .join(models.Tenant, models.Tenant.id == models.Order.tenant_id)
+        .where(models.OrderItem.id.in_(order_item_ids))
+    ).all()
+    if not rows:
+        return 0
+    items = {item.id: item for item, _, _ in rows}
+    target = {item.id: order_item_units(item, order_status) for item, order_status, _ in rows}
+    tracking = {tenant.id: bool(getattr(tenant, "inventory_tracking_enabled", False)) for _, _, tenant in rows}
+    # Items never deducted and not to be deducted now have no row and nothing to do
+    deductions = _claim_deductions(session, list(items), [
+        (item, tenant.id) for item, _, tenant in rows if target[item.id] > 0 and tracking[tenant.id]
+    ])
+    
+    lines: dict[int, list[tuple[models.OrderItem, int]]] = {}  # per tenant
+    reversals: dict[int, tuple[models.OrderItem, Decimal]] = {}
+    now = datetime.now(timezone.utc)
+    for order_item_id, deduction in deductions.items():
+        item = items[order_item_id]
+        target_units = target[order_item_id]
+        if target_units > deduction.quantity_deducted and tracking.get(deduction.tenant_id):
+            lines.setdefault(deduction.tenant_id, []).append((item, target_units - deduction.quantity_deducted))
+        elif target_units < deduction.quantity_deducted:
+            reversals[order_item_id] = (
+                item, Decimal(deduction.quantity_deducted - target_units) / Decimal(deduction.quantity_deducted)
             )
-            all_transactions.extend(transactions)
+        else:
+            continue
+        deduction.quantity_deducted = target_units
+        deduction.updated_at = now
+    if not lines and not reversals:
+        return 0
+    
+    recipes: dict[int, dict[int, list[ProductRecipe]]] = {
+        tenant_id: get_recipes_for_products(session, (item.product_id for item, _ in tenant_lines), tenant_id)
+        for tenant_id, tenant_lines in lines.items()
+    }
+    ledger = list(session.exec(
+        select(InventoryTransaction)
+        .where(InventoryTransaction.order_item_id.in_(list(reversals)))
+        .where(InventoryTransaction.transaction_type.in_([TransactionType.sale, TransactionType.sale_reversal]))
+    ).all()) if reversals else []
+    deduct_item_ids = {
+        ingredient.inventory_item_id
+        for tenant_recipes in recipes.values()
+        for ingredients in tenant_recipes.values()
+        for ingredient in ingredients
+    }
+    inventory_items = _lock_inventory_items(session, deduct_item_ids | {t.inventory_item_id for t in ledger})
     
-    return all_transactions
+    # Open batches of the items to deduct, and every batch a reversal returns stock to
+    reversal_batch_ids = {t.batch_id for t in ledger if t.batch_id is not None}
+    batches_by_item: dict[int, list[InventoryBatch]] = {}
+    batches_by_id: dict[int, InventoryBatch] = {}
+    if deduct_item_ids or reversal_batch_ids:
+        for batch in session.exec(
+            select(InventoryBatch)
+            .where(or_(
+                InventoryBatch.id.in_(reversal_batch_ids),
+                and_(InventoryBatch.inventory_item_id.in_(deduct_item_ids), InventoryBatch.quantity_remaining > 0),
+            ))
+            .order_by(InventoryBatch.inventory_item_id, InventoryBatch.received_at.asc(), InventoryBatch.id)
+        ).all():
+            batches_by_id[batch.id] = batch
+            if batch.inventory_item_id in deduct_item_ids and batch.quantity_remaining > 0:
+                batches_by_item.setdefault(batch.inventory_item_id, []).append(batch)
+    
+    transactions = []
+    for tenant_id, tenant_lines in lines.items():
+        transactions += _plan_deductions(tenant_lines, recipes[tenant_id], inventory_items, batches_by_item)
+    transactions += _plan_reversals(reversals, ledger, inventory_items, batches_by_id)
+    session.flush()
+    _insert_transactions(session, transactions)
+    return len({*(item.id for tenant_lines in lines.values() for item, _ in tenant_lines), *reversals})
 
 
 def receive_goods(
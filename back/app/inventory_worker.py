@@ -0,0 +1,143 @@
+"""
+Inventory worker: stock deduction for orders, off the request path.
+
+Endpoints that add, change, cancel or remove order items append the item ids to
+the Redis stream inventory:order_items (queue_inventory_sync in main.py). This
+process reads the stream in a consumer group and, per batch of messages, runs
+inventory_service.sync_inventory_for_items in one transaction, so the time a
+customer waits for their order does not depend on how many recipes and batches
+it touches.
+
+Delivery is at least once: messages are acknowledged after the transaction
+commits, and messages left pending by a worker that died are claimed by another
+after CLAIM_IDLE_MS. Replays are harmless because the sync is idempotent: it
+applies the difference between what each item should have deducted and what
+inventory_deduction records. A message that failed MAX_DELIVERIES times is moved
+to inventory:order_items:dead and logged; re-adding it to the stream retries it.
+
+Run with `python -m app.inventory_worker` (the inventory-worker service in
+docker-compose.yml); several workers share the stream. Without Redis the API
+syncs inline after its own commit instead.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable
+
+from sqlmodel import Session
+
+from .inventory_service import sync_inventory_for_items
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM = "inventory:order_items"
+DEAD_STREAM = "inventory:order_items:dead"
+GROUP = "inventory"
+# Approximate trim (XADD MAXLEN ~): far more than any backlog the workers fall behind by
+STREAM_MAXLEN = 100_000
+BLOCK_MS = 5000
+CLAIM_IDLE_MS = 60_000
+MAX_DELIVERIES = 5
+
+
+def message(order_item_ids) -> dict[str, str]:
+    """Stream fields for a sync of these order items."""
+    return {"items": ",".join(str(item_id) for item_id in sorted(set(order_item_ids)))}
+
+
+def item_ids(fields: dict) -> list[int]:
+    raw = fields.get(b"items", fields.get("items", b""))
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    return [int(value) for value in raw.split(",") if value]
+
+
+def process(r, session_factory: Callable[[], Session], entries: list) -> int:
+    """
+    Sync the order items of stream entries [(id, fields)] in one transaction and
+    acknowledge them. If the batch fails, each entry is retried on its own so one
+    bad message does not hold back the rest; failed entries stay pending.
+    Returns the number of entries acknowledged.
+    """
+    if not entries:
+        return 0
+    try:
+        with session_factory() as session:
+            sync_inventory_for_items(session, [i for _, fields in entries for i in item_ids(fields)])
+            session.commit()
+    except Exception:
+        if len(entries) == 1:
+            logger.warning("Inventory sync failed for message %s", entries[0][0], exc_info=True)
+            return 0
+        return sum(process(r, session_factory, [entry]) for entry in entries)
+    r.xack(STREAM, GROUP, *[entry_id for entry_id, _ in entries])
+    return len(entries)
+
+
+def reclaim(r, session_factory: Callable[[], Session], consumer: str) -> int:
+    """Retry messages other workers left pending; dead-letter those retried too often."""
+    pending = r.xpending_range(STREAM, GROUP, min="-", max="+", count=settings.inventory_worker_batch_size,
+                               idle=CLAIM_IDLE_MS)
+    dead = [entry["message_id"] for entry in pending if entry["times_delivered"] >= MAX_DELIVERIES]
+    for entry_id in dead:
+        for _, fields in r.xrange(STREAM, min=entry_id, max=entry_id):
+            r.xadd(DEAD_STREAM, fields, maxlen=STREAM_MAXLEN, approximate=True)
+            # Raw fields: the message may be dead because they do not parse
+            logger.error("Inventory sync gave up on message %s (items %r)", entry_id,
+                         fields.get(b"items", fields.get("items")))
+        r.xack(STREAM, GROUP, entry_id)
+    _, entries, *_ = r.xautoclaim(STREAM, GROUP, consumer, CLAIM_IDLE_MS, start_id="0-0",
+                                  count=settings.inventory_worker_batch_size)
+    return process(r, session_factory, entries)
+
+
+def ensure_group(r) -> None:
+    from redis.exceptions import ResponseError
+
+    try:
+        r.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def run(r, session_factory: Callable[[], Session], consumer: str, stop: Callable[[], bool] = lambda: False) -> None:
+    """Consume the stream until stop() returns true (checked at least every BLOCK_MS)."""
+    ensure_group(r)
+    last_reclaim = 0.0
+    while not stop():
+        if time.monotonic() - last_reclaim >= CLAIM_IDLE_MS / 1000:
+            reclaim(r, session_factory, consumer)
+            last_reclaim = time.monotonic()
+        response = r.xreadgroup(GROUP, consumer, {STREAM: ">"}, count=settings.inventory_worker_batch_size,
+                                block=BLOCK_MS)
+        for _, entries in response or []:
+            process(r, session_factory, entries)
+
+
+def main() -> None:
+    import redis
+
+    from .db import engine
+    from .logging_config import configure_logging
+
+    configure_logging()
+    stopping = False
+
+    def request_stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    logger.info("Inventory worker %s consuming %s", consumer, STREAM)
+    run(r, lambda: Session(engine), consumer, stop=lambda: stopping)
+
+
+if __name__ == "__main__":
+    main()
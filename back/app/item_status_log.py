@@ -0,0 +1,92 @@
+"""
+Append-only log of order item status transitions.
+
+OrderItem keeps only its latest status and status_updated_at. Every change is also
+recorded in order_item_status_transition, which the prep-time report reads
+(GET /reports/prep-times): pending -> preparing -> ready -> delivered, resets and
+cancellations, each with its time.
+
+Like the sales rollup, this is a session hook rather than code in each endpoint: after
+a flush, every item that was created or whose status changed gets one row, written
+with a single INSERT on the flush's connection. The item-status, order-status, reset
+and cancel endpoints, the customer's own removals and anything added later are covered
+alike. Rows are never updated or deleted.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session as OrmSession
+
+from . import models
+
+# Staff member an item records for the status it just reached
+_USER_FIELDS = {
+    models.OrderItemStatus.ready: ("prepared_by_user_id",),
+    models.OrderItemStatus.delivered: ("delivered_by_user_id",),
+    models.OrderItemStatus.cancelled: ("removed_by_user_id", "modified_by_user_id"),
+}
+
+
+def _user_id(item: models.OrderItem) -> int | None:
+    for field in _USER_FIELDS.get(item.status, ()):
+        if getattr(item, field, None) is not None:
+            return getattr(item, field)
+    return None
+
+
+def _load_previous_status(item, value, oldvalue, initiator) -> None:
+    pass
+
+
+# active_history: setting the status of an expired item (e.g. after a commit) loads the
+# old value first, so the change has a from_status. A NULL from_status marks creation.
+event.listen(models.OrderItem.status, "set", _load_previous_status, active_history=True)
+
+
+def _transition(item: models.OrderItem, created: bool):
+    """(from_status, to_status) when the flush creates the item or changes its status, else None."""
+    if created:
+        return None, item.status
+    history = inspect(item).attrs.status.history
+    if not history.added or not history.deleted or history.added[0] in history.deleted:
+        return None
+    return history.deleted[0], history.added[0]
+
+
+def _log_transitions(session: OrmSession, flush_context) -> None:
+    # After the flush: new items have ids, and new/dirty and attribute history still
+    # describe what was flushed. Identity sets, as SQLModel instances are not hashable.
+    changes = [
+        (obj, _transition(obj, created=obj in session.new))
+        for obj in (*session.new, *session.dirty)
+        if isinstance(obj, models.OrderItem)
+    ]
+    changes = [(item, change) for item, change in changes if change is not None and item.id is not None]
+    if not changes:
+        return
+    now = datetime.now(timezone.utc)
+    tenants = {}
+    rows = []
+    with session.no_autoflush:
+        for item, (from_status, to_status) in changes:
+            if item.order_id not in tenants:
+                # Usually in the identity map: the endpoint loaded or created the order
+                order = session.get(models.Order, item.order_id)
+                tenants[item.order_id] = order.tenant_id if order is not None else None
+            if tenants[item.order_id] is None:
+                continue
+            rows.append({
+                "tenant_id": tenants[item.order_id],
+                "order_id": item.order_id,
+                "item_id": item.id,
+                "from_status": from_status,
+                "to_status": to_status,
+                "changed_at": now,
+                "user_id": _user_id(item),
+            })
+    if rows:
+        session.connection().execute(insert(models.OrderItemStatusTransition.__table__), rows)
+
+
+# Registered on the Session class, like the hooks in sales_rollup.py
+event.listen(OrmSession, "after_flush", _log_transitions)
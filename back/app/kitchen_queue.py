@@ -0,0 +1,136 @@
+"""
+Prep queue for the kitchen display: open items grouped across orders.
+
+Instead of one card per order ("3 + 2 + 4 Margheritas" spread over nine cards),
+GET /kitchen/queue lists each product once per distinct note, with how many are
+waiting and how many are being prepared, over how many orders, and since when.
+
+The groups come from one grouped query over the tenant's pending and preparing
+items of open orders (the same items the ready-time estimates queue). The time an
+item was ordered is its creation row in the item status log, falling back to the
+order's creation for items logged before the log existed.
+
+Displays are kept current with deltas: after a change to the kitchen queue the
+groups are recomputed and compared with the last published snapshot, kept in Redis
+under kitchen_queue:<tenant_id> (one hash field per group). Only groups that
+changed or disappeared are sent, as absolute values, so a missed or reordered
+event is corrected by the next one for that group.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import select
+
+from . import models
+from .prep_eta import OPEN_ORDER_EXCLUDED, QUEUED, aware
+from .stations import station_expr, station_for
+
+# Snapshots of tenants whose queue has not changed for a day are dropped
+SNAPSHOT_TTL_SECONDS = 24 * 3600
+
+
+def group_key(product_id: int, notes: str) -> str:
+    return f"{product_id}:{notes}"
+
+
+def queue_groups(session: OrmSession, tenant_id: int, station: str | None = None) -> list[dict]:
+    """Open items per (product, notes), oldest group first; one query."""
+    item = models.OrderItem
+    log = models.OrderItemStatusTransition
+    # One value per item (not a join, which would count an item once per matching row)
+    created_at = (
+        select(func.min(log.changed_at))
+        .where(log.item_id == item.id, log.from_status.is_(None))
+        .correlate(item)
+        .scalar_subquery()
+    )
+    ordered_at = func.min(func.coalesce(created_at, models.Order.created_at))
+    preparing = func.sum(case((item.status == models.OrderItemStatus.preparing, item.quantity), else_=0))
+    statement = (
+        select(
+            item.product_id,
+            func.max(item.product_name).label("product_name"),
+            item.notes,
+            models.Product.category,
+            func.sum(item.quantity).label("quantity"),
+            preparing.label("preparing"),
+            func.count(func.distinct(item.order_id)).label("orders"),
+            ordered_at.label("oldest_at"),
+        )
+        .join(models.Order, models.Order.id == item.order_id)
+        .outerjoin(models.Product, models.Product.id == item.product_id)
+        .where(models.Order.tenant_id == tenant_id)
+        .where(models.Order.status.not_in(OPEN_ORDER_EXCLUDED))
+        .where(item.status.in_(QUEUED))
+        .where(item.removed_by_customer == False)
+        .group_by(item.product_id, item.notes, models.Product.category)
+    )
+    if station is not None:
+        statement = statement.where(station_expr() == station)
+
+    # NULL, empty and whitespace-only notes are one group
+    groups: dict[str, dict] = {}
+    for row in session.execute(statement).all():
+        notes = (row.notes or "").strip()
+        key = group_key(row.product_id, notes)
+        preparing_count = int(row.preparing or 0)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {
+                "key": key,
+                "product_id": row.product_id,
+                "product_name": row.product_name,
+                "notes": notes or None,
+                "station": station_for(row.category),
+                "quantity": int(row.quantity),
+                "pending": int(row.quantity) - preparing_count,
+                "preparing": preparing_count,
+                "orders": row.orders,
+                "oldest_at": aware(row.oldest_at),
+            }
+        else:
+            # Orders are counted per raw notes value; an order rarely repeats a product
+            # with notes that differ only in whitespace
+            group["quantity"] += int(row.quantity)
+            group["pending"] += int(row.quantity) - preparing_count
+            group["preparing"] += preparing_count
+            group["orders"] += row.orders
+            group["oldest_at"] = min(group["oldest_at"], aware(row.oldest_at))
+    return sorted(groups.values(), key=lambda g: (g["oldest_at"], g["product_name"], g["key"]))
+
+
+def public(group: dict, now: datetime) -> dict:
+    """A group as returned by the API and sent in deltas."""
+    return {
+        **group,
+        "oldest_at": group["oldest_at"].isoformat(),
+        "oldest_age_seconds": max(0, int((now - group["oldest_at"]).total_seconds())),
+    }
+
+
+def snapshot_key(tenant_id: int) -> str:
+    return f"kitchen_queue:{tenant_id}"
+
+
+def delta(previous: dict, groups: list[dict], now: datetime) -> tuple[list[dict], list[str], dict[str, str]]:
+    """
+    Compare the current groups with a published snapshot ({key: serialized group}).
+
+    Returns (changed groups, removed keys, new snapshot fields). Ages are left out of
+    the comparison: displays compute them from oldest_at.
+    """
+    previous = {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in previous.items()
+    }
+    changed = []
+    snapshot = {}
+    for group in groups:
+        serialized = json.dumps({**group, "oldest_at": group["oldest_at"].isoformat()}, sort_keys=True)
+        snapshot[group["key"]] = serialized
+        if previous.get(group["key"]) != serialized:
+            changed.append(public(group, now))
+    removed = sorted(set(previous) - set(snapshot))
+    return changed, removed, snapshot
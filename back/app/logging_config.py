@@ -0,0 +1,106 @@
+"""
+Process-wide logging setup for the API backend.
+
+Records are handed to a QueueHandler on the calling thread and written to stdout by
+a QueueListener thread, so request handlers never block on log I/O. Output is one
+JSON object per line (LOG_FORMAT=json, the default in production) or the classic
+text format (LOG_FORMAT=text, the default in development).
+
+Levels: LOG_LEVEL sets the root level; LOG_LEVELS overrides single loggers, e.g.
+LOG_LEVELS="app.main=DEBUG,sqlalchemy.engine=INFO". Call sites should use lazy
+%-formatting (logger.debug("order %s", order_id)) so gated-out records cost
+only a level check.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+from .settings import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that are not user-supplied `extra=` fields (color_message: uvicorn)
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "color_message",
+}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, message, plus `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """"app.main=DEBUG, sqlalchemy.engine=INFO" -> {"app.main": "DEBUG", ...}."""
+    levels = {}
+    for part in spec.split(","):
+        name, sep, level = part.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Install the queue handler on the root logger and (re)start the writer thread.
+
+    Safe to call again, e.g. in a forked worker whose inherited listener thread
+    no longer exists.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    log_format = (settings.log_format or ("json" if settings.is_production else "text")).lower()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings.log_level.upper())
+
+    if log_format == "json":
+        # Route uvicorn's own loggers through the root handler so every line is JSON
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers.clear()
+            uvicorn_logger.propagate = True
+
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,44 +1,67 @@
+import asyncio
+import hmac
 import json
 import logging
 import os
+from time import perf_counter
 from datetime import date, timedelta, datetime, time, timezone
 from zoneinfo import ZoneInfo
 from io import BytesIO
 from pathlib import Path
-from typing import Annotated, Dict
+from typing import TYPE_CHECKING, Annotated, Dict
 from uuid import uuid4
 
-from PIL import Image
-import redis
-import stripe
-from fastapi import Depends, FastAPI, HTTPException, UploadFile, File, status, Query, Request
+_import_started = perf_counter()  # worker startup timing (see on_startup)
+
+from fastapi import Depends, FastAPI, Header, HTTPException, UploadFile, File, status, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel as _BaseModel
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from . import models, security
-from .db import check_db_connection, create_db_and_tables, get_session
+from .db import (
+    check_db_connection,
+    dispose_engines,
+    get_async_session,
+    get_pool_stats,
+    get_session,
+    reset_pools_after_fork,
+)
 from .settings import settings
+from .logging_config import configure_logging
+from .query_stats import QueryStatsMiddleware
+from . import inventory_worker, kitchen_queue, metrics, prep_eta, report_jobs, tracing
+from . import item_status_log  # noqa: F401 - registers the item status log session hook
 from .inventory_routes import router as inventory_router
 from .reports_routes import router as reports_router
-from .inventory_service import deduct_inventory_for_order
+from .stations import STATIONS
+from .inventory_service import sync_inventory_for_items
 from . import inventory_models
 from .translation_service import TranslationService
 from .messages import get_message
 from .permissions import Permission, require_permission, require_role, has_permission
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+if TYPE_CHECKING:
+    # Heavy libraries (Pillow, stripe, redis) are imported on first use, not at
+    # worker start; see optimize_image, _get_stripe, get_redis/get_async_redis.
+    import redis
+    import redis.asyncio as aioredis
+
+# Configure logging (JSON/text to stdout via a background writer; see app/logging_config.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Configure Stripe (global fallback - will be overridden by tenant-specific keys)
-# Note: stripe.api_key is set globally but individual API calls use api_key parameter
-stripe.api_key = settings.stripe_secret_key or ""
+def _get_stripe():
+    """Import stripe on first payment call (keeps it out of worker startup)."""
+    import stripe
+
+    # Global fallback - individual API calls pass the tenant's key via api_key
+    stripe.api_key = settings.stripe_secret_key or ""
+    return stripe
 
 
 def _get_stripe_currency_code(currency_symbol: str | None) -> str | None:
@@ -95,7 +118,7 @@ def _get_stripe_currency_code(currency_symbol: str | None) -> str | None:
     return None
 
 
-def _get_requested_language(
+async def _get_requested_language(
     lang: str | None = Query(None, description="Language code (e.g. en, es, zh-CN)"),
     accept_language: str | None = Query(
         None, alias="accept-language", description="Accept-Language header"
@@ -156,6 +179,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Query count / DB time per request (Server-Timing) and dev N+1 warnings
+app.add_middleware(QueryStatsMiddleware)
+# OpenTelemetry server spans (no-op unless TRACING_EXPORTER is set; see app/tracing.py)
+app.add_middleware(tracing.TracingMiddleware)
+# Prometheus request metrics (added last, so outermost: latency covers the other middleware)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.PrometheusMiddleware)
 
 # Uploads directory for product images
 UPLOADS_DIR = Path(__file__).parent.parent / "uploads"
@@ -216,7 +246,12 @@ def optimize_image(image_data: bytes, content_type: str) -> bytes:
     - Compresses JPEG/WebP with quality settings
     - Optimizes PNG files
     Returns optimized image data.
+
+    CPU-bound: call it only from sync (`def`) endpoints, which FastAPI runs in
+    its threadpool, never directly from an `async def` handler.
     """
+    from PIL import Image
+
     try:
         # Open image from bytes
         image = Image.open(BytesIO(image_data))
@@ -301,21 +336,52 @@ async def favicon():
 
 
 # Redis client for pub/sub
-redis_client: redis.Redis | None = None
+redis_client: "redis.Redis | None" = None
 
 
-def get_redis() -> redis.Redis | None:
+def get_redis() -> "redis.Redis | None":
     global redis_client
     if redis_client is None:
+        import redis
+
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         try:
-            redis_client = redis.from_url(redis_url)
+            redis_client = tracing.instrument_redis(metrics.instrument_redis(redis.from_url(redis_url)))
             redis_client.ping()
         except Exception:
             redis_client = None
     return redis_client
 
 
+# Async Redis client for async endpoints, so Redis round-trips do not block the event loop
+async_redis_client: "aioredis.Redis | None" = None
+
+
+async def get_async_redis() -> "aioredis.Redis | None":
+    global async_redis_client
+    if async_redis_client is None:
+        import redis.asyncio as aioredis
+
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        try:
+            client = tracing.instrument_redis(metrics.instrument_redis(aioredis.from_url(redis_url)))
+            await client.ping()
+            async_redis_client = client
+        except Exception:
+            async_redis_client = None
+    return async_redis_client
+
+
+def reset_worker_state() -> None:
+    """Drop DB connections and Redis clients inherited from a parent process (gunicorn post_fork)."""
+    global redis_client, async_redis_client
+    redis_client = None
+    async_redis_client = None
+    reset_pools_after_fork()
+    # The parent's log writer thread does not exist in the child
+    configure_logging()
+
+
 PIN_MAX_ATTEMPTS = 5
 PIN_ATTEMPT_WINDOW_SECONDS = 600
 PIN_LOCKOUT_SECONDS = 600
@@ -327,6 +393,14 @@ def get_pin_client_key(request: Request, session_id: str | None) -> str:
         return f"{ip}:{session_id}"
     return ip
 
+def _order_update_channels(tenant_id: int, table_id: int | None) -> list[str]:
+    """Redis channels an order update goes to (see publish_order_update)."""
+    channels = [f"orders:tenant:{tenant_id}"]
+    if table_id is not None:
+        channels.append(f"orders:table:{table_id}")
+    return channels
+
+
 def publish_order_update(tenant_id: int, order_data: dict, table_id: int | None = None) -> None:
     """Publish order update to Redis for WebSocket bridge.
     
@@ -337,32 +411,243 @@ def publish_order_update(tenant_id: int, order_data: dict, table_id: int | None
     r = get_redis()
     if r:
         try:
-            # Always publish to tenant channel for restaurant owners
-            r.publish(f"orders:tenant:{tenant_id}", json.dumps(order_data))
-            
-            # Also publish to table channel if table_id is provided (for customers)
-            if table_id is not None:
-                r.publish(f"orders:table:{table_id}", json.dumps(order_data))
+            with tracing.span("publish order_update", "producer", {"event.type": order_data.get("type", "")}):
+                # Serialize once (with the trace context for ws-bridge) and send both
+                # publishes in a single round-trip
+                payload = json.dumps(tracing.with_traceparent(order_data), separators=(",", ":"))
+                pipe = r.pipeline(transaction=False)
+                for channel in _order_update_channels(tenant_id, table_id):
+                    pipe.publish(channel, payload)
+                pipe.execute()
         except Exception:
             pass  # Fail silently if Redis unavailable
 
 
+async def publish_order_update_async(
+    tenant_id: int, order_data: dict, table_id: int | None = None
+) -> None:
+    """Async variant of publish_order_update for async endpoints."""
+    r = await get_async_redis()
+    if r:
+        try:
+            with tracing.span("publish order_update", "producer", {"event.type": order_data.get("type", "")}):
+                payload = json.dumps(tracing.with_traceparent(order_data), separators=(",", ":"))
+                pipe = r.pipeline(transaction=False)
+                for channel in _order_update_channels(tenant_id, table_id):
+                    pipe.publish(channel, payload)
+                await pipe.execute()
+        except Exception:
+            pass  # Fail silently if Redis unavailable
+
+
+def _eta_update_events(etas: dict[int, dict]) -> list[tuple[str, str]]:
+    """(channel, payload) per open order: its table hears the new ready-time estimate."""
+    return [
+        (
+            f"orders:table:{estimate['table_id']}",
+            json.dumps(tracing.with_traceparent({"type": "eta_update", "order_id": order_id, **prep_eta.public(estimate)}),
+                       separators=(",", ":")),
+        )
+        for order_id, estimate in etas.items()
+    ]
+
+
+def _kitchen_queue_events(tenant_id: int, changed: list[dict], removed: list[str]) -> list[tuple[str, str]]:
+    """(channel, payload) for kitchen displays: queue groups that changed or emptied, if any."""
+    if not changed and not removed:
+        return []
+    event = {"type": "kitchen_queue_delta", "groups": changed, "removed": removed}
+    return [(f"orders:tenant:{tenant_id}", json.dumps(tracing.with_traceparent(event), separators=(",", ":")))]
+
+
+def _kitchen_update_events(session: Session, tenant_id: int, previous_queue: dict) -> tuple[list, dict]:
+    """ETA and kitchen queue events after a queue change, and the queue snapshot fields to store."""
+    now = datetime.now(timezone.utc)
+    events = _eta_update_events(prep_eta.order_etas(session, tenant_id, now))
+    changed, removed, snapshot = kitchen_queue.delta(previous_queue, kitchen_queue.queue_groups(session, tenant_id), now)
+    events += _kitchen_queue_events(tenant_id, changed, removed)
+    return events, {"set": {g["key"]: snapshot[g["key"]] for g in changed}, "removed": removed}
+
+
+def _queue_kitchen_updates(pipe, tenant_id: int, events: list, snapshot: dict) -> None:
+    for channel, payload in events:
+        pipe.publish(channel, payload)
+    key = kitchen_queue.snapshot_key(tenant_id)
+    if snapshot["removed"]:
+        pipe.hdel(key, *snapshot["removed"])
+    if snapshot["set"]:
+        pipe.hset(key, mapping=snapshot["set"])
+    pipe.expire(key, kitchen_queue.SNAPSHOT_TTL_SECONDS)
+
+
+# Attempts at the kitchen queue snapshot before giving up (another worker kept changing it)
+KITCHEN_SNAPSHOT_ATTEMPTS = 3
+
+
+def publish_kitchen_updates(session: Session, tenant_id: int) -> None:
+    """
+    After a change to the kitchen queue (items added, started, ready, edited, cancelled):
+    send every open order of the tenant its new ready-time estimate, and kitchen
+    displays the queue groups that changed. Two queries and four Redis round-trips;
+    skipped when Redis is unavailable.
+
+    The snapshot is read under WATCH and the events are published with the new
+    snapshot in one MULTI, so when workers race, the loser recomputes from the
+    database against the winner's snapshot instead of overwriting it with older
+    groups. If it still loses after KITCHEN_SNAPSHOT_ATTEMPTS, nothing is sent;
+    displays also reload GET /kitchen/queue on their refresh interval.
+    """
+    r = get_redis()
+    if r:
+        from redis.exceptions import WatchError
+
+        key = kitchen_queue.snapshot_key(tenant_id)
+        try:
+            with tracing.span("publish kitchen_updates", "producer"), r.pipeline() as pipe:
+                for _ in range(KITCHEN_SNAPSHOT_ATTEMPTS):
+                    try:
+                        pipe.watch(key)
+                        events, snapshot = _kitchen_update_events(session, tenant_id, pipe.hgetall(key))
+                        pipe.multi()
+                        _queue_kitchen_updates(pipe, tenant_id, events, snapshot)
+                        pipe.execute()
+                        return
+                    except WatchError:
+                        continue
+                logger.warning("Kitchen queue snapshot of tenant %s kept changing; updates not sent", tenant_id)
+        except Exception:
+            logger.warning("Could not publish kitchen updates", exc_info=True)
+
+
+async def publish_kitchen_updates_async(session: AsyncSession, tenant_id: int) -> None:
+    """Async variant of publish_kitchen_updates for async endpoints."""
+    r = await get_async_redis()
+    if r:
+        from redis.exceptions import WatchError
+
+        key = kitchen_queue.snapshot_key(tenant_id)
+        try:
+            with tracing.span("publish kitchen_updates", "producer"):
+                async with r.pipeline() as pipe:
+                    for _ in range(KITCHEN_SNAPSHOT_ATTEMPTS):
+                        try:
+                            await pipe.watch(key)
+                            previous = await pipe.hgetall(key)
+                            events, snapshot = await session.run_sync(_kitchen_update_events, tenant_id, previous)
+                            pipe.multi()
+                            _queue_kitchen_updates(pipe, tenant_id, events, snapshot)
+                            await pipe.execute()
+                            return
+                        except WatchError:
+                            continue
+                    logger.warning("Kitchen queue snapshot of tenant %s kept changing; updates not sent", tenant_id)
+        except Exception:
+            logger.warning("Could not publish kitchen updates", exc_info=True)
+
+
+def queue_inventory_sync(session: Session, order_item_ids) -> None:
+    """
+    After order items were added, changed, cancelled or removed (and committed): have
+    the inventory worker bring stock in line with them (deduct or put back). One XADD;
+    without Redis the sync runs here, in its own transaction. Never fails the request.
+    """
+    order_item_ids = sorted(set(order_item_ids))
+    if not order_item_ids:
+        return
+    r = get_redis()
+    if r:
+        try:
+            r.xadd(inventory_worker.STREAM, inventory_worker.message(order_item_ids),
+                   maxlen=inventory_worker.STREAM_MAXLEN, approximate=True)
+            return
+        except Exception:
+            logger.warning("Could not queue inventory sync, syncing inline", exc_info=True)
+    try:
+        sync_inventory_for_items(session, order_item_ids)
+        session.commit()
+    except Exception:
+        # Stock can be corrected by queueing the items again; the order change stands
+        session.rollback()
+        logger.warning("Inventory sync failed for order items %s", order_item_ids, exc_info=True)
+
+
+async def queue_inventory_sync_async(session: AsyncSession, order_item_ids) -> None:
+    """Async variant of queue_inventory_sync for async endpoints."""
+    order_item_ids = sorted(set(order_item_ids))
+    if not order_item_ids:
+        return
+    r = await get_async_redis()
+    if r:
+        try:
+            await r.xadd(inventory_worker.STREAM, inventory_worker.message(order_item_ids),
+                         maxlen=inventory_worker.STREAM_MAXLEN, approximate=True)
+            return
+        except Exception:
+            logger.warning("Could not queue inventory sync, syncing inline", exc_info=True)
+    try:
+        await session.run_sync(sync_inventory_for_items, order_item_ids)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        logger.warning("Inventory sync failed for order items %s", order_item_ids, exc_info=True)
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     logger.info("Starting application...")
-    create_db_and_tables()
-    # Run database migrations
-    try:
-        from .migrate import MigrationRunner
-        from pathlib import Path
+    tracing.setup_tracing()
+    schema_start = perf_counter()
+    if settings.migrate_on_startup:
+        # Fast path when the schema is current; otherwise create tables and migrate
+        # under an advisory lock so concurrent workers don't race
+        try:
+            from .migrate import MigrationRunner
 
-        migrations_dir = Path(__file__).parent.parent / "migrations"
-        runner = MigrationRunner(migrations_dir)
-        db_version = runner.run_migrations()
-        logger.info(f"Database schema version: {db_version}")
-    except Exception as e:
-        # Log but don't fail startup - migrations can be run manually
-        logger.warning(f"Migration check failed: {e}", exc_info=True)
+            migrations_dir = Path(__file__).parent.parent / "migrations"
+            db_version = MigrationRunner(migrations_dir).bootstrap()
+            logger.info(f"Database schema version: {db_version}")
+        except Exception as e:
+            # Log but don't fail startup - migrations can be run manually
+            logger.warning(f"Migration check failed: {e}", exc_info=True)
+    else:
+        logger.info("Schema check skipped (MIGRATE_ON_STARTUP=false); run `python -m app.migrate` on deploy")
+    now = perf_counter()
+    logger.info(
+        f"Worker {os.getpid()} started in {(now - _import_started) * 1000:.0f} ms "
+        f"(schema check {(now - schema_start) * 1000:.0f} ms)"
+    )
+
+
+@app.on_event("startup")
+async def enable_event_loop_block_guard() -> None:
+    """Dev only: log any callback that holds the event loop longer than the threshold.
+
+    Uses asyncio debug mode, whose warning names the offending task (e.g. an
+    `async def` endpoint calling the sync Session or Pillow).
+    """
+    threshold_ms = settings.event_loop_block_warn_ms
+    if settings.is_production or threshold_ms <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    loop.slow_callback_duration = threshold_ms / 1000
+    loop.set_debug(True)
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+    logger.info(f"Event loop block guard enabled (threshold {threshold_ms} ms)")
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """Close this worker's Redis clients and DB pools so shutdown does not leave connections behind."""
+    global redis_client, async_redis_client
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+        async_redis_client = None
+    if redis_client is not None:
+        redis_client.close()
+        redis_client = None
+    report_jobs.shutdown()
+    await dispose_engines()
+    tracing.shutdown_tracing()
 
 
 @app.get("/health")
@@ -370,6 +655,20 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: str | None = Header(default=None)) -> Response:
+    """Prometheus scrape endpoint (see app/metrics.py)."""
+    # In production the API is public behind the proxy: no token, no metrics
+    if not settings.metrics_enabled or (settings.is_production and not settings.metrics_token):
+        raise HTTPException(status_code=404)
+    if settings.metrics_token and not hmac.compare_digest(
+        authorization or "", f"Bearer {settings.metrics_token}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health/db")
 def health_db(session: Session = Depends(get_session)) -> dict:
     """Check database connection and version."""
@@ -387,7 +686,12 @@ def health_db(session: Session = Depends(get_session)) -> dict:
         except Exception:
             db_version = None
 
-        return {"status": "ok", "database": "connected", "schema_version": db_version}
+        return {
+            "status": "ok",
+            "database": "connected",
+            "schema_version": db_version,
+            "pool": get_pool_stats(),
+        }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Database error: {e}")
 
@@ -1165,7 +1469,7 @@ def update_tenant_settings(
 
 
 @app.post("/tenant/logo")
-async def upload_tenant_logo(
+def upload_tenant_logo(
     file: Annotated[UploadFile, File()],
     current_user: Annotated[models.User, Depends(require_permission(Permission.SETTINGS_UPDATE))],
     session: Session = Depends(get_session),
@@ -1187,7 +1491,7 @@ async def upload_tenant_logo(
         )
 
     # Read file and check size
-    contents = await file.read()
+    contents = file.file.read()
     if len(contents) > MAX_IMAGE_SIZE:
         raise HTTPException(
             status_code=400,
@@ -1424,7 +1728,7 @@ def delete_product(
 
 
 @app.post("/products/{product_id}/image")
-async def upload_product_image(
+def upload_product_image(
     product_id: int,
     file: Annotated[UploadFile, File()],
     current_user: Annotated[models.User, Depends(require_permission(Permission.PRODUCT_WRITE))],
@@ -1449,7 +1753,7 @@ async def upload_product_image(
         )
 
     # Read file and check size
-    contents = await file.read()
+    contents = file.file.read()
     if len(contents) > MAX_IMAGE_SIZE:
         raise HTTPException(
             status_code=400,
@@ -1542,7 +1846,7 @@ def create_provider(
 
 
 @app.get("/catalog")
-async def list_catalog(
+def list_catalog(
     current_user: Annotated[models.User, Depends(require_permission(Permission.CATALOG_READ))],
     session: Session = Depends(get_session),
     category: str | None = None,
@@ -1565,22 +1869,26 @@ async def list_catalog(
 
     catalog_items = session.exec(query.order_by(models.ProductCatalog.name)).all()
 
-    result = []
-    for item in catalog_items:
-        # Get all provider products for this catalog item
-        provider_products = session.exec(
-            select(models.ProviderProduct).where(
-                models.ProviderProduct.catalog_id == item.id,
+    # Available provider products (with their provider) for all listed items in one query
+    offers_by_catalog: dict[int, list[tuple[models.ProviderProduct, models.Provider]]] = {}
+    if catalog_items:
+        offers = session.exec(
+            select(models.ProviderProduct, models.Provider)
+            .join(models.Provider, models.Provider.id == models.ProviderProduct.provider_id)
+            .where(
+                models.ProviderProduct.catalog_id.in_(query.with_only_columns(models.ProductCatalog.id)),
                 models.ProviderProduct.availability == True,
             )
+            .order_by(models.ProviderProduct.id)
         ).all()
+        for pp, provider in offers:
+            offers_by_catalog.setdefault(pp.catalog_id, []).append((pp, provider))
 
+    result = []
+    for item in catalog_items:
         # Get provider info
         providers_data = []
-        for pp in provider_products:
-            provider = session.exec(
-                select(models.Provider).where(models.Provider.id == pp.provider_id)
-            ).first()
+        for pp, provider in offers_by_catalog.get(item.id, []):
             if provider:
                 # Construct image URL - only use local images, never external URLs
                 image_url = None
@@ -1676,7 +1984,7 @@ async def list_catalog(
 
 
 @app.get("/catalog/categories")
-async def get_catalog_categories(
+def get_catalog_categories(
     current_user: Annotated[models.User, Depends(require_permission(Permission.CATALOG_READ))],
     session: Session = Depends(get_session),
 ) -> dict:
@@ -1695,7 +2003,7 @@ async def get_catalog_categories(
 
 
 @app.get("/catalog/{catalog_id}")
-async def get_catalog_item(
+def get_catalog_item(
     catalog_id: int,
     current_user: Annotated[models.User, Depends(require_permission(Permission.CATALOG_READ))],
     session: Session = Depends(get_session),
@@ -2094,7 +2402,7 @@ def provider_delete_product(
 
 
 @app.post("/provider/products/{product_id}/image")
-async def provider_upload_product_image(
+def provider_upload_product_image(
     product_id: int,
     current: Annotated[
         tuple[models.User, models.Provider],
@@ -2118,7 +2426,7 @@ async def provider_upload_product_image(
             status_code=400,
             detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_IMAGE_TYPES)}",
         )
-    contents = await file.read()
+    contents = file.file.read()
     if len(contents) > MAX_IMAGE_SIZE:
         raise HTTPException(
             status_code=400,
@@ -2704,33 +3012,42 @@ def list_tables_with_status(
         ).all()
         waiter_map = {w.id: (w.full_name or w.email) for w in waiters}
 
+    # Occupied: active order (pending, preparing, ready) or reservation seated at the table.
+    # Reserved: a booked reservation is assigned to the table (date >= today).
+    # One query each for all tables.
+    table_ids = [t.id for t in tables]
+    occupied_ids: set[int] = set()
+    reserved_ids: set[int] = set()
+    if table_ids:
+        occupied_ids.update(session.exec(
+            select(models.Order.table_id).where(
+                models.Order.table_id.in_(table_ids),
+                models.Order.status.in_(["pending", "preparing", "ready"]),
+            ).distinct()
+        ).all())
+        for table_id, res_status in session.exec(
+            select(models.Reservation.table_id, models.Reservation.status).where(
+                models.Reservation.table_id.in_(table_ids),
+                (models.Reservation.status == models.ReservationStatus.seated)
+                | (
+                    (models.Reservation.status == models.ReservationStatus.booked)
+                    & (models.Reservation.reservation_date >= today_utc)
+                ),
+            ).distinct()
+        ).all():
+            if res_status == models.ReservationStatus.seated:
+                occupied_ids.add(table_id)
+            else:
+                reserved_ids.add(table_id)
+
     result = []
     for table in tables:
-        # Occupied: active order (pending, preparing, ready) or reservation seated at this table
-        active_order = session.exec(
-            select(models.Order).where(
-                models.Order.table_id == table.id,
-                models.Order.status.in_(["pending", "preparing", "ready"]),
-            )
-        ).first()
-        seated_here = session.exec(
-            select(models.Reservation).where(
-                models.Reservation.table_id == table.id,
-                models.Reservation.status == models.ReservationStatus.seated,
-            )
-        ).first()
-        if active_order or seated_here:
+        if table.id in occupied_ids:
             status = "occupied"
+        elif table.id in reserved_ids:
+            status = "reserved"
         else:
-            # Reserved: a booked reservation is assigned to this table (date >= today)
-            reserved_here = session.exec(
-                select(models.Reservation).where(
-                    models.Reservation.table_id == table.id,
-                    models.Reservation.status == models.ReservationStatus.booked,
-                    models.Reservation.reservation_date >= today_utc,
-                )
-            ).first()
-            status = "reserved" if reserved_here else "available"
+            status = "available"
         effective_waiter_id = table.assigned_waiter_id or floor_waiter_map.get(table.floor_id)
 
         result.append(
@@ -3461,19 +3778,37 @@ def validate_table_token(
 # ============ PUBLIC MENU ============
 
 
+def _load_by_ids(session: Session, model, ids) -> dict:
+    """Load rows of `model` by primary key in one query; returns {id: row}."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    rows = session.exec(select(model).where(model.id.in_(ids))).all()
+    return {row.id: row for row in rows}
+
+
+async def _get_by_ids(session: AsyncSession, model, ids) -> dict:
+    """Load rows of `model` by primary key in one query; returns {id: row}."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    rows = (await session.exec(select(model).where(model.id.in_(ids)))).all()
+    return {row.id: row for row in rows}
+
+
 @app.get("/menu/{table_token}")
-def get_menu(
+async def get_menu(
     table_token: str,
     lang: str = Depends(_get_requested_language),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> dict:
     """Public endpoint - get menu for a table by its token."""
-    print(f"[DEBUG] Menu request for token: {table_token}")
+    logger.debug("Menu request for token %s", table_token)
     # Use raw SQL to avoid SQLAlchemy model issues
     from sqlalchemy import text
 
     try:
-        result = session.execute(
+        result = await session.execute(
             text("""
             SELECT id, tenant_id, name, token, is_active, order_pin, active_order_id
             FROM "table"
@@ -3482,13 +3817,12 @@ def get_menu(
             {"token": table_token},
         )
         table_row = result.fetchone()
-        print(f"[DEBUG] Query result: {table_row}")
     except Exception as e:
-        print(f"[DEBUG] Query error: {e}")
+        logger.exception("Menu table lookup failed for token %s", table_token)
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
     if not table_row:
-        print(f"[DEBUG] Table not found for token: {table_token}")
+        logger.debug("Menu request for unknown table token %s", table_token)
         raise HTTPException(status_code=404, detail="Table not found")
 
     # Create a simple object with the needed attributes
@@ -3514,9 +3848,7 @@ def get_menu(
 
     if not table.is_active:
         # Return tenant/table info so the frontend can show a branded "table closed" page
-        tenant = session.exec(
-            select(models.Tenant).where(models.Tenant.id == table.tenant_id)
-        ).first()
+        tenant = await session.get(models.Tenant, table.tenant_id)
         raise HTTPException(
             status_code=403,
             detail={
@@ -3530,20 +3862,48 @@ def get_menu(
         )
 
     # Get products from TenantProduct (new catalog system) and Product (legacy)
-    tenant_products = session.exec(
+    tenant_products = (await session.exec(
         select(models.TenantProduct).where(
             models.TenantProduct.tenant_id == table.tenant_id,
             models.TenantProduct.is_active == True,
         )
-    ).all()
+    )).all()
 
-    legacy_products = session.exec(
+    legacy_products = (await session.exec(
         select(models.Product).where(models.Product.tenant_id == table.tenant_id)
-    ).all()
+    )).all()
 
-    tenant = session.exec(
-        select(models.Tenant).where(models.Tenant.id == table.tenant_id)
-    ).first()
+    tenant = await session.get(models.Tenant, table.tenant_id)
+
+    # Batch-load what the product loop needs: one query per entity type instead of per product
+    catalog_items = await _get_by_ids(
+        session, models.ProductCatalog, (tp.catalog_id for tp in tenant_products)
+    )
+    provider_products = await _get_by_ids(
+        session, models.ProviderProduct, (tp.provider_product_id for tp in tenant_products)
+    )
+    providers = await _get_by_ids(
+        session,
+        models.Provider,
+        (pp.provider_id for pp in provider_products.values() if pp.image_filename),
+    )
+    custom_products = await _get_by_ids(
+        session, models.Product, (tp.product_id for tp in tenant_products)
+    )
+
+    tp_translations: dict[tuple[int, str], str] = {}
+    catalog_translations: dict[tuple[int, str], str] = {}
+    product_translations: dict[tuple[int, str], str] = {}
+    if lang != "en":
+        tp_translations = await TranslationService.get_translated_fields_async(
+            session, table.tenant_id, "tenant_product", (tp.id for tp in tenant_products), lang
+        )
+        catalog_translations = await TranslationService.get_translated_fields_async(
+            session, table.tenant_id, "product_catalog", catalog_items.keys(), lang
+        )
+        product_translations = await TranslationService.get_translated_fields_async(
+            session, table.tenant_id, "product", (lp.id for lp in legacy_products), lang
+        )
 
     # Combine products from both sources
     products_list = []
@@ -3556,25 +3916,13 @@ def get_menu(
         catalog_item = None
 
         # Get catalog item for description
-        catalog_item = session.exec(
-            select(models.ProductCatalog).where(
-                models.ProductCatalog.id == tp.catalog_id
-            )
-        ).first()
+        catalog_item = catalog_items.get(tp.catalog_id)
 
         # Get provider product for detailed wine info
         if tp.provider_product_id:
-            provider_product = session.exec(
-                select(models.ProviderProduct).where(
-                    models.ProviderProduct.id == tp.provider_product_id
-                )
-            ).first()
+            provider_product = provider_products.get(tp.provider_product_id)
             if provider_product and provider_product.image_filename:
-                provider = session.exec(
-                    select(models.Provider).where(
-                        models.Provider.id == provider_product.provider_id
-                    )
-                ).first()
+                provider = providers.get(provider_product.provider_id)
                 if provider:
                     # Construct path to provider image
                     image_filename = f"providers/{provider.token}/products/{provider_product.image_filename}"
@@ -3592,33 +3940,19 @@ def get_menu(
 
         # Get the actual product record to check for customized description
         if tp.product_id:
-            custom_product = session.get(models.Product, tp.product_id)
+            custom_product = custom_products.get(tp.product_id)
             if custom_product and custom_product.description:
                 product_data["description"] = custom_product.description
 
         # Add translations for tenant product
         if lang != "en":  # Only add if different from default
-            display_name = TranslationService.get_translated_field(
-                session,
-                table.tenant_id,
-                "tenant_product",
-                tp.id,
-                "name",
-                lang,
-                tp.name or "",
-            )
+            display_name = tp_translations.get((tp.id, "name"), tp.name or "")
             if display_name != (tp.name or ""):
                 product_data["display_name"] = display_name
 
             if tp.ingredients:
-                display_ingredients = TranslationService.get_translated_field(
-                    session,
-                    table.tenant_id,
-                    "tenant_product",
-                    tp.id,
-                    "ingredients",
-                    lang,
-                    tp.ingredients,
+                display_ingredients = tp_translations.get(
+                    (tp.id, "ingredients"), tp.ingredients
                 )
                 if display_ingredients != tp.ingredients:
                     product_data["display_ingredients"] = display_ingredients
@@ -3638,14 +3972,8 @@ def get_menu(
 
                 # Add translated description if available
                 if lang != "en":
-                    display_description = TranslationService.get_translated_field(
-                        session,
-                        table.tenant_id,
-                        "product_catalog",
-                        catalog_item.id,
-                        "description",
-                        lang,
-                        catalog_item.description,
+                    display_description = catalog_translations.get(
+                        (catalog_item.id, "description"), catalog_item.description
                     )
                     if display_description != catalog_item.description:
                         product_data["display_description"] = display_description
@@ -3814,21 +4142,13 @@ def get_menu(
 
         # Add translations for legacy product
         if lang != "en":
-            display_name = TranslationService.get_translated_field(
-                session, table.tenant_id, "product", lp.id, "name", lang, lp.name or ""
-            )
+            display_name = product_translations.get((lp.id, "name"), lp.name or "")
             if display_name != (lp.name or ""):
                 product_data["display_name"] = display_name
 
             if lp.ingredients:
-                display_ingredients = TranslationService.get_translated_field(
-                    session,
-                    table.tenant_id,
-                    "product",
-                    lp.id,
-                    "ingredients",
-                    lang,
-                    lp.ingredients,
+                display_ingredients = product_translations.get(
+                    (lp.id, "ingredients"), lp.ingredients
                 )
                 if display_ingredients != lp.ingredients:
                     product_data["display_ingredients"] = display_ingredients
@@ -3879,31 +4199,26 @@ def get_menu(
 
     # Add translations for tenant fields if requested language differs from default
     if tenant and lang != "en":
-        # Translate tenant name
-        display_name = TranslationService.get_translated_field(
-            session, tenant.id, "tenant", tenant.id, "name", lang, tenant.name or ""
+        tenant_translations = await TranslationService.get_translated_fields_async(
+            session, tenant.id, "tenant", [tenant.id], lang
         )
+        # Translate tenant name
+        display_name = tenant_translations.get((tenant.id, "name"), tenant.name or "")
         if display_name != (tenant.name or ""):
             tenant_data["display_tenant_name"] = display_name
 
         # Translate tenant description
         if tenant.description:
-            display_description = TranslationService.get_translated_field(
-                session,
-                tenant.id,
-                "tenant",
-                tenant.id,
-                "description",
-                lang,
-                tenant.description,
+            display_description = tenant_translations.get(
+                (tenant.id, "description"), tenant.description
             )
             if display_description != tenant.description:
                 tenant_data["display_tenant_description"] = display_description
 
         # Translate tenant address
         if tenant.address:
-            display_address = TranslationService.get_translated_field(
-                session, tenant.id, "tenant", tenant.id, "address", lang, tenant.address
+            display_address = tenant_translations.get(
+                (tenant.id, "address"), tenant.address
             )
             if display_address != tenant.address:
                 tenant_data["display_tenant_address"] = display_address
@@ -3912,15 +4227,15 @@ def get_menu(
 
 
 @app.get("/menu/{table_token}/order")
-def get_current_order(
+async def get_current_order(
     table_token: str,
     session_id: str | None = Query(None, description="Session identifier for order isolation"),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
 ) -> dict:
     """Public endpoint - get current active order for a table (if any)."""
-    table = session.exec(
+    table = (await session.exec(
         select(models.Table).where(models.Table.token == table_token)
-    ).first()
+    )).first()
 
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
@@ -3930,7 +4245,7 @@ def get_current_order(
     # Prefer the table's shared active order (created when staff activates the table).
     # This is the canonical order for the PIN-based shared-order model.
     if table.active_order_id:
-        shared_order = session.get(models.Order, table.active_order_id)
+        shared_order = await session.get(models.Order, table.active_order_id)
         if (
             shared_order
             and shared_order.status != models.OrderStatus.paid
@@ -3942,20 +4257,20 @@ def get_current_order(
     # for tables activated before the shared-order model was introduced).
     if not active_order:
         if session_id:
-            potential_orders = session.exec(
+            potential_orders = (await session.exec(
                 select(models.Order).where(
                     models.Order.table_id == table.id,
                     models.Order.session_id == session_id,
                     models.Order.status != models.OrderStatus.paid
                 ).order_by(models.Order.created_at.desc())
-            ).all()
+            )).all()
         else:
-            potential_orders = session.exec(
+            potential_orders = (await session.exec(
                 select(models.Order).where(
                     models.Order.table_id == table.id,
                     models.Order.status != models.OrderStatus.paid
                 ).order_by(models.Order.created_at.desc())
-            ).all()
+            )).all()
 
         for order in potential_orders:
             if order.status == models.OrderStatus.paid:
@@ -3966,7 +4281,7 @@ def get_current_order(
 
     # Table shared order: when no order matched session_id, use table's active order so customer sees current order
     if not active_order and table.active_order_id:
-        active_order = session.get(models.Order, table.active_order_id)
+        active_order = await session.get(models.Order, table.active_order_id)
         if active_order and active_order.status == models.OrderStatus.paid:
             active_order = None
         if active_order and "[PAID:" in (active_order.notes or ""):
@@ -3975,18 +4290,21 @@ def get_current_order(
     if not active_order:
         return {"order": None}
     
-    # Get order items (exclude removed items for customer view)
-    # Order by ID descending so newest items appear first (for customer view)
-    items = session.exec(
-        select(models.OrderItem).where(
-            models.OrderItem.order_id == active_order.id,
-            models.OrderItem.removed_by_customer == False
-        ).order_by(models.OrderItem.id.desc())
-    ).all()
-    
-    # Compute order status from items
-    all_items = session.exec(select(models.OrderItem).where(models.OrderItem.order_id == active_order.id)).all()
+    # Load all items once: status is computed from all of them, the customer view
+    # excludes removed items. Order by ID descending so newest items appear first.
+    all_items = (await session.exec(
+        select(models.OrderItem)
+        .where(models.OrderItem.order_id == active_order.id)
+        .order_by(models.OrderItem.id.desc())
+    )).all()
+    items = [item for item in all_items if not item.removed_by_customer]
     computed_status = compute_order_status_from_items(all_items)
+    # Ready-time estimate against the tenant's whole kitchen queue (one query)
+    estimate = None
+    if any(item.status in (models.OrderItemStatus.pending, models.OrderItemStatus.preparing) for item in items):
+        etas = await session.run_sync(prep_eta.order_etas, table.tenant_id)
+        estimate = etas.get(active_order.id)
+    item_etas = estimate["items"] if estimate else {}
     
     return {
         "order": {
@@ -4004,29 +4322,31 @@ def get_current_order(
                     "quantity": item.quantity,
                     "price_cents": item.price_cents,
                     "notes": item.notes,
-                    "status": item.status.value if hasattr(item.status, 'value') else str(item.status)
+                    "status": item.status.value if hasattr(item.status, 'value') else str(item.status),
+                    "estimated_ready_at": item_etas[item.id].isoformat() if item.id in item_etas else None,
                 }
                 for item in items
             ],
             "total_cents": sum(item.price_cents * item.quantity for item in items),
+            **prep_eta.public(estimate),
         }
     }
 
 
 @app.get("/menu/{table_token}/order-history")
-def get_table_order_history(
+async def get_table_order_history(
     table_token: str,
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> list[dict]:
     """Public endpoint - recent paid/completed orders for this table (for customer order history)."""
-    table = session.exec(
+    table = (await session.exec(
         select(models.Table).where(models.Table.token == table_token)
-    ).first()
+    )).first()
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
 
-    orders = session.exec(
+    orders = (await session.exec(
         select(models.Order)
         .where(
             models.Order.table_id == table.id,
@@ -4034,16 +4354,25 @@ def get_table_order_history(
         )
         .order_by(models.Order.created_at.desc())
         .limit(limit)
-    ).all()
+    )).all()
+
+    # Items for all listed orders in one query
+    items_by_order: dict[int, list[models.OrderItem]] = {order.id: [] for order in orders}
+    if orders:
+        order_items = (await session.exec(
+            select(models.OrderItem)
+            .where(
+                models.OrderItem.order_id.in_(items_by_order.keys()),
+                models.OrderItem.removed_by_customer == False,
+            )
+            .order_by(models.OrderItem.id)
+        )).all()
+        for item in order_items:
+            items_by_order[item.order_id].append(item)
 
     result = []
     for order in orders:
-        items = session.exec(
-            select(models.OrderItem).where(
-                models.OrderItem.order_id == order.id,
-                models.OrderItem.removed_by_customer == False,
-            )
-        ).all()
+        items = items_by_order[order.id]
         total_cents = sum(item.price_cents * item.quantity for item in items)
         result.append({
             "id": order.id,
@@ -4081,16 +4410,16 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
 
 @app.post("/menu/{table_token}/order")
-def create_order(
+async def create_order(
     table_token: str,
     order_data: models.OrderCreate,
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> dict:
     """Public endpoint - add items to the table's shared order."""
-    table = session.exec(
+    table = (await session.exec(
         select(models.Table).where(models.Table.token == table_token)
-    ).first()
+    )).first()
 
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
@@ -4099,7 +4428,7 @@ def create_order(
         raise HTTPException(status_code=400, detail="Order must have at least one item")
 
     # Get tenant for location verification
-    tenant = session.get(models.Tenant, table.tenant_id)
+    tenant = await session.get(models.Tenant, table.tenant_id)
 
     # ============ TABLE ACTIVATION & PIN VALIDATION ============
     # Check if table is active (staff has opened it)
@@ -4110,14 +4439,14 @@ def create_order(
         )
 
     # Validate PIN (with rate limiting)
-    redis_conn = get_redis()
+    redis_conn = await get_async_redis()
     attempts_key = None
     lock_key = None
     if redis_conn:
         client_key = get_pin_client_key(request, order_data.session_id)
         attempts_key = f"pin_attempts:{table_token}:{client_key}"
         lock_key = f"pin_lock:{table_token}:{client_key}"
-        lock_ttl = redis_conn.ttl(lock_key)
+        lock_ttl = await redis_conn.ttl(lock_key)
         if lock_ttl and lock_ttl > 0:
             raise HTTPException(
                 status_code=429,
@@ -4131,19 +4460,21 @@ def create_order(
 
     # Validate PIN
     if not order_data.pin:
+        metrics.pin_failures_total.inc()
         raise HTTPException(
             status_code=403, 
             detail="PIN required. Please enter the table PIN to place an order."
         )
     
     if order_data.pin != table.order_pin:
+        metrics.pin_failures_total.inc()
         if redis_conn and attempts_key and lock_key:
-            attempts = redis_conn.incr(attempts_key)
+            attempts = await redis_conn.incr(attempts_key)
             if attempts == 1:
-                redis_conn.expire(attempts_key, PIN_ATTEMPT_WINDOW_SECONDS)
+                await redis_conn.expire(attempts_key, PIN_ATTEMPT_WINDOW_SECONDS)
             if attempts >= PIN_MAX_ATTEMPTS:
-                redis_conn.setex(lock_key, PIN_LOCKOUT_SECONDS, "1")
-                redis_conn.delete(attempts_key)
+                await redis_conn.setex(lock_key, PIN_LOCKOUT_SECONDS, "1")
+                await redis_conn.delete(attempts_key)
                 raise HTTPException(
                     status_code=429,
                     detail=f"Too many PIN attempts. Try again in {PIN_LOCKOUT_SECONDS} seconds."
@@ -4154,15 +4485,14 @@ def create_order(
         )
 
     if redis_conn and attempts_key and lock_key:
-        redis_conn.delete(attempts_key)
-        redis_conn.delete(lock_key)
+        await redis_conn.delete(attempts_key, lock_key)
 
     # ============ GET OR CREATE SHARED ORDER ============
     # Order is created when table is activated only as a slot; we create it on first item add.
     # If no active order yet, we will create one below (requires at least one item).
     order = None
     if table.active_order_id:
-        order = session.get(models.Order, table.active_order_id)
+        order = await session.get(models.Order, table.active_order_id)
         if order and order.status == models.OrderStatus.paid:
             order = None  # Will create a new order below if we have items
 
@@ -4180,19 +4510,20 @@ def create_order(
             session_id=None,
         )
         session.add(new_order)
-        session.flush()
+        await session.flush()
         table.active_order_id = new_order.id
         session.add(table)
-        session.flush()
+        await session.flush()
         order = new_order
         is_new_order = True
     else:
         is_new_order = False
+    opened_order = is_new_order
 
-    print(f"\n{'=' * 60}")
-    print(f"[DEBUG] POST /menu/{table_token}/order")
-    print(f"[DEBUG] Table: id={table.id}, name={table.name}, is_active={table.is_active}")
-    print(f"[DEBUG] Using shared order #{order.id}")
+    logger.debug(
+        "POST /menu/%s/order: table id=%s name=%r, shared order #%s (new=%s)",
+        table_token, table.id, table.name, order.id, is_new_order,
+    )
 
     # ============ LOCATION VERIFICATION ============
     location_flagged = False
@@ -4202,16 +4533,18 @@ def create_order(
                 tenant.latitude, tenant.longitude,
                 order_data.latitude, order_data.longitude
             )
-            print(f"[DEBUG] Location check: customer at {order_data.latitude}, {order_data.longitude}")
-            print(f"[DEBUG] Distance from restaurant: {distance:.0f}m (radius: {tenant.location_radius_meters}m)")
+            logger.debug(
+                "Order #%s location check: %.0fm from restaurant (radius %sm)",
+                order.id, distance, tenant.location_radius_meters,
+            )
             
             if distance > tenant.location_radius_meters:
                 location_flagged = True
                 order.flagged_for_review = True
                 order.flag_reason = f"Order placed from {distance:.0f}m away (limit: {tenant.location_radius_meters}m)"
-                print(f"[DEBUG] ORDER FLAGGED: {order.flag_reason}")
+                logger.info("Order #%s flagged: %s", order.id, order.flag_reason)
         else:
-            print(f"[DEBUG] Location not provided by customer")
+            logger.debug("Order #%s: location not provided by customer", order.id)
     
     # Update customer name if provided (for display purposes)
     if order_data.customer_name and not order.customer_name:
@@ -4221,12 +4554,10 @@ def create_order(
     if order_data.notes:
         order.notes = f"{order.notes or ''}\n{order_data.notes}".strip()
 
-    print(f"[DEBUG] Final order #{order.id}, status={order.status!r}")
-    print(f"{'=' * 60}\n")
-    
     is_new_order = False  # We're always adding to existing shared order
 
     # Add order items
+    added_items = []
     for item in order_data.items:
         # Use source indicator if provided, otherwise try TenantProduct first, then legacy Product
         product_name = None
@@ -4235,12 +4566,12 @@ def create_order(
 
         if item.source == "tenant_product":
             # Explicitly look up TenantProduct (menu sends TenantProduct.id as product_id)
-            tenant_product = session.exec(
+            tenant_product = (await session.exec(
                 select(models.TenantProduct).where(
                     models.TenantProduct.id == item.product_id,
                     models.TenantProduct.tenant_id == table.tenant_id
                 )
-            ).first()
+            )).first()
             if not tenant_product:
                 raise HTTPException(status_code=400, detail=f"TenantProduct {item.product_id} not found")
             product_name = tenant_product.name
@@ -4255,18 +4586,18 @@ def create_order(
                     tenant_id=table.tenant_id,
                 )
                 session.add(new_product)
-                session.flush()
+                await session.flush()
                 effective_product_id = new_product.id
                 tenant_product.product_id = new_product.id
                 session.add(tenant_product)
         elif item.source == "product":
             # Explicitly look up legacy Product
-            product = session.exec(
+            product = (await session.exec(
                 select(models.Product).where(
                     models.Product.id == item.product_id,
                     models.Product.tenant_id == table.tenant_id,
                 )
-            ).first()
+            )).first()
             if not product:
                 raise HTTPException(status_code=400, detail=f"Product {item.product_id} not found")
             product_name = product.name
@@ -4274,12 +4605,12 @@ def create_order(
             effective_product_id = product.id
         else:
             # No source specified - try TenantProduct first, then fallback to legacy Product
-            tenant_product = session.exec(
+            tenant_product = (await session.exec(
                 select(models.TenantProduct).where(
                     models.TenantProduct.id == item.product_id,
                     models.TenantProduct.tenant_id == table.tenant_id
                 )
-            ).first()
+            )).first()
 
             if tenant_product:
                 product_name = tenant_product.name
@@ -4293,18 +4624,18 @@ def create_order(
                         tenant_id=table.tenant_id,
                     )
                     session.add(new_product)
-                    session.flush()
+                    await session.flush()
                     effective_product_id = new_product.id
                     tenant_product.product_id = new_product.id
                     session.add(tenant_product)
             else:
                 # Fallback to legacy Product table
-                product = session.exec(
+                product = (await session.exec(
                     select(models.Product).where(
                         models.Product.id == item.product_id,
                         models.Product.tenant_id == table.tenant_id
                     )
-                ).first()
+                )).first()
                 if not product:
                     raise HTTPException(status_code=400, detail=f"Product {item.product_id} not found")
                 product_name = product.name
@@ -4313,14 +4644,14 @@ def create_order(
 
         # Check if this product already exists in the order (only active, non-removed items)
         # Match by effective_product_id (Product.id) so we merge same product regardless of TenantProduct id
-        existing_item = session.exec(
+        existing_item = (await session.exec(
             select(models.OrderItem).where(
                 models.OrderItem.order_id == order.id,
                 models.OrderItem.product_id == effective_product_id,
                 models.OrderItem.removed_by_customer == False,
                 models.OrderItem.status != models.OrderItemStatus.delivered
             )
-        ).first()
+        )).first()
 
         if existing_item:
             existing_item.quantity += item.quantity
@@ -4331,6 +4662,7 @@ def create_order(
             if location_flagged:
                 existing_item.location_flagged = True
             session.add(existing_item)
+            added_items.append(existing_item)
         else:
             order_item = models.OrderItem(
                 order_id=order.id,
@@ -4344,37 +4676,35 @@ def create_order(
                 location_flagged=location_flagged
             )
             session.add(order_item)
+            added_items.append(order_item)
     
     # After adding items, recompute order status from all items (if not paid or cancelled)
     # This ensures correct status like 'partially_delivered' when there are both delivered and undelivered items
     if order.status not in [models.OrderStatus.paid, models.OrderStatus.cancelled]:
-        all_items = session.exec(select(models.OrderItem).where(models.OrderItem.order_id == order.id)).all()
+        all_items = (await session.exec(select(models.OrderItem).where(models.OrderItem.order_id == order.id))).all()
         computed_status = compute_order_status_from_items(all_items)
         order.status = computed_status
-        print(f"[DEBUG] Recomputed order status from items: {computed_status.value}")
+        logger.debug("Order #%s status recomputed from items: %s", order.id, computed_status.value)
     
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
+    if opened_order:
+        metrics.orders_created_total.inc()
+    metrics.order_items_added_total.inc(len(order_data.items))
 
-    # Auto-deduct inventory if enabled for tenant
-    tenant = session.get(models.Tenant, table.tenant_id)
+    # Auto-deduct inventory if enabled for tenant: queued for the inventory worker
     if tenant and getattr(tenant, "inventory_tracking_enabled", False):
-        try:
-            deduct_inventory_for_order(session, order, tenant)
-            session.commit()
-            logger.info(f"Inventory deducted for order #{order.id}")
-        except Exception as e:
-            # Log but don't fail the order - inventory can go negative
-            logger.warning(f"Inventory deduction warning for order #{order.id}: {e}")
+        await queue_inventory_sync_async(session, [item.id for item in added_items])
 
     # Publish to Redis for real-time updates
-    publish_order_update(table.tenant_id, {
+    await publish_order_update_async(table.tenant_id, {
         "type": "new_order" if is_new_order else "items_added",
         "order_id": order.id,
         "table_name": table.name,
         "status": order.status.value,
         "created_at": order.created_at.isoformat()
     }, table_id=table.id)
+    await publish_kitchen_updates_async(session, table.tenant_id)
     
     return {
         "status": "created" if is_new_order else "updated",
@@ -4564,36 +4894,35 @@ def list_orders(
         .order_by(models.Order.created_at.desc())
     ).all()
 
+    # Tables and items for all orders in two queries (not per order)
+    tables_by_id = _load_by_ids(session, models.Table, (o.table_id for o in orders))
+    items_by_order: dict[int, list[models.OrderItem]] = {}
+    if orders:
+        order_items = session.exec(
+            select(models.OrderItem)
+            .join(models.Order, models.Order.id == models.OrderItem.order_id)
+            .where(models.Order.tenant_id == current_user.tenant_id)
+            .order_by(models.OrderItem.id.asc())
+        ).all()
+        for item in order_items:
+            items_by_order.setdefault(item.order_id, []).append(item)
+
     result = []
     for order in orders:
-        table = session.exec(select(models.Table).where(models.Table.id == order.table_id)).first()
-        
+        table = tables_by_id.get(order.table_id)
+        all_items = items_by_order.get(order.id, [])
+
         # Get items, optionally including removed ones
         if include_removed:
-            items = session.exec(
-                select(models.OrderItem)
-                .where(models.OrderItem.order_id == order.id)
-                .order_by(models.OrderItem.removed_by_customer.asc(), models.OrderItem.id.asc())
-            ).all()
+            items = sorted(all_items, key=lambda item: (bool(item.removed_by_customer), item.id))
         else:
-            items = session.exec(
-                select(models.OrderItem)
-                .where(
-                    models.OrderItem.order_id == order.id,
-                    models.OrderItem.removed_by_customer == False
-                )
-            ).all()
-        
+            items = [item for item in all_items if not item.removed_by_customer]
+
         # Compute order status from items (if not paid or cancelled)
         computed_status = order.status
         if order.status not in [models.OrderStatus.paid, models.OrderStatus.cancelled]:
-            computed_status = compute_order_status_from_items(
-                session.exec(select(models.OrderItem).where(models.OrderItem.order_id == order.id)).all()
-            )
-        
-        # Get all items for removed count calculation
-        all_items = session.exec(select(models.OrderItem).where(models.OrderItem.order_id == order.id)).all()
-        
+            computed_status = compute_order_status_from_items(all_items)
+
         # Calculate total from active items only (exclude items removed by customer OR staff, and cancelled)
         active_items = [
             item for item in all_items
@@ -4635,6 +4964,27 @@ def list_orders(
     return result
 
 
+@app.get("/kitchen/queue")
+def get_kitchen_queue(
+    current_user: Annotated[models.User, Depends(require_permission(Permission.ORDER_READ))],
+    station: str | None = Query(None, description="Only this station: kitchen or bar"),
+    session: Session = Depends(get_session),
+) -> dict:
+    """
+    Pending and preparing items of open orders, grouped by product and notes, for
+    batch cooking. Displays apply kitchen_queue_delta events on the tenant channel.
+    """
+    if station is not None and station not in STATIONS:
+        raise HTTPException(status_code=400, detail=f"station must be one of: {', '.join(STATIONS)}")
+    now = datetime.now(timezone.utc)
+    groups = kitchen_queue.queue_groups(session, current_user.tenant_id, station)
+    return {
+        "station": station,
+        "generated_at": now.isoformat(),
+        "groups": [kitchen_queue.public(group, now) for group in groups],
+    }
+
+
 @app.put("/orders/{order_id}/status")
 def update_order_status(
     order_id: int,
@@ -4653,6 +5003,7 @@ def update_order_status(
         raise HTTPException(status_code=404, detail="Order not found")
     
     # Update order status
+    old_status = order.status
     order.status = status_update.status
     
     # For backward compatibility: if updating order-level status, update all active items
@@ -4693,6 +5044,10 @@ def update_order_status(
         "table_name": table.name if table else "Unknown",
         "status": order.status.value
     }, table_id=order.table_id)
+    # Cancelling puts the stock back; reopening a cancelled order deducts it again
+    if models.OrderStatus.cancelled in (old_status, order.status):
+        queue_inventory_sync(session, [item.id for item in items])
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {"status": "updated", "order_id": order.id, "new_status": order.status.value}
 
@@ -4737,6 +5092,7 @@ def mark_order_paid(
     
     session.add(order)
     session.commit()
+    metrics.record_payment(payment_data.payment_method)
     
     # Publish update
     table = session.exec(select(models.Table).where(models.Table.id == order.table_id)).first()
@@ -4816,6 +5172,9 @@ def update_order_item_status(
         "status": order.status.value if hasattr(order.status, 'value') else str(order.status),  # Include computed order status
         "table_name": table.name if table else "Unknown"
     }, table_id=order.table_id)
+    if models.OrderItemStatus.cancelled in (old_status, item.status):
+        queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {
         "status": "updated",
@@ -4888,6 +5247,7 @@ def reset_item_status(
         "status": order.status.value,
         "table_name": table.name if table else "Unknown"
     }, table_id=order.table_id)
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {
         "status": "reset",
@@ -4971,6 +5331,8 @@ def cancel_order_item_staff(
         "table_name": table.name if table else "Unknown",
         "new_total_cents": new_total
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {
         "status": "item_cancelled",
@@ -5055,6 +5417,8 @@ def update_order_item_staff(
         "table_name": table.name if table else "Unknown",
         "new_total_cents": new_total
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {
         "status": "item_updated",
@@ -5138,6 +5502,8 @@ def remove_order_item_staff(
         "table_name": table.name if table else "Unknown",
         "new_total_cents": new_total
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, current_user.tenant_id)
     
     return {
         "status": "item_removed",
@@ -5228,6 +5594,8 @@ def remove_order_item(
         "table_name": table.name,
         "new_total_cents": new_total
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, order.tenant_id)
     
     return {
         "status": "item_removed",
@@ -5320,6 +5688,8 @@ def update_order_item_quantity(
         "table_name": table.name,
         "new_total_cents": new_total
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id])
+    publish_kitchen_updates(session, order.tenant_id)
     
     return {
         "status": "item_updated",
@@ -5395,6 +5765,8 @@ def cancel_order(
         "table_name": table.name,
         "cancelled_items": len(items)
     }, table_id=order.table_id)
+    queue_inventory_sync(session, [item.id for item in items])
+    publish_kitchen_updates(session, order.tenant_id)
     
     return {
         "status": "order_cancelled",
@@ -5466,19 +5838,24 @@ def create_payment_intent(
             _get_stripe_currency_code(currency_symbol) or settings.stripe_currency
         ).lower()
 
+    stripe = _get_stripe()
     try:
         # Use tenant-specific Stripe key
-        intent = stripe.PaymentIntent.create(
-            amount=total_cents,
-            currency=stripe_currency,
-            api_key=stripe_secret_key,
-            metadata={
-                "order_id": str(order.id),
-                "table_id": str(table.id),
-                "tenant_id": str(order.tenant_id),
-            },
-            description=f"Order #{order.id} at {tenant.name} - {table.name}",
-        )
+        with (
+            metrics.stripe_call("payment_intent.create"),
+            tracing.span("stripe payment_intent.create", "client"),
+        ):
+            intent = stripe.PaymentIntent.create(
+                amount=total_cents,
+                currency=stripe_currency,
+                api_key=stripe_secret_key,
+                metadata={
+                    "order_id": str(order.id),
+                    "table_id": str(table.id),
+                    "tenant_id": str(order.tenant_id),
+                },
+                description=f"Order #{order.id} at {tenant.name} - {table.name}",
+            )
 
         return {
             "client_secret": intent.client_secret,
@@ -5528,10 +5905,15 @@ def confirm_payment(
         )
 
     # Verify payment with Stripe
+    stripe = _get_stripe()
     try:
-        intent = stripe.PaymentIntent.retrieve(
-            payment_intent_id, api_key=stripe_secret_key
-        )
+        with (
+            metrics.stripe_call("payment_intent.retrieve"),
+            tracing.span("stripe payment_intent.retrieve", "client"),
+        ):
+            intent = stripe.PaymentIntent.retrieve(
+                payment_intent_id, api_key=stripe_secret_key
+            )
         if intent.status != "succeeded":
             raise HTTPException(status_code=400, detail="Payment not completed")
 
@@ -5561,6 +5943,7 @@ def confirm_payment(
         order.notes = f"{order.notes or ''}\n[PAID: {payment_intent_id}]".strip()
         session.add(order)
         session.commit()
+        metrics.record_payment("stripe")
 
         # Notify tenant
         publish_order_update(order.tenant_id, {
@@ -0,0 +1,243 @@
+"""
+Prometheus metrics for the API backend, exposed at GET /metrics.
+
+- HTTP: request counts, latency and in-flight requests per method and route template
+  (`/menu/{table_token}`, not the raw path, so label cardinality stays bounded).
+- DB: connection pool gauges per engine (sync/async), checkout wait and timeouts.
+- Redis: command latency and errors (clients are wrapped in get_redis/get_async_redis).
+- Stripe: API call latency by operation and outcome.
+- Business counters: orders created, items added, payments confirmed, PIN failures.
+
+Under gunicorn each worker is a separate process; gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR so every worker writes its samples there and the scraped
+worker aggregates all of them (prometheus_client multiprocess mode).
+"""
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from .db import async_pool_metrics, get_pool_stats, pool_metrics
+
+UNMATCHED_ROUTE = "unmatched"
+POOL_REFRESH_SECONDS = 5.0
+
+# ---------------------------------------------------------------- HTTP
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"],
+    multiprocess_mode="livesum",
+)
+
+# ---------------------------------------------------------------- DB pool
+
+db_pool_connections = Gauge(
+    "db_pool_connections", "Connection pool state (summed over live workers)", ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection", ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+db_pool_checkout_timeouts_total = Counter(
+    "db_pool_checkout_timeouts_total", "DB connection checkouts that hit pool_timeout", ["engine"]
+)
+
+# ---------------------------------------------------------------- Redis / Stripe
+
+redis_command_duration_seconds = Histogram(
+    "redis_command_duration_seconds", "Redis command latency", ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+redis_errors_total = Counter("redis_errors_total", "Redis commands that raised", ["command"])
+
+stripe_request_duration_seconds = Histogram(
+    "stripe_request_duration_seconds", "Stripe API call latency", ["operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
+# ---------------------------------------------------------------- Business
+
+orders_created_total = Counter("orders_created_total", "Customer orders opened")
+order_items_added_total = Counter("order_items_added_total", "Order lines submitted by customers")
+payments_confirmed_total = Counter(
+    "payments_confirmed_total", "Orders marked as paid", ["method"]
+)
+pin_failures_total = Counter("pin_failures_total", "Orders rejected for a wrong or missing table PIN")
+
+# payment_method is free text on OrderMarkPaid; anything else is counted as "other"
+PAYMENT_METHODS = frozenset({"cash", "card", "card_terminal", "terminal", "stripe"})
+
+
+def record_payment(method: str | None) -> None:
+    payments_confirmed_total.labels(method if method in PAYMENT_METHODS else "other").inc()
+
+
+def _record_pool_wait(engine: str):
+    histogram = db_pool_checkout_wait_seconds.labels(engine)
+    timeouts = db_pool_checkout_timeouts_total.labels(engine)
+
+    def listener(seconds: float, timed_out: bool) -> None:
+        histogram.observe(seconds)
+        if timed_out:
+            timeouts.inc()
+
+    return listener
+
+
+pool_metrics.wait_listeners.append(_record_pool_wait("sync"))
+async_pool_metrics.wait_listeners.append(_record_pool_wait("async"))
+
+_POOL_STATES = ("size", "checked_out", "checked_in", "overflow")
+_pool_refreshed_at = 0.0
+
+
+def refresh_pool_gauges(force: bool = False) -> None:
+    """Copy this worker's pool gauges into Prometheus (at most every POOL_REFRESH_SECONDS)."""
+    global _pool_refreshed_at
+    now = time.monotonic()
+    if not force and now - _pool_refreshed_at < POOL_REFRESH_SECONDS:
+        return
+    _pool_refreshed_at = now
+    stats = get_pool_stats()
+    for engine, snapshot in (("sync", stats), ("async", stats["async"])):
+        for state in _POOL_STATES:
+            if state in snapshot:
+                db_pool_connections.labels(engine, state).set(snapshot[state])
+
+
+def route_label(scope) -> str:
+    """Route template the router matched (e.g. /menu/{table_token}), or "unmatched"."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording the HTTP metrics above for every request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500  # if the app raises before starting a response
+        in_progress = http_requests_in_progress.labels(method)
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router fills in scope["route"] while dispatching
+            route = route_label(scope)
+            http_request_duration_seconds.labels(method, route).observe(time.perf_counter() - start)
+            http_requests_total.labels(method, route, str(status)).inc()
+            in_progress.dec()
+            refresh_pool_gauges()
+
+
+def redis_command_name(args) -> str:
+    """Command name from execute_command() args, e.g. ("PUBLISH", ...) -> "PUBLISH"."""
+    name = args[0] if args else "UNKNOWN"
+    if isinstance(name, bytes):
+        name = name.decode(errors="replace")
+    return str(name).split(" ", 1)[0].upper()
+
+
+def _timed_redis(func, command_of):
+    """Wrap a (sync or async) redis call; command_of(args) gives the metric label."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            command = command_of(args)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                redis_errors_total.labels(command).inc()
+                raise
+            finally:
+                redis_command_duration_seconds.labels(command).observe(time.perf_counter() - start)
+    else:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            command = command_of(args)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                redis_errors_total.labels(command).inc()
+                raise
+            finally:
+                redis_command_duration_seconds.labels(command).observe(time.perf_counter() - start)
+    return timed
+
+
+def instrument_redis(client):
+    """
+    Time every command sent through a redis / redis.asyncio client (returns the client).
+    Pipelines are timed as one PIPELINE command per execute().
+    """
+    pipeline = client.pipeline
+
+    @functools.wraps(pipeline)
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        pipe.execute = _timed_redis(pipe.execute, lambda args: "PIPELINE")
+        return pipe
+
+    client.execute_command = _timed_redis(client.execute_command, redis_command_name)
+    client.pipeline = timed_pipeline
+    return client
+
+
+@contextmanager
+def stripe_call(operation: str):
+    """Time one Stripe API call: `with stripe_call("payment_intent.create"): ...`."""
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        stripe_request_duration_seconds.labels(operation, outcome).observe(time.perf_counter() - start)
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition-format body and content type for GET /metrics."""
+    refresh_pool_gauges(force=True)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
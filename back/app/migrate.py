@@ -8,22 +8,34 @@ in order. It tracks applied migrations in a schema_version table.
 Usage:
     python -m app.migrate
     python -m app.migrate --check  # Only check, don't apply
+
+`python -m app.migrate` is the deploy step: it creates missing model tables and
+applies pending migrations while holding a Postgres advisory lock, so several
+processes (deploy job, gunicorn workers) never migrate concurrently. Workers that
+boot against an up-to-date database only run the cheap check in `schema_state`.
 """
 import argparse
 import logging
 import re
 import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+from sqlalchemy import Connection, inspect
 from sqlmodel import Session, SQLModel, text
 
-from app.db import engine
-from app.settings import settings
+from . import inventory_models, models  # noqa: F401  (register tables on SQLModel.metadata)
+from .db import engine
+from .settings import settings
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Key for pg_advisory_lock; any constant shared by every process of this app ("pos2")
+MIGRATION_LOCK_KEY = 0x706F7332
+
 
 class MigrationRunner:
     """Manages database migrations."""
@@ -286,10 +298,13 @@ class MigrationRunner:
             logger.error(f"Migration {version} failed: {e}")
             raise
 
-    def run_migrations(self, dry_run: bool = False) -> int:
+    def run_migrations(self, dry_run: bool = False, session: Session | None = None) -> int:
         """
         Run all pending migrations.
         
+        Args:
+            session: Optional session. If not provided, creates a new one.
+
         Returns:
             int: The current database version after migrations
         """
@@ -299,61 +314,143 @@ class MigrationRunner:
             logger.warning(f"Migrations directory not found: {migrations_dir}")
             return 0
 
-        with Session(engine) as session:
-            # Ensure version table exists
-            self.ensure_version_table(session)
+        if session is None:
+            with Session(engine) as session:
+                return self._run_migrations_internal(session, dry_run)
+        return self._run_migrations_internal(session, dry_run)
 
-            # Get current version
-            current_version = self._get_current_version_internal(session)
-            logger.info(f"Database schema version: {current_version}")
+    def _run_migrations_internal(self, session: Session, dry_run: bool) -> int:
+        """Internal method to apply pending migrations on a session."""
+        # Ensure version table exists
+        self.ensure_version_table(session)
 
-            # Get all migration files
-            migration_files = self.get_migration_files()
-            
-            if not migration_files:
-                logger.info("No migration files found")
-                return current_version
-            
-            # Log migration file details
-            logger.info(f"Found {len(migration_files)} migration file(s):")
-            for version, path in migration_files:
-                version_type = "timestamp" if len(str(version)) == 14 else "sequential"
-                status = "applied" if version <= current_version else "pending"
-                logger.info(f"  - {path.name} (version: {version}, type: {version_type}, status: {status})")
-
-            # Find pending migrations
-            pending = [
-                (version, path)
-                for version, path in migration_files
-                if version > current_version
-            ]
-
-            if not pending:
-                logger.info(f"Database is up to date (version {current_version})")
-                return current_version
-
-            logger.info(f"Found {len(pending)} pending migration(s)")
-
-            if dry_run:
-                logger.info("Pending migrations (dry run):")
-                for version, path in pending:
-                    version_type = "timestamp" if len(str(version)) == 14 else "sequential"
-                    logger.info(f"  - {version} ({version_type}): {path.name}")
-                return current_version
-
-            # Apply pending migrations
+        # Get current version
+        current_version = self._get_current_version_internal(session)
+        logger.info(f"Database schema version: {current_version}")
+
+        # Get all migration files
+        migration_files = self.get_migration_files()
+        
+        if not migration_files:
+            logger.info("No migration files found")
+            return current_version
+        
+        # Log migration file details
+        logger.info(f"Found {len(migration_files)} migration file(s):")
+        for version, path in migration_files:
+            version_type = "timestamp" if len(str(version)) == 14 else "sequential"
+            status = "applied" if version <= current_version else "pending"
+            logger.info(f"  - {path.name} (version: {version}, type: {version_type}, status: {status})")
+
+        # Find pending migrations
+        pending = [
+            (version, path)
+            for version, path in migration_files
+            if version > current_version
+        ]
+
+        if not pending:
+            logger.info(f"Database is up to date (version {current_version})")
+            return current_version
+
+        logger.info(f"Found {len(pending)} pending migration(s)")
+
+        if dry_run:
+            logger.info("Pending migrations (dry run):")
             for version, path in pending:
-                try:
-                    self.apply_migration(session, version, path)
-                except Exception as e:
-                    logger.error(f"Migration failed. Database may be in an inconsistent state.")
-                    logger.error(f"Last successful version: {current_version}")
-                    raise
+                version_type = "timestamp" if len(str(version)) == 14 else "sequential"
+                logger.info(f"  - {version} ({version_type}): {path.name}")
+            return current_version
+
+        # Apply pending migrations
+        for version, path in pending:
+            try:
+                self.apply_migration(session, version, path)
+            except Exception as e:
+                logger.error(f"Migration failed. Database may be in an inconsistent state.")
+                logger.error(f"Last successful version: {current_version}")
+                raise
+
+        # Get final version
+        final_version = self._get_current_version_internal(session)
+        logger.info(f"All migrations applied successfully: version {current_version} → {final_version}")
+        return final_version
+
+    def latest_version(self) -> int:
+        """Highest migration version on disk (0 if there are none)."""
+        return max((version for version, _path in self.get_migration_files()), default=0)
+
+    def schema_state(self, conn: Connection) -> tuple[int, bool]:
+        """
+        Cheap check used on every worker start: (current version, up to date?).
 
-            # Get final version
-            final_version = self._get_current_version_internal(session)
-            logger.info(f"All migrations applied successfully: version {current_version} → {final_version}")
-            return final_version
+        Up to date means schema_version has reached the newest migration file and
+        every model table exists. No DDL, no lock.
+        """
+        try:
+            current = conn.execute(
+                text(f"SELECT MAX(version) FROM {self.schema_version_table}")
+            ).scalar() or 0
+        except Exception:
+            conn.rollback()
+            return 0, False
+        missing_tables = set(SQLModel.metadata.tables) - set(inspect(conn).get_table_names())
+        return current, current >= self.latest_version() and not missing_tables
+
+    @contextmanager
+    def locked_connection(self) -> Iterator[Connection]:
+        """
+        Connection holding the migration advisory lock (Postgres; other dialects are
+        not locked). statement_timeout is lifted so waiting for the lock or a long
+        migration is not cancelled.
+        """
+        with engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                yield conn
+                return
+            conn.execute(text("SET statement_timeout = 0"))
+            wait_start = time.perf_counter()
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
+            waited = time.perf_counter() - wait_start
+            if waited > 0.5:
+                logger.info(f"Waited {waited:.1f}s for the migration lock")
+            try:
+                yield conn
+            finally:
+                try:
+                    conn.rollback()
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                    conn.execute(text("RESET statement_timeout"))
+                    conn.commit()
+                except Exception:
+                    # Closing the connection releases the session-level lock
+                    conn.invalidate()
+
+    def bootstrap(self, dry_run: bool = False) -> int:
+        """
+        Bring the schema up to date: create missing model tables, then apply
+        pending migrations. Returns immediately if the database is already
+        current; otherwise runs once across processes under the advisory lock.
+        """
+        with engine.connect() as conn:
+            current, up_to_date = self.schema_state(conn)
+        if up_to_date:
+            logger.info(f"Database schema is current (version {current})")
+            return current
+        if dry_run:
+            return self.run_migrations(dry_run=True)
+
+        with self.locked_connection() as conn:
+            # Another process may have migrated while we waited for the lock
+            current, up_to_date = self.schema_state(conn)
+            if up_to_date:
+                logger.info(f"Database schema is current (version {current})")
+                return current
+            SQLModel.metadata.create_all(conn)
+            conn.commit()
+            with Session(bind=conn) as session:
+                return self.run_migrations(session=session)
 
 
 def main():
@@ -391,9 +488,10 @@ def main():
     runner = MigrationRunner(migrations_dir)
     
     try:
-        version = runner.run_migrations(dry_run=args.check)
+        started = time.perf_counter()
+        version = runner.bootstrap(dry_run=args.check)
         if not args.check:
-            print(f"✅ Database schema version: {version}")
+            print(f"✅ Database schema version: {version} ({time.perf_counter() - started:.1f}s)")
     except Exception as e:
         logger.error(f"Migration runner failed: {e}")
         sys.exit(1)
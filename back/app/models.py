@@ -2,7 +2,7 @@ from datetime import date, datetime, time, timezone
 from enum import Enum
 from uuid import uuid4
 
-from sqlalchemy import Column, Date, Time
+from sqlalchemy import Column, Date, DateTime, Index, Time, UniqueConstraint
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -364,6 +364,63 @@ class OrderItem(SQLModel, table=True):
     order: Order = Relationship(back_populates="items")
 
 
+class SalesDailyRollup(TenantMixin, table=True):
+    """
+    Revenue per UTC day, kept in step with paid/completed orders (see app/sales_rollup.py).
+
+    Rows with a product_id are per (day, product, table, waiter). Rows with product_id
+    NULL are per (day, table, waiter) and carry the distinct order count, which cannot
+    be summed across products. Names and categories are resolved when reading.
+    """
+    __tablename__ = "sales_daily_rollup"
+    __table_args__ = (Index("idx_sales_daily_rollup_tenant_day", "tenant_id", "day"),)
+    id: int | None = Field(default=None, primary_key=True)
+    day: date = Field(sa_column=Column(Date, nullable=False))
+    product_id: int | None = None
+    product_name: str | None = None  # Snapshot, as on order items
+    table_id: int | None = None
+    waiter_id: int | None = None  # Table waiter, else floor default, when the slice was built
+    quantity: int = 0
+    revenue_cents: int = 0
+    order_count: int = 0
+
+
+class OrderItemStatusTransition(TenantMixin, table=True):
+    """
+    Append-only log of order item status changes (see app/item_status_log.py).
+
+    One row per change, written in the same flush as the item; from_status is NULL
+    for the row recorded when the item is created. No foreign keys: the log outlives
+    items and orders that are deleted (e.g. empty orders when a table is closed).
+    """
+    __tablename__ = "order_item_status_transition"
+    __table_args__ = (
+        Index("idx_item_status_transition_tenant_changed", "tenant_id", "changed_at"),
+        Index("idx_item_status_transition_item", "item_id"),
+    )
+    id: int | None = Field(default=None, primary_key=True)
+    order_id: int
+    item_id: int
+    from_status: OrderItemStatus | None = None
+    to_status: OrderItemStatus
+    changed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    user_id: int | None = None  # Staff member, when the item records one for this status
+
+
+class ProductPrepStats(TenantMixin, table=True):
+    """
+    Exponentially weighted mean preparation time (preparing -> ready) per product,
+    updated on every item that reaches ready (see app/prep_eta.py).
+    """
+    __tablename__ = "product_prep_stats"
+    __table_args__ = (UniqueConstraint("tenant_id", "product_id", name="uq_product_prep_stats_tenant_product"),)
+    id: int | None = Field(default=None, primary_key=True)
+    product_id: int
+    ewma_seconds: float
+    samples: int = 0
+    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
 # Request/Response Models
 class UserRegister(SQLModel):
     tenant_name: str
@@ -512,6 +569,13 @@ class OrderMarkPaid(SQLModel):
     payment_method: str = "cash"  # 'cash', 'terminal', 'stripe', etc.
 
 
+class ReportJobCreate(SQLModel):
+    from_date: date
+    to_date: date
+    format: str = "json"  # 'json' (the /reports/sales payload), 'csv' or 'xlsx'
+    report: str = "summary"  # For csv/xlsx, as in /reports/export: summary, products, ..., lines
+
+
 class OrderItemStaffUpdate(SQLModel):
     quantity: int | None = None
     notes: str | None = None
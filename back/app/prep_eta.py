@@ -0,0 +1,198 @@
+"""
+Ready-time estimates for open orders.
+
+Per product, product_prep_stats keeps an exponentially weighted mean of how long
+items take from preparing to ready. An after_flush hook folds in every item that
+reaches ready, with one upsert per product, so the statistics never need a scan of
+history. The mean weighs the latest sample by EWMA_ALPHA, so it follows changes in
+kitchen staffing or recipes within a service.
+
+The estimate for an order comes from one query over the tenant's open items
+(pending or preparing) with their station and mean, in O(items):
+
+- an item being prepared is ready when its mean has elapsed since it started;
+- a pending item waits for the work queued ahead of it at its station (items being
+  prepared, plus pending items of older orders), shared by the station's
+  ETA_STATION_CAPACITY parallel cooks, then takes its mean.
+
+The order is ready when its last item is. Products without samples yet use
+DEFAULT_PREP_SECONDS for their station.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import select
+
+from . import models
+from .settings import settings
+from .stations import BAR, KITCHEN, station_expr
+
+# Weight of the newest sample in the moving mean
+EWMA_ALPHA = 0.2
+# Longer than this from preparing to ready: the item was forgotten, not cooked
+MAX_SAMPLE_SECONDS = 3 * 3600
+DEFAULT_PREP_SECONDS = {KITCHEN: 600.0, BAR: 120.0}
+
+# Items waiting for a station: pending or preparing, in orders not yet closed (also
+# the kitchen queue, see kitchen_queue.py)
+OPEN_ORDER_EXCLUDED = [models.OrderStatus.paid, models.OrderStatus.completed, models.OrderStatus.cancelled]
+QUEUED = [models.OrderItemStatus.pending, models.OrderItemStatus.preparing]
+
+
+def aware(value: datetime) -> datetime:
+    # sqlite returns naive datetimes; everything is stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# ------------------------------------------------------------ statistics
+
+
+def _prep_sample(item: models.OrderItem, now: datetime) -> float | None:
+    """Seconds from preparing to ready when this flush moves the item from one to the other."""
+    state = inspect(item)
+    status = state.attrs.status.history
+    if status.added != [models.OrderItemStatus.ready] or status.deleted != [models.OrderItemStatus.preparing]:
+        return None
+    timestamp = state.attrs.status_updated_at.history
+    if not timestamp.deleted or timestamp.deleted[0] is None:
+        return None
+    finished = item.status_updated_at if timestamp.added and item.status_updated_at else now
+    seconds = (aware(finished) - aware(timestamp.deleted[0])).total_seconds()
+    return seconds if 0 < seconds <= MAX_SAMPLE_SECONDS else None
+
+
+def _upsert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def _record_samples(session: OrmSession, flush_context) -> None:
+    now = datetime.now(timezone.utc)
+    samples = defaultdict(list)
+    with session.no_autoflush:
+        for obj in session.dirty:
+            if not isinstance(obj, models.OrderItem):
+                continue
+            seconds = _prep_sample(obj, now)
+            if seconds is None:
+                continue
+            order = session.get(models.Order, obj.order_id)
+            if order is not None:
+                samples[(order.tenant_id, obj.product_id)].append(seconds)
+    if not samples:
+        return
+    conn = session.connection()
+    stats = models.ProductPrepStats.__table__
+    insert = _upsert(conn.dialect.name)
+    for (tenant_id, product_id), values in sorted(samples.items()):
+        # k samples at once: the same as folding in k samples of their mean
+        decay = (1 - EWMA_ALPHA) ** len(values)
+        statement = insert(stats).values(
+            tenant_id=tenant_id, product_id=product_id, ewma_seconds=sum(values) / len(values),
+            samples=len(values), updated_at=now,
+        )
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[stats.c.tenant_id, stats.c.product_id],
+            set_={
+                "ewma_seconds": stats.c.ewma_seconds * decay + statement.excluded.ewma_seconds * (1 - decay),
+                "samples": stats.c.samples + statement.excluded.samples,
+                "updated_at": statement.excluded.updated_at,
+            },
+        ))
+
+
+# Registered on the Session class, like the hooks in sales_rollup.py
+event.listen(OrmSession, "after_flush", _record_samples)
+
+
+# ------------------------------------------------------------ estimates
+
+
+def _open_items(session: OrmSession, tenant_id: int):
+    stats = models.ProductPrepStats
+    return session.execute(
+        select(
+            models.OrderItem.id,
+            models.OrderItem.order_id,
+            models.Order.table_id,
+            models.OrderItem.status,
+            models.OrderItem.status_updated_at,
+            station_expr(),
+            stats.ewma_seconds,
+        )
+        .join(models.Order, models.Order.id == models.OrderItem.order_id)
+        .outerjoin(models.Product, models.Product.id == models.OrderItem.product_id)
+        .outerjoin(stats, and_(stats.tenant_id == models.Order.tenant_id,
+                               stats.product_id == models.OrderItem.product_id))
+        .where(models.Order.tenant_id == tenant_id)
+        .where(models.Order.status.not_in(OPEN_ORDER_EXCLUDED))
+        .where(models.OrderItem.status.in_(QUEUED))
+        .where(models.OrderItem.removed_by_customer == False)
+        .order_by(models.OrderItem.order_id)
+    ).all()
+
+
+def estimate(rows, now: datetime, capacity: int) -> dict[int, dict]:
+    """
+    {order_id: estimate} from open item rows sorted by order id (see _open_items).
+
+    An estimate has table_id, estimated_ready_at, estimated_wait_seconds and
+    items ({item_id: ready at}), times as aware UTC datetimes.
+    """
+    capacity = max(1, capacity)
+    # Work already under way at each station, then pending work in order of arrival
+    busy = defaultdict(float)
+    for row in rows:
+        if row.status == models.OrderItemStatus.preparing:
+            busy[row.station] += max(_mean(row) - _elapsed(row, now), 0.0)
+    queued = defaultdict(float)
+    estimates = {}
+    order_pending = defaultdict(float)
+    current = None
+    for row in rows:
+        if row.order_id != current:
+            # Items of the previous order now count as queued ahead of later orders
+            for station, seconds in order_pending.items():
+                queued[station] += seconds
+            order_pending.clear()
+            current = row.order_id
+        mean = _mean(row)
+        if row.status == models.OrderItemStatus.preparing:
+            wait = max(mean - _elapsed(row, now), 0.0)
+        else:
+            wait = (busy[row.station] + queued[row.station]) / capacity + mean
+            order_pending[row.station] += mean
+        ready_at = now + timedelta(seconds=round(wait))
+        estimate = estimates.setdefault(row.order_id, {"table_id": row.table_id, "items": {}})
+        estimate["items"][row.id] = ready_at
+    for estimate in estimates.values():
+        ready_at = max(estimate["items"].values())
+        estimate["estimated_ready_at"] = ready_at
+        estimate["estimated_wait_seconds"] = int((ready_at - now).total_seconds())
+    return estimates
+
+
+def _mean(row) -> float:
+    return row.ewma_seconds if row.ewma_seconds is not None else DEFAULT_PREP_SECONDS[row.station]
+
+
+def _elapsed(row, now: datetime) -> float:
+    return (now - aware(row.status_updated_at)).total_seconds() if row.status_updated_at else 0.0
+
+
+def order_etas(session: OrmSession, tenant_id: int, now: datetime | None = None) -> dict[int, dict]:
+    """Estimates for all open orders of a tenant (one query); orders with nothing left to prepare are absent."""
+    return estimate(_open_items(session, tenant_id), now or datetime.now(timezone.utc),
+                    settings.eta_station_capacity)
+
+
+def public(estimate: dict | None) -> dict:
+    """Fields added to an order in API responses and eta_update events."""
+    if estimate is None:
+        return {"estimated_ready_at": None, "estimated_wait_seconds": None}
+    return {
+        "estimated_ready_at": estimate["estimated_ready_at"].isoformat(),
+        "estimated_wait_seconds": estimate["estimated_wait_seconds"],
+    }
@@ -0,0 +1,138 @@
+"""
+Per-request SQL statistics and N+1 detection.
+
+SQLAlchemy cursor events on every Engine (sync and async) feed a RequestQueryStats
+object held in a ContextVar for the duration of an HTTP request. The ASGI middleware
+reports it in a `Server-Timing` header and, outside production, logs a warning when
+one statement shape runs more than `settings.n_plus_one_warn_threshold` times in a
+single request, which is what an N+1 loop looks like from traffic.
+
+Sync endpoints run in the threadpool with a copy of the request context, so they
+record into the same (mutable) stats object.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+_SELECT_COLUMNS = re.compile(r"^SELECT .+? FROM ")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL string so calls that differ only in parameters compare equal."""
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("?", shape)  # IN (?, ?, ?) -> IN (?)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """Queries executed while serving one request."""
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0  # seconds spent in cursor.execute
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes executed more than `threshold` times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def current_stats() -> RequestQueryStats | None:
+    """Stats for the request being served, or None outside a request."""
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time so the
+    # next query on this (pooled) connection is not timed from it
+    conn = exception_context.connection
+    if conn is not None and not conn.closed:
+        starts = conn.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: collect RequestQueryStats per HTTP request (see module docstring)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not settings.query_stats_active:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                # Streaming responses send headers first; their totals cover work done so far
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._warn_repeated(scope, stats)
+
+    @staticmethod
+    def _warn_repeated(scope, stats: RequestQueryStats) -> None:
+        threshold = settings.n_plus_one_warn_threshold
+        if settings.is_production or threshold <= 0:
+            return
+        for shape, n in stats.repeated(threshold):
+            # Drop the column list so the FROM/WHERE part that identifies the loop is visible
+            shape = _SELECT_COLUMNS.sub("SELECT ... FROM ", shape)
+            logger.warning(
+                f"Possible N+1: {scope.get('method')} {scope.get('path')} ran the same statement "
+                f"{n} times ({stats.count} queries, {stats.duration * 1000:.1f} ms): {shape[:300]}"
+            )
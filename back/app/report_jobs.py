@@ -0,0 +1,306 @@
+"""
+Background report jobs: compute a report or export outside the HTTP request.
+
+POST /reports/jobs stores a job file and hands the work to a thread pool in the
+worker that received it; GET /reports/jobs/{id} reads the job file, so any worker
+can answer the poll; the finished artifact is downloaded from the same directory.
+
+Everything lives in one directory (REPORT_JOBS_DIR), which all workers serving
+/reports must share:
+
+    job-<job_id>.json  job state (status, progress, timestamps, artifact name)
+    <job_id>.<ext>     the artifact once done
+    key-<hash>         id of the in-flight job for one (tenant, parameters)
+
+The key file is created atomically with os.link once the job file exists, so
+identical concurrent requests (even from different workers) attach to the same job. It is removed when the job
+ends. The process holding a queued or running job rewrites its updated_at every
+HEARTBEAT_INTERVAL; a job not heard from for STALE_AFTER (process died) is
+reported as interrupted and its key taken over. Jobs still queued when a process
+shuts down are failed at once.
+Finished jobs and their artifacts are deleted REPORT_JOB_TTL_SECONDS after they end.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# A running job rewrites its file at least this often while it makes progress
+PROGRESS_INTERVAL = 1.0
+# Queued and running jobs are rewritten at least this often by their process...
+HEARTBEAT_INTERVAL = 60
+# ...so a job not heard from for this long has lost its process
+STALE_AFTER = 600
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_heartbeat_stop: threading.Event | None = None
+# Queued and running jobs of this process, by id; the worker thread and the heartbeat
+# write the same dict, under _job_lock
+_active: dict[str, dict] = {}
+_job_lock = threading.RLock()
+
+
+class JobNotFound(LookupError):
+    pass
+
+
+def jobs_dir() -> Path:
+    path = Path(settings.report_jobs_dir or Path(__file__).parent.parent / "report_jobs")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _job_path(job_id: str) -> Path:
+    # Ids are uuid4 hex; anything else never names a file here
+    if len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+        raise JobNotFound(job_id)
+    return jobs_dir() / f"job-{job_id}.json"
+
+
+def _write_job(job: dict) -> None:
+    """Replace the job file atomically, so readers never see a partial one."""
+    fd, tmp = tempfile.mkstemp(dir=jobs_dir(), prefix=".job-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp, _job_path(job["id"]))
+
+
+def _read_job(job_id: str) -> dict | None:
+    try:
+        return json.loads(_job_path(job_id).read_text())
+    except (FileNotFoundError, JobNotFound, json.JSONDecodeError):
+        return None
+
+
+def _update(job: dict, **changes) -> dict:
+    with _job_lock:
+        job.update(changes, updated_at=_now().isoformat())
+        _write_job(job)
+    return job
+
+
+def _is_stale(job: dict) -> bool:
+    if job["status"] in (QUEUED, RUNNING):
+        return _now() - datetime.fromisoformat(job["updated_at"]) > timedelta(seconds=STALE_AFTER)
+    return False
+
+
+def _key_path(tenant_id: int, kind: str, params: dict) -> Path:
+    key = json.dumps([tenant_id, kind, params], sort_keys=True)
+    return jobs_dir() / f"key-{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+
+
+def _claim_key(key_path: Path, job_id: str) -> bool:
+    """Point the key at job_id unless it already exists (atomic, across processes)."""
+    fd, tmp = tempfile.mkstemp(dir=key_path.parent, prefix=".key-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(job_id)
+        os.link(tmp, key_path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.unlink(tmp)
+
+
+def _release_key(key_path: Path, job_id: str) -> None:
+    try:
+        if key_path.read_text() == job_id:
+            key_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def public(job: dict) -> dict:
+    """Job state as returned by the API."""
+    return {k: v for k, v in job.items() if k not in ("tenant_id", "key", "artifact")}
+
+
+def get(job_id: str, tenant_id: int) -> dict:
+    """Current state of a tenant's job; raises JobNotFound for unknown, expired or foreign jobs."""
+    job = _read_job(job_id)
+    if job is None or job["tenant_id"] != tenant_id:
+        raise JobNotFound(job_id)
+    if job["status"] in (QUEUED, RUNNING) and _is_stale(job):
+        job = _finish(job, FAILED, error="Job was interrupted; please request it again")
+    return job
+
+
+def artifact_path(job: dict) -> Path:
+    return jobs_dir() / job["artifact"]
+
+
+def _finish(job: dict, status: str, **changes) -> dict:
+    ended = _now()
+    with _job_lock:
+        _active.pop(job["id"], None)
+        job = _update(job, status=status, finished_at=ended.isoformat(),
+                      expires_at=(ended + timedelta(seconds=settings.report_job_ttl_seconds)).isoformat(), **changes)
+    _release_key(jobs_dir() / job["key"], job["id"])
+    return job
+
+
+def purge_expired() -> int:
+    """Delete jobs (and artifacts) past their expiry; returns how many were removed."""
+    removed = 0
+    now = _now()
+    for path in jobs_dir().glob("job-*.json"):
+        job = _read_job(path.stem.removeprefix("job-"))
+        if job is None:
+            continue
+        if job["status"] in (QUEUED, RUNNING) and _is_stale(job):
+            job = _finish(job, FAILED, error="Job was interrupted; please request it again")
+        if job.get("expires_at") and datetime.fromisoformat(job["expires_at"]) <= now:
+            if job.get("artifact"):
+                (jobs_dir() / job["artifact"]).unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def _heartbeat(stop: threading.Event) -> None:
+    """Refresh updated_at of this process's queued and running jobs, so they are not taken for stale."""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        with _job_lock:
+            for job in list(_active.values()):
+                try:
+                    _update(job)
+                except OSError:
+                    logger.warning("Could not refresh report job %s", job["id"], exc_info=True)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _heartbeat_stop
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.report_job_workers), thread_name_prefix="report-job"
+            )
+            _heartbeat_stop = threading.Event()
+            threading.Thread(
+                target=_heartbeat, args=(_heartbeat_stop,), name="report-job-heartbeat", daemon=True
+            ).start()
+        return _executor
+
+
+def _on_done(job: dict, future) -> None:
+    # Cancelled by shutdown before it started: fail it now rather than leave it queued
+    if future.cancelled():
+        _finish(job, FAILED, error="Job was interrupted; please request it again")
+
+
+def shutdown(wait: bool = False) -> None:
+    """Stop taking jobs in this process; queued ones are failed, running ones finish unless the process exits."""
+    global _executor, _heartbeat_stop
+    with _executor_lock:
+        executor, _executor = _executor, None
+        stop, _heartbeat_stop = _heartbeat_stop, None
+    if stop is not None:
+        stop.set()
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _new_job(tenant_id: int, kind: str, params: dict, key: str) -> dict:
+    created = _now().isoformat()
+    return {
+        "id": uuid4().hex,
+        "tenant_id": tenant_id,
+        "kind": kind,
+        "params": params,
+        "key": key,
+        "status": QUEUED,
+        "progress": 0.0,
+        "rows": None,
+        "created_at": created,
+        "updated_at": created,
+        "started_at": None,
+        "finished_at": None,
+        "expires_at": None,
+        "artifact": None,
+        "error": None,
+    }
+
+
+# work(artifact_path, progress) writes the artifact and returns extra job fields
+# (e.g. rows); progress(done, total=None) may be called as often as convenient.
+Work = Callable[[Path, Callable[..., None]], dict[str, Any]]
+
+
+def submit(tenant_id: int, kind: str, params: dict, extension: str, work: Work) -> tuple[dict, bool]:
+    """
+    Start a job, or return the in-flight job for the same tenant, kind and params.
+
+    Returns (job, deduplicated).
+    """
+    purge_expired()
+    key_path = _key_path(tenant_id, kind, params)
+    for _ in range(3):
+        # The job file exists before the key points at it, so whoever reads the key finds the job
+        job = _new_job(tenant_id, kind, params, key_path.name)
+        _write_job(job)
+        if _claim_key(key_path, job["id"]):
+            break
+        _job_path(job["id"]).unlink(missing_ok=True)
+        try:
+            running_id = key_path.read_text()
+        except FileNotFoundError:
+            continue  # the other job just ended; try again
+        running = _read_job(running_id)
+        if running is not None and running["status"] in (QUEUED, RUNNING) and not _is_stale(running):
+            return running, True
+        if running is not None and running["status"] in (QUEUED, RUNNING):
+            _finish(running, FAILED, error="Job was interrupted; please request it again")
+        else:
+            _release_key(key_path, running_id)  # its job ended, expired or is unreadable
+    else:
+        raise RuntimeError("Could not claim report job key")
+
+    active = dict(job)  # updated by the worker and the heartbeat; the caller gets its own copy
+    with _job_lock:
+        _active[job["id"]] = active
+    future = _get_executor().submit(_run, active, extension, work)
+    future.add_done_callback(lambda f: _on_done(active, f))
+    return job, False
+
+
+def _run(job: dict, extension: str, work: Work) -> None:
+    _update(job, status=RUNNING, started_at=_now().isoformat())
+    artifact = f"{job['id']}.{extension}"
+    last_write = time.monotonic()
+
+    def progress(done: int, total: int | None = None) -> None:
+        nonlocal last_write
+        if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+            last_write = time.monotonic()
+            _update(job, rows=done, progress=round(min(done / total, 0.99), 3) if total else job["progress"])
+
+    started = time.perf_counter()
+    try:
+        result = work(jobs_dir() / artifact, progress)
+    except Exception:
+        logger.exception("Report job %s failed", job["id"])
+        (jobs_dir() / artifact).unlink(missing_ok=True)
+        _finish(job, FAILED, error="Report generation failed")
+        return
+    _finish(job, DONE, progress=1.0, artifact=artifact, **result)
+    logger.info("Report job %s (%s) done in %.1fs", job["id"], job["kind"], time.perf_counter() - started)
@@ -3,184 +3,154 @@ Sales / Revenue Reports API
 
 Uses existing order and order_item data. Only paid/completed orders;
 excludes removed and cancelled items. For restaurant owner revenue analysis.
+Closed days are read from the daily rollup (app/sales_rollup.py); today is live.
 """
 
+import csv
+import io
+import itertools
+import json
+import tempfile
 from collections import defaultdict
-from datetime import date, datetime, timedelta, timezone
-from io import BytesIO
-from typing import Annotated
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Annotated, Callable, Iterable, Iterator
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import Integer, String, and_, case, cast, distinct, extract, func, union_all
 from sqlmodel import Session, select
 
-from . import models
+from . import models, report_jobs
 from .db import get_session
 from .permissions import Permission, require_permission
+from .sales_rollup import ROLLUP_COLUMNS, revenue_lines, rollup_rows
 from .security import get_current_user
+from .stations import station_expr
 
 router = APIRouter()
 
-# Order statuses we count as "revenue"
-REVENUE_STATUSES = {models.OrderStatus.paid, models.OrderStatus.completed}
-# Item statuses we exclude from revenue
-EXCLUDED_ITEM_STATUSES = {models.OrderItemStatus.cancelled}
 
+def _sales_facts(session: Session, tenant_id: int, from_date: date, to_date: date):
+    """
+    Subquery of rollup rows (see sales_rollup.ROLLUP_COLUMNS) for the date range.
 
-def _revenue_date(order: models.Order) -> datetime | None:
-    """Date used for attributing revenue (paid_at if set, else created_at)."""
-    return order.paid_at or order.created_at
+    Closed days (before today, UTC) come from sales_daily_rollup; today and later are
+    aggregated live from orders into the same shape, so every breakdown is one query.
+    """
+    today = datetime.now(timezone.utc).date()
+    parts = []
+    if from_date < today:
+        rollup = models.SalesDailyRollup
+        parts.append(
+            select(*(getattr(rollup, name) for name in ROLLUP_COLUMNS))
+            .where(rollup.tenant_id == tenant_id)
+            .where(rollup.day >= from_date)
+            .where(rollup.day <= min(to_date, today - timedelta(days=1)))
+        )
+    if to_date >= today:
+        dialect_name = session.get_bind().dialect.name
+        parts.extend(rollup_rows(revenue_lines(dialect_name, tenant_id, max(from_date, today), to_date)))
+    return union_all(*parts).subquery("facts")
 
 
-def _in_range(d: datetime | None, from_date: date, to_date: date) -> bool:
-    if not d:
-        return False
-    d_date = d.date() if hasattr(d, "date") else d
-    return from_date <= d_date <= to_date
+def _category():
+    return func.coalesce(func.nullif(models.Product.category, ""), "Uncategorized").label("category")
 
 
-def _get_revenue_items(
-    session: Session,
-    tenant_id: int,
-    from_date: date,
-    to_date: date,
-):
-    """Load orders and items that count toward revenue in the date range."""
-    orders = session.exec(
-        select(models.Order)
-        .where(models.Order.tenant_id == tenant_id)
-        .where(models.Order.status.in_([s.value for s in REVENUE_STATUSES]))
-        .order_by(models.Order.created_at.asc())
-    ).all()
+def _table_name():
+    return func.coalesce(models.Table.name, "Unknown").label("table_name")
 
-    result = []
-    for order in orders:
-        rev_date = _revenue_date(order)
-        if not _in_range(rev_date, from_date, to_date):
-            continue
-        items = session.exec(
-            select(models.OrderItem)
-            .where(models.OrderItem.order_id == order.id)
-            .where(models.OrderItem.removed_by_customer == False)
-            .where(models.OrderItem.status != models.OrderItemStatus.cancelled)
-        ).all()
-        table = session.get(models.Table, order.table_id)
-        waiter_id = None
-        waiter_name = None
-        if table:
-            waiter_id = table.assigned_waiter_id
-            if waiter_id is None and table.floor_id:
-                floor = session.get(models.Floor, table.floor_id)
-                if floor:
-                    waiter_id = floor.default_waiter_id
-            if waiter_id:
-                u = session.get(models.User, waiter_id)
-                waiter_name = (u.full_name or u.email) if u else str(waiter_id)
-        table_name = table.name if table else "Unknown"
-        for item in items:
-            product = session.get(models.Product, item.product_id)
-            category = (product.category or "Uncategorized") if product else "Uncategorized"
-            subcategory = (product.subcategory or "") if product else ""
-            result.append({
-                "order_id": order.id,
-                "date": rev_date,
-                "table_id": order.table_id,
-                "table_name": table_name,
-                "waiter_id": waiter_id,
-                "waiter_name": waiter_name or "Unassigned",
-                "product_id": item.product_id,
-                "product_name": item.product_name,
-                "category": category,
-                "subcategory": subcategory,
-                "quantity": item.quantity,
-                "price_cents": item.price_cents,
-                "revenue_cents": item.quantity * item.price_cents,
-            })
-    return result
+
+def _waiter_name(waiter_id):
+    """Waiter full name, else email, else id; "Unassigned" when there is none."""
+    return func.coalesce(
+        func.nullif(models.User.full_name, ""),
+        models.User.email,
+        cast(waiter_id, String),
+        "Unassigned",
+    ).label("waiter_name")
+
+
+def _grouped(session: Session, facts, keys: list, join=None, per_product: bool = False) -> list:
+    """
+    Revenue per `keys`, highest revenue first, plus quantity (from product rows) or
+    order_count (from order rows). `join` is an optional (target, onclause) outer join.
+    """
+    revenue = func.sum(facts.c.revenue_cents)
+    if per_product:
+        measure = func.sum(facts.c.quantity).label("quantity")
+        rows = facts.c.product_id.is_not(None)
+    else:
+        measure = func.sum(facts.c.order_count).label("order_count")
+        rows = facts.c.product_id.is_(None)
+    query = select(*keys, revenue.label("revenue_cents"), measure).select_from(facts)
+    if join is not None:
+        query = query.outerjoin(*join)
+    return session.exec(
+        query.where(rows).group_by(*keys).order_by(revenue.desc(), *keys)
+    ).all()
 
 
 def _build_report_payload(tenant_id: int, session: Session, from_date: date, to_date: date) -> dict:
     """Build full report dict for a tenant and date range."""
     if from_date > to_date:
         from_date, to_date = to_date, from_date
-    rows = _get_revenue_items(session, tenant_id, from_date, to_date)
-
-    # Summary by day
-    by_day: dict[str, dict] = defaultdict(lambda: {"revenue_cents": 0, "order_count": set()})
-    for r in rows:
-        day = r["date"].strftime("%Y-%m-%d") if hasattr(r["date"], "strftime") else str(r["date"])[:10]
-        by_day[day]["revenue_cents"] += r["revenue_cents"]
-        by_day[day]["order_count"].add(r["order_id"])
+    facts = _sales_facts(session, tenant_id, from_date, to_date)
+
+    # Summary by day; every order falls on exactly one day, so the totals add up
     summary_daily = [
-        {"date": d, "revenue_cents": data["revenue_cents"], "order_count": len(data["order_count"])}
-        for d, data in sorted(by_day.items())
+        {"date": str(row.day)[:10], "revenue_cents": int(row.revenue_cents), "order_count": int(row.order_count)}
+        for row in _grouped(session, facts, [facts.c.day])
     ]
-    total_revenue_cents = sum(r["revenue_cents"] for r in rows)
-    total_orders = len(set(r["order_id"] for r in rows))
-
-    # By product
-    by_product: dict[tuple[int, str], dict] = defaultdict(lambda: {"quantity": 0, "revenue_cents": 0, "category": ""})
-    for r in rows:
-        key = (r["product_id"], r["product_name"])
-        by_product[key]["quantity"] += r["quantity"]
-        by_product[key]["revenue_cents"] += r["revenue_cents"]
-        if not by_product[key]["category"]:
-            by_product[key]["category"] = r.get("category") or "Uncategorized"
+    summary_daily.sort(key=lambda d: d["date"])
+    total_revenue_cents = sum(d["revenue_cents"] for d in summary_daily)
+    total_orders = sum(d["order_count"] for d in summary_daily)
+
+    category = _category()
+    product_join = (models.Product, models.Product.id == facts.c.product_id)
     by_product_list = [
-        {"product_id": k[0], "product_name": k[1], "category": v["category"], "quantity": v["quantity"], "revenue_cents": v["revenue_cents"]}
-        for k, v in sorted(by_product.items(), key=lambda x: -x[1]["revenue_cents"])
+        {
+            "product_id": row.product_id,
+            "product_name": row.product_name,
+            "category": row.category,
+            "quantity": int(row.quantity),
+            "revenue_cents": int(row.revenue_cents),
+        }
+        for row in _grouped(
+            session, facts, [facts.c.product_id, facts.c.product_name, category], product_join, per_product=True
+        )
     ]
-
-    # By category
-    by_category: dict[str, dict] = defaultdict(lambda: {"quantity": 0, "revenue_cents": 0})
-    for r in rows:
-        c = r["category"] or "Uncategorized"
-        by_category[c]["quantity"] += r["quantity"]
-        by_category[c]["revenue_cents"] += r["revenue_cents"]
     by_category_list = [
-        {"category": k, "quantity": v["quantity"], "revenue_cents": v["revenue_cents"]}
-        for k, v in sorted(by_category.items(), key=lambda x: -x[1]["revenue_cents"])
+        {"category": row.category, "quantity": int(row.quantity), "revenue_cents": int(row.revenue_cents)}
+        for row in _grouped(session, facts, [category], product_join, per_product=True)
     ]
-
-    # By table
-    by_table: dict[str, dict] = defaultdict(lambda: {"revenue_cents": 0, "order_count": set()})
-    for r in rows:
-        t = r["table_name"]
-        by_table[t]["revenue_cents"] += r["revenue_cents"]
-        by_table[t]["order_count"].add(r["order_id"])
     by_table_list = [
-        {"table_name": k, "revenue_cents": v["revenue_cents"], "order_count": len(v["order_count"])}
-        for k, v in sorted(by_table.items(), key=lambda x: -x[1]["revenue_cents"])
+        {"table_name": row.table_name, "revenue_cents": int(row.revenue_cents), "order_count": int(row.order_count)}
+        for row in _grouped(session, facts, [_table_name()], (models.Table, models.Table.id == facts.c.table_id))
     ]
-
-    # By waiter
-    by_waiter: dict[str, dict] = defaultdict(lambda: {"revenue_cents": 0, "order_count": set()})
-    for r in rows:
-        w = r["waiter_name"]
-        by_waiter[w]["revenue_cents"] += r["revenue_cents"]
-        by_waiter[w]["order_count"].add(r["order_id"])
     by_waiter_list = [
-        {"waiter_name": k, "revenue_cents": v["revenue_cents"], "order_count": len(v["order_count"])}
-        for k, v in sorted(by_waiter.items(), key=lambda x: -x[1]["revenue_cents"])
+        {"waiter_name": row.waiter_name, "revenue_cents": int(row.revenue_cents), "order_count": int(row.order_count)}
+        for row in _grouped(
+            session, facts, [_waiter_name(facts.c.waiter_id)], (models.User, models.User.id == facts.c.waiter_id)
+        )
     ]
 
-    # Reservations in date range (by reservation_date); source = public (token set) vs staff (no token)
-    reservations = session.exec(
-        select(models.Reservation)
+    # Reservations in date range (by reservation_date); source = public (non-empty token) vs staff
+    token = models.Reservation.token
+    source = case((and_(token.is_not(None), token != ""), "public"), else_="staff")
+    count = func.count()
+    by_source = session.exec(
+        select(source.label("source"), count.label("count"))
         .where(models.Reservation.tenant_id == tenant_id)
         .where(models.Reservation.reservation_date >= from_date)
         .where(models.Reservation.reservation_date <= to_date)
+        .group_by(source)
+        .order_by(count.desc())
     ).all()
-    total_reservations = len(reservations)
-    by_source: dict[str, int] = defaultdict(int)
-    for r in reservations:
-        source = "public" if r.token else "staff"
-        by_source[source] += 1
     reservations_summary = {
-        "total": total_reservations,
-        "by_source": [
-            {"source": k, "count": v} for k, v in sorted(by_source.items(), key=lambda x: -x[1])
-        ],
+        "total": sum(row.count for row in by_source),
+        "by_source": [{"source": row.source, "count": row.count} for row in by_source],
     }
 
     return {
@@ -210,14 +180,463 @@ def get_sales_reports(
     return _build_report_payload(current_user.tenant_id, session, from_date, to_date)
 
 
-def _csv_stream(rows: list[dict], headers: list[str]) -> bytes:
-    import csv
-    buf = BytesIO()
+HEATMAP_SPLITS = ("none", "category", "station")
+
+
+def _tenant_zone(session: Session, tenant_id: int) -> ZoneInfo | timezone:
+    tenant = session.get(models.Tenant, tenant_id)
+    try:
+        return ZoneInfo(tenant.timezone) if tenant and tenant.timezone else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def _heatmap_cells(session: Session, tenant_id: int, tz, from_date: date, to_date: date, split: str) -> dict:
+    """
+    {(weekday, hour, group): [revenue_cents, order_count, item_count]} for local dates
+    from_date..to_date in `tz`; weekday is ISO (1 = Monday), group is None without split.
+
+    Postgres converts to local time and groups by (weekday, hour) itself. sqlite has no
+    time zones: it groups by UTC quarter-hour (offsets such as +05:45 exist) and the
+    few thousand buckets are moved to local time here. An order counts once per bucket
+    and lies in exactly one, so adding up bucket order counts is exact.
+    """
+    start = datetime.combine(from_date, time.min, tz).astimezone(timezone.utc)
+    end = datetime.combine(to_date + timedelta(days=1), time.min, tz).astimezone(timezone.utc)
+    dialect_name = session.get_bind().dialect.name
+    # UTC days covering the local range keep the index range scan; the exact bounds follow
+    lines = revenue_lines(dialect_name, tenant_id, start.date(), end.date())
+    groups = {"category": [_category()], "station": [station_expr()]}.get(split, [])
+
+    if dialect_name == "postgresql":
+        local_at = func.timezone(tz.key if isinstance(tz, ZoneInfo) else "UTC", lines.c.revenue_at)
+        buckets = [cast(extract("isodow", local_at), Integer).label("weekday"),
+                   cast(extract("hour", local_at), Integer).label("hour")]
+    else:
+        buckets = [func.strftime("%Y-%m-%d %H", lines.c.revenue_at).label("utc_hour"),
+                   (cast(func.strftime("%M", lines.c.revenue_at), Integer) // 15).label("quarter")]
+    # Bucket in a subquery so GROUP BY refers to plain columns (no repeated bound time zone)
+    bucketed = (
+        select(*buckets, *groups, lines.c.order_id, lines.c.quantity, lines.c.revenue_cents)
+        .select_from(lines)
+        .outerjoin(models.Product, models.Product.id == lines.c.product_id)
+        .where(lines.c.revenue_at >= start, lines.c.revenue_at < end)
+        .subquery("bucketed")
+    )
+    keys = [bucketed.c[b.name] for b in buckets] + [bucketed.c[g.name] for g in groups]
+    rows = session.exec(
+        select(
+            *keys,
+            func.sum(bucketed.c.revenue_cents).label("revenue_cents"),
+            func.count(distinct(bucketed.c.order_id)).label("order_count"),
+            func.sum(bucketed.c.quantity).label("item_count"),
+        ).group_by(*keys)
+    ).all()
+
+    cells = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        if dialect_name == "postgresql":
+            weekday, hour = row.weekday, row.hour
+        else:
+            utc_at = datetime.fromisoformat(f"{row.utc_hour}:00").replace(tzinfo=timezone.utc)
+            local = (utc_at + timedelta(minutes=15 * row.quarter)).astimezone(tz)
+            weekday, hour = local.isoweekday(), local.hour
+        cell = cells[(weekday, hour, row[len(buckets)] if groups else None)]
+        cell[0] += int(row.revenue_cents)
+        cell[1] += int(row.order_count)
+        cell[2] += int(row.item_count)
+    return cells
+
+
+@router.get("/heatmap")
+def get_sales_heatmap(
+    current_user: Annotated[models.User, Depends(require_permission(Permission.REPORT_READ))],
+    session: Session = Depends(get_session),
+    from_date: date = Query(..., description="Start date (YYYY-MM-DD), in the tenant's time zone"),
+    to_date: date = Query(..., description="End date (YYYY-MM-DD), in the tenant's time zone"),
+    split: str = Query("none", description="none, category or station"),
+) -> dict:
+    """
+    Revenue, orders and items per (weekday, hour) in the tenant's time zone.
+
+    Cells are sparse (only hours with sales), weekday is ISO (1 = Monday). With a
+    split, each cell is per category or station (bar / kitchen, from the product
+    category) and an order with items in several groups counts in each of them.
+    weekday_counts[i] is how often ISO weekday i+1 occurs in the range, for averages.
+    """
+    if split not in HEATMAP_SPLITS:
+        raise HTTPException(status_code=400, detail=f"split must be one of: {', '.join(HEATMAP_SPLITS)}")
+    if from_date > to_date:
+        from_date, to_date = to_date, from_date
+    tz = _tenant_zone(session, current_user.tenant_id)
+    cells = _heatmap_cells(session, current_user.tenant_id, tz, from_date, to_date, split)
+
+    days = (to_date - from_date).days + 1
+    weekday_counts = [
+        days // 7 + (1 if (weekday - from_date.isoweekday()) % 7 < days % 7 else 0) for weekday in range(1, 8)
+    ]
+    group_key = None if split == "none" else split
+    return {
+        "from_date": from_date.isoformat(),
+        "to_date": to_date.isoformat(),
+        "timezone": tz.key if isinstance(tz, ZoneInfo) else "UTC",
+        "split": split,
+        "weekday_counts": weekday_counts,
+        "cells": [
+            {
+                "weekday": weekday,
+                "hour": hour,
+                **({group_key: group} if group_key else {}),
+                "revenue_cents": revenue_cents,
+                "order_count": order_count,
+                "item_count": item_count,
+            }
+            for (weekday, hour, group), (revenue_cents, order_count, item_count) in sorted(
+                cells.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or "")
+            )
+        ],
+    }
+
+
+PREP_GROUPS = ("product", "category", "station", "hour")
+PREP_STAGES = ("preparing", "ready", "delivered")
+PREP_PERCENTILES = (0.5, 0.9, 0.99)
+# Log rows read past the range end, so items ordered late on the last day still finish
+PREP_WINDOW = timedelta(days=1)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Linear interpolation between closest ranks of sorted `values`, as Postgres percentile_cont."""
+    position = q * (len(values) - 1)
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def _prep_stats(durations: dict[str, list[float]]) -> dict:
+    stats = {}
+    for stage in PREP_STAGES:
+        values = sorted(durations[stage])
+        stats[f"to_{stage}"] = {
+            "count": len(values),
+            **{f"p{round(q * 100)}": round(_percentile(values, q), 1) if values else None for q in PREP_PERCENTILES},
+        }
+    return stats
+
+
+def _prep_times(session: Session, tenant_id: int, tz, from_date: date, to_date: date, group_by: str) -> list[dict]:
+    """
+    Seconds from ordering an item to it first reaching each stage, as percentiles per group.
+
+    Items are taken from the status transition log (app/item_status_log.py) by the
+    local day they were ordered: their creation row, else the order time for items
+    logged only after they were created. Postgres computes the percentiles
+    (percentile_cont) per group; sqlite has neither those nor time zones, so it
+    returns the per-item durations and they are aggregated here.
+    """
+    start = datetime.combine(from_date, time.min, tz).astimezone(timezone.utc)
+    end = datetime.combine(to_date + timedelta(days=1), time.min, tz).astimezone(timezone.utc)
+    dialect_name = session.get_bind().dialect.name
+    log = models.OrderItemStatusTransition
+
+    def first(condition):
+        return func.min(case((condition, log.changed_at)))
+
+    item_times = (
+        select(
+            log.item_id,
+            first(log.from_status.is_(None)).label("ordered_at"),
+            *(first(log.to_status == stage).label(f"{stage}_at") for stage in PREP_STAGES),
+        )
+        .where(log.tenant_id == tenant_id)
+        .where(log.changed_at >= start, log.changed_at < end + PREP_WINDOW)
+        .group_by(log.item_id)
+        .subquery("item_times")
+    )
+    ordered_at = func.coalesce(item_times.c.ordered_at, models.Order.created_at)
+
+    def seconds(stage):
+        reached = item_times.c[f"{stage}_at"]
+        if dialect_name == "postgresql":
+            elapsed = extract("epoch", reached - ordered_at)
+        else:
+            elapsed = (func.julianday(reached) - func.julianday(ordered_at)) * 86400
+        # Clock skew or a reset before the creation row: not a usable duration
+        return case((elapsed >= 0, elapsed)).label(stage)
+
+    if group_by == "product":
+        groups = [models.OrderItem.product_id, models.OrderItem.product_name]
+    elif group_by == "category":
+        groups = [_category()]
+    elif group_by == "station":
+        groups = [station_expr()]
+    elif dialect_name == "postgresql":
+        tz_name = tz.key if isinstance(tz, ZoneInfo) else "UTC"
+        groups = [cast(extract("hour", func.timezone(tz_name, ordered_at)), Integer).label("hour")]
+    else:
+        groups = [ordered_at.label("ordered_at")]
+    # Durations and keys in a subquery so GROUP BY refers to plain columns
+    per_item = (
+        select(*groups, *(seconds(stage) for stage in PREP_STAGES))
+        .select_from(item_times)
+        .join(models.OrderItem, models.OrderItem.id == item_times.c.item_id)
+        .join(models.Order, models.Order.id == models.OrderItem.order_id)
+        .outerjoin(models.Product, models.Product.id == models.OrderItem.product_id)
+        .where(ordered_at >= start, ordered_at < end)
+        .subquery("per_item")
+    )
+    keys = [per_item.c[g.name] for g in groups]
+
+    if dialect_name == "postgresql":
+        rows = session.exec(
+            select(
+                *keys,
+                func.count().label("items"),
+                *(func.count(per_item.c[stage]).label(f"{stage}_count") for stage in PREP_STAGES),
+                *(
+                    func.percentile_cont(q).within_group(per_item.c[stage]).label(f"{stage}_p{round(q * 100)}")
+                    for stage in PREP_STAGES
+                    for q in PREP_PERCENTILES
+                ),
+            ).group_by(*keys)
+        ).all()
+        results = [
+            (
+                tuple(row[:len(keys)]),
+                row._mapping["items"],
+                {
+                    f"to_{stage}": {
+                        "count": row._mapping[f"{stage}_count"],
+                        **{
+                            f"p{round(q * 100)}": (
+                                None if (value := row._mapping[f"{stage}_p{round(q * 100)}"]) is None
+                                else round(float(value), 1)
+                            )
+                            for q in PREP_PERCENTILES
+                        },
+                    }
+                    for stage in PREP_STAGES
+                },
+            )
+            for row in rows
+        ]
+    else:
+        durations = defaultdict(lambda: {stage: [] for stage in PREP_STAGES})
+        counts = defaultdict(int)
+        for row in session.exec(select(*per_item.c)).all():
+            key = tuple(row[:len(keys)])
+            if group_by == "hour":
+                local = row.ordered_at if row.ordered_at.tzinfo else row.ordered_at.replace(tzinfo=timezone.utc)
+                key = (local.astimezone(tz).hour,)
+            counts[key] += 1
+            for stage in PREP_STAGES:
+                if row._mapping[stage] is not None:
+                    durations[key][stage].append(float(row._mapping[stage]))
+        results = [(key, items, _prep_stats(durations[key])) for key, items in counts.items()]
+
+    names = ["product_id", "product_name"] if group_by == "product" else [group_by]
+    if group_by == "hour":
+        results.sort(key=lambda r: r[0])
+    else:
+        # Slowest to the pass first: these are the dishes to look at during rush
+        results.sort(key=lambda r: (r[2]["to_ready"]["p90"] is None, -(r[2]["to_ready"]["p90"] or 0), -r[1]))
+    return [{**dict(zip(names, key)), "items": items, **stats} for key, items, stats in results]
+
+
+@router.get("/prep-times")
+def get_prep_times(
+    current_user: Annotated[models.User, Depends(require_permission(Permission.REPORT_READ))],
+    session: Session = Depends(get_session),
+    from_date: date = Query(..., description="Start date (YYYY-MM-DD), in the tenant's time zone"),
+    to_date: date = Query(..., description="End date (YYYY-MM-DD), in the tenant's time zone"),
+    group_by: str = Query("product", description="product, category, station or hour"),
+) -> dict:
+    """
+    Kitchen SLA: p50/p90/p99 seconds from order to preparing, ready and delivered.
+
+    Each group reports how many items were ordered and, per stage, how many reached
+    it and the percentiles of the time it took. `hour` is the local hour of ordering.
+    """
+    if group_by not in PREP_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(PREP_GROUPS)}")
+    if from_date > to_date:
+        from_date, to_date = to_date, from_date
+    tz = _tenant_zone(session, current_user.tenant_id)
+    return {
+        "from_date": from_date.isoformat(),
+        "to_date": to_date.isoformat(),
+        "timezone": tz.key if isinstance(tz, ZoneInfo) else "UTC",
+        "group_by": group_by,
+        "groups": _prep_times(session, current_user.tenant_id, tz, from_date, to_date, group_by),
+    }
+
+
+# Accountant export: one row per counted order item (report=lines)
+LINE_HEADERS = [
+    "date", "revenue_at_utc", "order_id", "item_id", "table_name", "waiter_name", "product_id",
+    "product_name", "category", "quantity", "unit_price_cents", "revenue_cents", "payment_method", "order_status",
+]
+# CSV rows per yielded chunk, and rows per fetch from the server-side cursor
+EXPORT_CHUNK_ROWS = 1000
+# Excel's row limit; longer exports continue on "<sheet> (2)", ...
+XLSX_MAX_ROWS = 1_048_576
+EXPORT_REPORTS = ("summary", "products", "category", "table", "waiter", "lines")
+MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _order_lines(session: Session, tenant_id: int, from_date: date, to_date: date):
+    """
+    Counted order items in the range, oldest first, as a streamed result.
+
+    yield_per makes psycopg use a server-side cursor, so rows arrive in batches of
+    EXPORT_CHUNK_ROWS instead of being buffered; the session must stay open while iterating.
+    """
+    lines = revenue_lines(session.get_bind().dialect.name, tenant_id, from_date, to_date)
+    query = (
+        select(
+            lines.c.revenue_at,
+            lines.c.order_id,
+            lines.c.item_id,
+            _table_name(),
+            _waiter_name(lines.c.waiter_id),
+            lines.c.product_id,
+            lines.c.product_name,
+            _category(),
+            lines.c.quantity,
+            lines.c.price_cents,
+            lines.c.revenue_cents,
+            lines.c.payment_method,
+            lines.c.order_status,
+        )
+        .select_from(lines)
+        .outerjoin(models.Table, models.Table.id == lines.c.table_id)
+        .outerjoin(models.User, models.User.id == lines.c.waiter_id)
+        .outerjoin(models.Product, models.Product.id == lines.c.product_id)
+        .order_by(lines.c.revenue_at, lines.c.order_id, lines.c.item_id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    return session.exec(query)
+
+
+def _line_values(row, excel: bool = False) -> list:
+    """LINE_HEADERS values; Excel gets naive UTC datetimes (it has no time zones), CSV ISO strings."""
+    revenue_at = row.revenue_at.astimezone(timezone.utc)
+    if excel:
+        day, revenue_at = revenue_at.date(), revenue_at.replace(tzinfo=None)
+    else:
+        day, revenue_at = revenue_at.date().isoformat(), revenue_at.isoformat()
+    return [
+        day, revenue_at, row.order_id, row.item_id, row.table_name, row.waiter_name, row.product_id,
+        row.product_name, row.category, row.quantity, row.price_cents, row.revenue_cents,
+        row.payment_method or "", getattr(row.order_status, "value", row.order_status),
+    ]
+
+
+def _csv_chunks(headers: list[str], rows: Iterable[list]) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding every EXPORT_CHUNK_ROWS rows so memory stays flat."""
+    buf = io.StringIO()
     writer = csv.writer(buf)
     writer.writerow(headers)
-    for r in rows:
-        writer.writerow([r.get(h, "") for h in headers])
-    return buf.getvalue()
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def _append_sheet(wb, title: str, headers: list[str], rows: Iterable[list]) -> None:
+    """Write rows to a write-only sheet, continuing on a new sheet past XLSX_MAX_ROWS."""
+    part, written = 1, XLSX_MAX_ROWS
+    for row in itertools.chain([None], rows):
+        if written == XLSX_MAX_ROWS:
+            ws = wb.create_sheet(title if part == 1 else f"{title} ({part})")
+            ws.append(headers)
+            part, written = part + 1, 1
+        if row is not None:
+            ws.append(row)
+            written += 1
+
+
+def _file_chunks(f, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        while chunk := f.read(chunk_size):
+            yield chunk
+    finally:
+        f.close()
+
+
+def _csv_export(session: Session, tenant_id: int, from_date: date, to_date: date,
+                report: str) -> tuple[list[str], Iterable[list]]:
+    """Headers and rows of one CSV report type (unknown types give the daily summary)."""
+    if report == "lines":
+        return LINE_HEADERS, (_line_values(row) for row in _order_lines(session, tenant_id, from_date, to_date))
+    data = _build_report_payload(tenant_id, session, from_date, to_date)
+    if report == "products":
+        dicts, headers = data["by_product"], ["product_name", "quantity", "revenue_cents"]
+    elif report == "category":
+        dicts, headers = data["by_category"], ["category", "quantity", "revenue_cents"]
+    elif report == "table":
+        dicts, headers = data["by_table"], ["table_name", "revenue_cents", "order_count"]
+    elif report == "waiter":
+        dicts, headers = data["by_waiter"], ["waiter_name", "revenue_cents", "order_count"]
+    else:
+        dicts, headers = data["summary"]["daily"], ["date", "revenue_cents", "order_count"]
+    return headers, ([d.get(h, "") for h in headers] for d in dicts)
+
+
+def _xlsx_export(session: Session, tenant_id: int, from_date: date, to_date: date, report: str,
+                 wrap_lines: Callable[[Iterable], Iterable] = lambda rows: rows):
+    """
+    Write-only workbook: the order lines for report=lines, else every breakdown.
+    `wrap_lines` sees the order line rows as they are written (job progress).
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    if report == "lines":
+        rows = (_line_values(row, excel=True) for row in _order_lines(session, tenant_id, from_date, to_date))
+        _append_sheet(wb, "Order lines", LINE_HEADERS, wrap_lines(rows))
+        return wb
+    data = _build_report_payload(tenant_id, session, from_date, to_date)
+    summary, res = data["summary"], data.get("reservations", {})
+    _append_sheet(wb, "Summary", ["Date", "Revenue (cents)", "Orders"], [
+        *([r["date"], r["revenue_cents"], r["order_count"]] for r in summary["daily"]),
+        [],
+        ["Total", summary["total_revenue_cents"], summary["total_orders"]],
+    ])
+    _append_sheet(wb, "Reservations", ["Source", "Count"], [
+        *([r["source"], r["count"]] for r in res.get("by_source", [])),
+        [],
+        ["Total", res.get("total", 0)],
+    ])
+    _append_sheet(wb, "By Product", ["Product", "Category", "Quantity", "Revenue (cents)"], (
+        [p["product_name"], p.get("category", ""), p["quantity"], p["revenue_cents"]]
+        for p in data["by_product"]
+    ))
+    _append_sheet(wb, "By Category", ["Category", "Quantity", "Revenue (cents)"], (
+        [c["category"], c["quantity"], c["revenue_cents"]] for c in data["by_category"]
+    ))
+    _append_sheet(wb, "By Table", ["Table", "Revenue (cents)", "Orders"], (
+        [t["table_name"], t["revenue_cents"], t["order_count"]] for t in data["by_table"]
+    ))
+    _append_sheet(wb, "By Waiter", ["Waiter", "Revenue (cents)", "Orders"], (
+        [w["waiter_name"], w["revenue_cents"], w["order_count"]] for w in data["by_waiter"]
+    ))
+    return wb
+
+
+def _export_filename(format: str, report: str, from_date: date, to_date: date) -> str:
+    if format == "xlsx":
+        return f"pos2-sales-{'lines-' if report == 'lines' else ''}{from_date}-{to_date}.xlsx"
+    if format == "json":
+        return f"pos2-sales-{from_date}-{to_date}.json"
+    return f"pos2-sales-{report}-{from_date}-{to_date}.csv"
 
 
 @router.get("/export")
@@ -227,88 +646,142 @@ def export_report(
     from_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
     to_date: date = Query(..., description="End date (YYYY-MM-DD)"),
     format: str = Query("csv", description="csv or xlsx"),
-    report: str = Query("summary", description="summary, products, category, table, waiter"),
+    report: str = Query("summary", description="summary, products, category, table, waiter, lines"),
 ) -> StreamingResponse:
-    """Export report as CSV or Excel. Same date range as reports."""
+    """
+    Export report as CSV or Excel. Same date range as reports.
+
+    CSV is streamed in chunks; report=lines (one row per order item) is read from a
+    server-side cursor, so a year of lines exports in constant memory. Excel is built
+    by openpyxl in write-only mode into a temporary file, then streamed. For ranges
+    that take long, use POST /reports/jobs instead.
+    """
     if from_date > to_date:
         from_date, to_date = to_date, from_date
-    data = _build_report_payload(current_user.tenant_id, session, from_date, to_date)
+    format = format.lower()
 
-    if format.lower() == "xlsx":
+    if format == "xlsx":
         try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, Alignment, PatternFill
+            wb = _xlsx_export(session, current_user.tenant_id, from_date, to_date, report)
         except ImportError:
-            from fastapi import HTTPException
             raise HTTPException(500, "Excel export requires openpyxl")
-        wb = Workbook()
-        # Summary sheet
-        ws = wb.active
-        ws.title = "Summary"
-        ws.append(["Date", "Revenue (cents)", "Orders"])
-        for row in data["summary"]["daily"]:
-            ws.append([row["date"], row["revenue_cents"], row["order_count"]])
-        ws.append([])
-        ws.append(["Total", data["summary"]["total_revenue_cents"], data["summary"]["total_orders"]])
-        # Reservations
-        res = data.get("reservations", {})
-        ws_res = wb.create_sheet("Reservations")
-        ws_res.append(["Source", "Count"])
-        for row in res.get("by_source", []):
-            ws_res.append([row["source"], row["count"]])
-        ws_res.append([])
-        ws_res.append(["Total", res.get("total", 0)])
-        # Products
-        ws2 = wb.create_sheet("By Product")
-        ws2.append(["Product", "Category", "Quantity", "Revenue (cents)"])
-        for p in data["by_product"]:
-            ws2.append([p["product_name"], p.get("category", ""), p["quantity"], p["revenue_cents"]])
-        # Category
-        ws3 = wb.create_sheet("By Category")
-        ws3.append(["Category", "Quantity", "Revenue (cents)"])
-        for c in data["by_category"]:
-            ws3.append([c["category"], c["quantity"], c["revenue_cents"]])
-        # Table
-        ws4 = wb.create_sheet("By Table")
-        ws4.append(["Table", "Revenue (cents)", "Orders"])
-        for t in data["by_table"]:
-            ws4.append([t["table_name"], t["revenue_cents"], t["order_count"]])
-        # Waiter
-        ws5 = wb.create_sheet("By Waiter")
-        ws5.append(["Waiter", "Revenue (cents)", "Orders"])
-        for w in data["by_waiter"]:
-            ws5.append([w["waiter_name"], w["revenue_cents"], w["order_count"]])
-        buf = BytesIO()
-        wb.save(buf)
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename=pos2-sales-{from_date}-{to_date}.xlsx"},
-        )
-
-    # CSV: single report type
-    if report == "summary":
-        rows = [{"date": r["date"], "revenue_cents": r["revenue_cents"], "order_count": r["order_count"]} for r in data["summary"]["daily"]]
-        headers = ["date", "revenue_cents", "order_count"]
-    elif report == "products":
-        rows = data["by_product"]
-        headers = ["product_name", "quantity", "revenue_cents"]
-    elif report == "category":
-        rows = data["by_category"]
-        headers = ["category", "quantity", "revenue_cents"]
-    elif report == "table":
-        rows = data["by_table"]
-        headers = ["table_name", "revenue_cents", "order_count"]
-    elif report == "waiter":
-        rows = data["by_waiter"]
-        headers = ["waiter_name", "revenue_cents", "order_count"]
+        f = tempfile.TemporaryFile()
+        wb.save(f)
+        f.seek(0)
+        body = _file_chunks(f)
     else:
-        rows = data["summary"]["daily"]
-        headers = ["date", "revenue_cents", "order_count"]
-    content = _csv_stream(rows, headers)
+        format = "csv"
+        body = _csv_chunks(*_csv_export(session, current_user.tenant_id, from_date, to_date, report))
     return StreamingResponse(
-        iter([content]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=pos2-sales-{report}-{from_date}-{to_date}.csv"},
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={_export_filename(format, report, from_date, to_date)}"},
     )
+
+
+# ============ BACKGROUND JOBS ============
+
+
+def _count_order_lines(session: Session, tenant_id: int, from_date: date, to_date: date) -> int:
+    lines = revenue_lines(session.get_bind().dialect.name, tenant_id, from_date, to_date)
+    return session.exec(select(func.count()).select_from(lines)).one()
+
+
+def _report_job_work(bind, tenant_id: int, params: dict) -> report_jobs.Work:
+    """The job body: build the report or export for `params` into the artifact file."""
+    from_date, to_date = date.fromisoformat(params["from_date"]), date.fromisoformat(params["to_date"])
+    format, report = params["format"], params["report"]
+
+    def work(path, progress) -> dict:
+        written = 0
+        with Session(bind) as session:
+            total = _count_order_lines(session, tenant_id, from_date, to_date) if report == "lines" else None
+
+            def counted(rows):
+                nonlocal written
+                for written, row in enumerate(rows, 1):
+                    yield row
+                    progress(written, total)
+
+            if format == "json":
+                payload = _build_report_payload(tenant_id, session, from_date, to_date)
+                path.write_text(json.dumps(payload))
+            elif format == "csv":
+                headers, rows = _csv_export(session, tenant_id, from_date, to_date, report)
+                with open(path, "wb") as f:
+                    for chunk in _csv_chunks(headers, counted(rows)):
+                        f.write(chunk)
+            else:
+                wb = _xlsx_export(session, tenant_id, from_date, to_date, report, wrap_lines=counted)
+                with open(path, "wb") as f:
+                    wb.save(f)
+        return {
+            "rows": written if report == "lines" else None,
+            "filename": _export_filename(format, report, from_date, to_date),
+            "media_type": MEDIA_TYPES[format],
+        }
+
+    return work
+
+
+def _job_response(job: dict, **extra) -> dict:
+    body = report_jobs.public(job)
+    body["status_url"] = f"/reports/jobs/{job['id']}"
+    body["download_url"] = f"/reports/jobs/{job['id']}/download" if job["status"] == report_jobs.DONE else None
+    return {**body, **extra}
+
+
+@router.post("/jobs", status_code=202)
+def create_report_job(
+    body: models.ReportJobCreate,
+    current_user: Annotated[models.User, Depends(require_permission(Permission.REPORT_READ))],
+    session: Session = Depends(get_session),
+) -> dict:
+    """
+    Compute a report (format=json) or export (csv/xlsx) in the background. Poll the
+    returned status_url; identical requests while one is running share the job.
+    """
+    format = body.format.lower()
+    if format not in MEDIA_TYPES:
+        raise HTTPException(400, "format must be json, csv or xlsx")
+    if format != "json" and body.report not in EXPORT_REPORTS:
+        raise HTTPException(400, f"report must be one of: {', '.join(EXPORT_REPORTS)}")
+    from_date, to_date = sorted((body.from_date, body.to_date))
+    # Normalized so that equivalent requests deduplicate
+    report = body.report if format == "csv" or (format == "xlsx" and body.report == "lines") else "summary"
+    params = {"from_date": from_date.isoformat(), "to_date": to_date.isoformat(), "format": format, "report": report}
+    job, deduplicated = report_jobs.submit(
+        current_user.tenant_id, "sales", params, format,
+        _report_job_work(session.get_bind(), current_user.tenant_id, params),
+    )
+    return _job_response(job, deduplicated=deduplicated)
+
+
+@router.get("/jobs/{job_id}")
+def get_report_job(
+    job_id: str,
+    current_user: Annotated[models.User, Depends(require_permission(Permission.REPORT_READ))],
+) -> dict:
+    """Job status: queued, running (progress 0..1 and rows so far for order lines), done or failed."""
+    try:
+        return _job_response(report_jobs.get(job_id, current_user.tenant_id))
+    except report_jobs.JobNotFound:
+        raise HTTPException(404, "Report job not found or expired")
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    current_user: Annotated[models.User, Depends(require_permission(Permission.REPORT_READ))],
+) -> FileResponse:
+    """The finished job's file, until the job expires."""
+    try:
+        job = report_jobs.get(job_id, current_user.tenant_id)
+    except report_jobs.JobNotFound:
+        raise HTTPException(404, "Report job not found or expired")
+    if job["status"] != report_jobs.DONE:
+        raise HTTPException(409, f"Report job is {job['status']}")
+    path = report_jobs.artifact_path(job)
+    if not path.exists():
+        raise HTTPException(404, "Report job not found or expired")
+    return FileResponse(path, media_type=job["media_type"], filename=job["filename"])
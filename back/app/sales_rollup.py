@@ -0,0 +1,283 @@
+"""
+Daily sales rollup behind the sales reports.
+
+`sales_daily_rollup` holds, per tenant and UTC day, quantity and revenue per
+(product, table, waiter) plus the order count per (table, waiter). Reports read it
+for closed days and compute only today from orders (see reports_routes).
+
+The rollup is kept in step inside the transaction that changes the orders: a
+before_flush hook notes the (tenant, day) of every order that is or was
+paid/completed when the order, or one of its items, changes in a way that moves
+revenue; after the flush each noted day is rebuilt from order items with one
+DELETE and one INSERT ... SELECT. Rebuilding whole days instead of applying deltas
+keeps every path correct (mark paid, item status, staff cancel/remove, Stripe,
+order deletes) without bookkeeping in each endpoint. Open orders never touch it.
+
+Rebuild from scratch (after loading orders outside the ORM, or to verify):
+    python -m app.sales_rollup [--tenant ID] [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import (
+    Connection, Integer, String, cast, delete, distinct, event, func, insert, inspect, null, text, union_all,
+)
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import select
+
+from . import models
+
+# Order statuses we count as "revenue"
+REVENUE_STATUSES = {models.OrderStatus.paid, models.OrderStatus.completed}
+# Item statuses we exclude from revenue
+EXCLUDED_ITEM_STATUSES = {models.OrderItemStatus.cancelled}
+
+ROLLUP_COLUMNS = (
+    "tenant_id", "day", "product_id", "product_name", "table_id", "waiter_id",
+    "quantity", "revenue_cents", "order_count",
+)
+
+# Changes that can move revenue between days or in/out of the reports
+_ORDER_FIELDS = ("tenant_id", "status", "paid_at", "created_at", "table_id")
+_ITEM_FIELDS = ("order_id", "product_id", "product_name", "quantity", "price_cents", "removed_by_customer")
+
+_SESSION_KEY = "sales_rollup_days"
+
+
+def utc_date(dialect_name: str, timestamp):
+    """SQL date (UTC) of a timestamptz expression; sqlite already stores UTC."""
+    if dialect_name == "postgresql":
+        return func.date(func.timezone("UTC", timestamp))
+    return func.date(timestamp)
+
+
+def revenue_lines(dialect_name: str, tenant_id: int | None = None,
+                  from_date: date | None = None, to_date: date | None = None):
+    """
+    Subquery with one row per order item that counts toward revenue, by UTC day.
+
+    Revenue is dated by paid_at if set, else created_at. The waiter is the table's
+    own, else the floor default. No tenant / date means all of them.
+    """
+    revenue_at = func.coalesce(models.Order.paid_at, models.Order.created_at)
+    query = (
+        select(
+            models.Order.tenant_id,
+            models.Order.id.label("order_id"),
+            models.OrderItem.id.label("item_id"),
+            revenue_at.label("revenue_at"),
+            utc_date(dialect_name, revenue_at).label("day"),
+            models.Order.status.label("order_status"),
+            models.Order.payment_method,
+            models.Order.table_id,
+            func.coalesce(models.Table.assigned_waiter_id, models.Floor.default_waiter_id).label("waiter_id"),
+            models.OrderItem.product_id,
+            models.OrderItem.product_name,
+            models.OrderItem.quantity,
+            models.OrderItem.price_cents,
+            (models.OrderItem.quantity * models.OrderItem.price_cents).label("revenue_cents"),
+        )
+        .join(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .outerjoin(models.Table, models.Table.id == models.Order.table_id)
+        .outerjoin(models.Floor, models.Floor.id == models.Table.floor_id)
+        .where(models.Order.status.in_([s.value for s in REVENUE_STATUSES]))
+        .where(models.OrderItem.removed_by_customer == False)
+        .where(models.OrderItem.status.not_in([s.value for s in EXCLUDED_ITEM_STATUSES]))
+    )
+    if tenant_id is not None:
+        query = query.where(models.Order.tenant_id == tenant_id)
+    # Half-open range on the raw expression, so idx_order_tenant_revenue_date applies
+    if from_date is not None:
+        query = query.where(revenue_at >= datetime.combine(from_date, time.min, timezone.utc))
+    if to_date is not None:
+        query = query.where(revenue_at < datetime.combine(to_date + timedelta(days=1), time.min, timezone.utc))
+    return query.subquery("lines")
+
+
+def rollup_rows(lines) -> tuple:
+    """
+    The two SELECTs of rollup rows (ROLLUP_COLUMNS) for a revenue_lines subquery: one
+    row per (day, product, table, waiter) and one order row (product_id NULL) per
+    (day, table, waiter). Returned apart so callers can UNION ALL them with other rows
+    (sqlite does not nest compound selects).
+    """
+    per_product = (lines.c.tenant_id, lines.c.day, lines.c.product_id, lines.c.product_name,
+                   lines.c.table_id, lines.c.waiter_id)
+    per_order = (lines.c.tenant_id, lines.c.day, lines.c.table_id, lines.c.waiter_id)
+    order_count = func.count(distinct(lines.c.order_id))
+    return (
+        select(
+            *per_product,
+            func.sum(lines.c.quantity).label("quantity"),
+            func.sum(lines.c.revenue_cents).label("revenue_cents"),
+            order_count.label("order_count"),
+        ).group_by(*per_product),
+        select(
+            lines.c.tenant_id,
+            lines.c.day,
+            cast(null(), Integer).label("product_id"),
+            cast(null(), String).label("product_name"),
+            lines.c.table_id,
+            lines.c.waiter_id,
+            func.sum(lines.c.quantity).label("quantity"),
+            func.sum(lines.c.revenue_cents).label("revenue_cents"),
+            order_count.label("order_count"),
+        ).group_by(*per_order),
+    )
+
+
+def refresh_days(conn: Connection, tenant_id: int, days) -> None:
+    """Recompute the rollup for `days` of one tenant from its orders (caller commits)."""
+    rollup = models.SalesDailyRollup.__table__
+    dialect_name = conn.dialect.name
+    for day in sorted(set(days)):
+        if dialect_name == "postgresql":
+            # Two transactions rebuilding the same day would both insert it; the lock is
+            # held until commit and sorted days keep lock order consistent
+            conn.execute(select(func.pg_advisory_xact_lock(tenant_id, day.toordinal())))
+        conn.execute(delete(rollup).where(rollup.c.tenant_id == tenant_id, rollup.c.day == day))
+        conn.execute(insert(rollup).from_select(
+            ROLLUP_COLUMNS, union_all(*rollup_rows(revenue_lines(dialect_name, tenant_id, day, day)))
+        ))
+
+
+def rebuild(conn: Connection, tenant_id: int | None = None,
+            from_date: date | None = None, to_date: date | None = None) -> int:
+    """Replace the rollup for a tenant (default: all) and day range (default: all). Returns rows written."""
+    rollup = models.SalesDailyRollup.__table__
+    if conn.dialect.name == "postgresql":
+        # Concurrent day refreshes wait for us, then rebuild their day on top
+        conn.execute(text("LOCK TABLE sales_daily_rollup IN SHARE ROW EXCLUSIVE MODE"))
+    stale = delete(rollup)
+    if tenant_id is not None:
+        stale = stale.where(rollup.c.tenant_id == tenant_id)
+    if from_date is not None:
+        stale = stale.where(rollup.c.day >= from_date)
+    if to_date is not None:
+        stale = stale.where(rollup.c.day <= to_date)
+    conn.execute(stale)
+    result = conn.execute(insert(rollup).from_select(
+        ROLLUP_COLUMNS, union_all(*rollup_rows(revenue_lines(conn.dialect.name, tenant_id, from_date, to_date)))
+    ))
+    return result.rowcount
+
+
+# ------------------------------------------------------------ session hooks
+
+
+def _revenue_day(status, paid_at: datetime | None, created_at: datetime | None) -> date | None:
+    if status not in REVENUE_STATUSES:
+        return None
+    revenue_at = paid_at or created_at
+    return revenue_at.astimezone(timezone.utc).date() if revenue_at else None
+
+
+def _previous(state, field: str):
+    """Committed value of a changed attribute (the current one when unchanged or unknown)."""
+    history = state.attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(state.object, field)
+
+
+def _order_days(order: models.Order, include_previous: bool) -> set[tuple[int, date]]:
+    """(tenant, day) slices the order counts toward now and, optionally, before this flush."""
+    keys = set()
+    day = _revenue_day(order.status, order.paid_at, order.created_at)
+    if day:
+        keys.add((order.tenant_id, day))
+    if include_previous:
+        state = inspect(order)
+        status = state.attrs.status.history
+        # Setting an expired status loses the old value; assume it may have counted
+        previous_status = status.deleted[0] if status.deleted else (
+            models.OrderStatus.paid if status.added else order.status
+        )
+        day = _revenue_day(previous_status, _previous(state, "paid_at"), _previous(state, "created_at"))
+        if day:
+            keys.add((_previous(state, "tenant_id"), day))
+    return keys
+
+
+def _changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+
+def _item_revenue_changed(item: models.OrderItem) -> bool:
+    if _changed(item, _ITEM_FIELDS):
+        return True
+    # Kitchen progress (pending -> ... -> delivered) does not move revenue; cancelling does
+    history = inspect(item).attrs.status.history
+    return any(s in EXCLUDED_ITEM_STATUSES for s in (*history.added, *history.deleted))
+
+
+def _note_changes(session: OrmSession, flush_context, instances) -> None:
+    # Identity sets: SQLModel instances are not hashable
+    new, dirty, deleted = session.new, session.dirty, session.deleted
+    keys = set()
+    for obj in new:
+        if isinstance(obj, models.Order):
+            keys |= _order_days(obj, include_previous=False)
+    for obj in dirty:
+        if isinstance(obj, models.Order) and _changed(obj, _ORDER_FIELDS):
+            keys |= _order_days(obj, include_previous=True)
+    for obj in deleted:
+        if isinstance(obj, models.Order):
+            keys |= _order_days(obj, include_previous=True)
+
+    for obj in (*new, *dirty, *deleted):
+        if not isinstance(obj, models.OrderItem):
+            continue
+        order_ids = {obj.order_id}
+        if obj in dirty:
+            if not _item_revenue_changed(obj):
+                continue
+            order_ids.add(_previous(inspect(obj), "order_id"))
+        for order_id in order_ids:
+            # Usually already in the identity map: the endpoint loaded the order
+            order = session.get(models.Order, order_id) if order_id is not None else obj.order
+            if order is not None:
+                keys |= _order_days(order, include_previous=order in dirty)
+
+    if keys:
+        session.info.setdefault(_SESSION_KEY, set()).update(keys)
+
+
+def _refresh_noted(session: OrmSession, flush_context) -> None:
+    keys = session.info.pop(_SESSION_KEY, None)
+    if not keys:
+        return
+    days_by_tenant = defaultdict(set)
+    for tenant_id, day in keys:
+        days_by_tenant[tenant_id].add(day)
+    conn = session.connection()
+    for tenant_id in sorted(days_by_tenant):
+        refresh_days(conn, tenant_id, days_by_tenant[tenant_id])
+
+
+def _forget_noted(session: OrmSession, previous_transaction=None) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+
+# Class-level listeners apply to every Session, including the one behind AsyncSession
+event.listen(OrmSession, "before_flush", _note_changes)
+event.listen(OrmSession, "after_flush_postexec", _refresh_noted)
+event.listen(OrmSession, "after_soft_rollback", _forget_noted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup from orders.")
+    parser.add_argument("--tenant", type=int, help="only this tenant (default: all)")
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat, help="last day, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    from .db import engine
+
+    with engine.begin() as conn:
+        rows = rebuild(conn, args.tenant, args.from_date, args.to_date)
+    print(f"sales_daily_rollup: wrote {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -122,7 +122,7 @@ def _user_from_payload(session: Session, payload: dict) -> User | None:
     return user
 
 
-async def get_current_user_optional(
+def get_current_user_optional(
     token: Annotated[str | None, Depends(get_optional_token)],
     session: Annotated[Session, Depends(get_session)],
 ) -> User | None:
@@ -136,7 +136,7 @@ async def get_current_user_optional(
         return None
 
 
-async def get_current_user(
+def get_current_user(
     token: Annotated[str, Depends(get_token_from_cookie)],
     session: Annotated[Session, Depends(get_session)],
 ) -> User:
@@ -181,7 +181,7 @@ def validate_refresh_token(refresh_token: str, session: Session) -> User:
         raise credentials_exception
 
 
-async def get_current_provider_user(
+def get_current_provider_user(
     current_user: Annotated[User, Depends(get_current_user)],
     session: Annotated[Session, Depends(get_session)],
 ) -> tuple[User, Provider]:
@@ -0,0 +1,673 @@
+"""
+Synthetic large-tenant dataset for performance work.
+
+Creates N tenants, each with staff, floors, tables, products (plus translations),
+months of order history with realistic status mixes and item status logs,
+reservations, and inventory items with purchase batches and daily stock movements,
+then rebuilds the daily sales rollup for each tenant. Output is deterministic for a
+given --seed and "now", so benchmarks can be repeated on the same data.
+
+Rows are generated in Python and streamed with COPY on Postgres (psycopg
+`cursor.copy`); other databases (sqlite in tests) fall back to executemany.
+Primary keys are reserved up front from each table's sequence, so foreign keys
+are known without round-trips and the sequences stay valid for the app.
+
+Usage (from back/; adds new tenants on every run, never deletes):
+  python -m app.seeds.synthetic --preset medium
+  python -m app.seeds.synthetic --tenants 20 --months 12 --orders-per-day 250 --seed 7
+
+Or via Docker:
+  docker compose exec back python -m app.seeds.synthetic --preset large
+"""
+import argparse
+import random
+import sys
+import time as time_module
+from collections import Counter, defaultdict
+from dataclasses import dataclass, fields, replace
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import bindparam, func, select, text
+
+from .. import inventory_models, models
+from ..db import engine
+from ..sales_rollup import rebuild as rebuild_sales_rollup
+from ..security import get_password_hash
+from ..settings import settings
+
+TENANT_TIMEZONE = "Europe/Madrid"
+PASSWORD = "synthetic"  # every generated user can log in with this
+
+
+@dataclass
+class Volumes:
+    """How much to generate (per tenant unless noted)."""
+
+    tenants: int = 1  # total
+    floors: int = 2
+    tables_per_floor: int = 12
+    waiters: int = 4
+    products: int = 80
+    languages: tuple[str, ...] = ("es", "de", "fr")
+    months: int = 3
+    orders_per_day: int = 80
+    reservations_per_day: int = 15
+    inventory_items: int = 40
+
+
+PRESETS = {
+    # ~2k orders, ~5k order items: quick local runs
+    "small": Volumes(tenants=1, months=1, orders_per_day=60, products=40, inventory_items=20),
+    # ~120k orders, ~300k order items
+    "medium": Volumes(tenants=5, months=6, orders_per_day=120, products=120, inventory_items=60),
+    # ~2M orders, ~6M order items, ~20k inventory transactions per tenant
+    "large": Volumes(
+        tenants=20, floors=3, tables_per_floor=15, months=12, orders_per_day=250,
+        products=200, reservations_per_day=30, inventory_items=100,
+    ),
+}
+
+# (category, subcategory, names, price range in cents)
+MENU = [
+    ("Starters", "Cold", ["Gazpacho", "Burrata", "Carpaccio", "Ceviche", "Salad"], (600, 1400)),
+    ("Starters", "Hot", ["Croquetas", "Patatas Bravas", "Calamares", "Gyoza", "Soup"], (550, 1300)),
+    ("Mains", "Grill", ["Ribeye", "Chicken", "Lamb Chops", "Octopus", "Burger"], (1400, 3200)),
+    ("Mains", "Pasta", ["Carbonara", "Lasagna", "Risotto", "Gnocchi", "Ravioli"], (1100, 2200)),
+    ("Desserts", "Cakes", ["Cheesecake", "Tiramisu", "Brownie", "Tarta de Santiago"], (500, 900)),
+    ("Beverages", "Soft Drinks", ["Cola", "Lemonade", "Sparkling Water", "Iced Tea"], (250, 450)),
+    ("Beverages", "Beer", ["Lager", "IPA", "Stout", "Wheat Beer"], (350, 700)),
+    ("Beverages", "Red Wine", ["Rioja Crianza", "Ribera Roble", "Priorat", "Toro"], (450, 1200)),
+    ("Beverages", "Coffee", ["Espresso", "Cortado", "Cappuccino", "Latte"], (150, 400)),
+]
+
+INVENTORY_UNITS = [
+    (inventory_models.UnitOfMeasure.kilogram, inventory_models.InventoryCategory.ingredients),
+    (inventory_models.UnitOfMeasure.liter, inventory_models.InventoryCategory.beverages),
+    (inventory_models.UnitOfMeasure.piece, inventory_models.InventoryCategory.ingredients),
+]
+
+# Share of lunch vs dinner covers and their service windows (local time)
+SERVICES = [(0.4, 13, 16), (0.6, 20, 23)]
+WEEKDAY_FACTOR = [0.7, 0.8, 0.9, 1.0, 1.3, 1.5, 1.1]  # Mon..Sun
+PAYMENT_METHODS = [("card_terminal", 0.55), ("cash", 0.3), ("stripe", 0.15)]
+
+
+class RowWriter:
+    """
+    Buffers generated rows per table and writes them in batches: COPY ... FROM STDIN
+    on Postgres, executemany elsewhere. Columns a row leaves out get the model's
+    column default (or NULL). Buffers are always flushed together, parents before
+    children, so foreign keys hold at every statement.
+    """
+
+    def __init__(self, conn, batch_size: int = 20_000) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self.use_copy = conn.dialect.name == "postgresql"
+        self.buffers: dict = defaultdict(list)
+        self.counts: Counter = Counter()
+        self._next_id: dict = {}
+        self._preparer = conn.dialect.identifier_preparer
+
+    def reserve_ids(self, table, n: int) -> int:
+        """Reserve n consecutive primary keys for `table`; returns the first."""
+        if n <= 0:
+            return 0
+        if self.use_copy:
+            name = self._preparer.format_table(table)
+            last = self.conn.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence(:t, 'id'), "
+                    "nextval(pg_get_serial_sequence(:t, 'id')) + :n - 1)"
+                ),
+                {"t": name, "n": n},
+            ).scalar_one()
+            return last - n + 1
+        if table not in self._next_id:
+            current = self.conn.execute(select(func.max(table.c.id))).scalar()
+            self._next_id[table] = (current or 0) + 1
+        first = self._next_id[table]
+        self._next_id[table] += n
+        return first
+
+    def add(self, table, row: dict) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered rows, in foreign-key dependency order."""
+        order = {t: i for i, t in enumerate(models.SQLModel.metadata.sorted_tables)}
+        for table in sorted(self.buffers, key=order.__getitem__):
+            rows = self.buffers.pop(table)
+            if rows:
+                self._write(table, rows)
+                self.counts[table.name] += len(rows)
+
+    def _write(self, table, rows: list[dict]) -> None:
+        columns = list(table.columns)
+        if self.use_copy:
+            column_list = ", ".join(self._preparer.quote(c.name) for c in columns)
+            statement = f"COPY {self._preparer.format_table(table)} ({column_list}) FROM STDIN"
+            cursor = self.conn.connection.driver_connection.cursor()
+            try:
+                with cursor.copy(statement) as copy:
+                    for row in rows:
+                        copy.write_row([_copy_value(_value(row, c)) for c in columns])
+            finally:
+                cursor.close()
+        else:
+            self.conn.execute(table.insert(), [{c.name: _value(row, c) for c in columns} for row in rows])
+
+
+def _value(row: dict, column):
+    if column.name in row:
+        return row[column.name]
+    default = column.default
+    if default is None:
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def _copy_value(value):
+    # SQLAlchemy Enum columns store the member name
+    return value.name if isinstance(value, Enum) else value
+
+
+def _weighted(rng: random.Random, choices: list[tuple[str, float]]) -> str:
+    return rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+class TenantGenerator:
+    """Generates one tenant's data into a RowWriter."""
+
+    def __init__(self, writer: RowWriter, volumes: Volumes, rng: random.Random, now: datetime,
+                 password_hash: str, prep_rng: random.Random | None = None) -> None:
+        self.w = writer
+        self.v = volumes
+        self.rng = rng
+        self.now = now
+        self.password_hash = password_hash
+        self.tz = ZoneInfo(TENANT_TIMEZONE)
+        self.prep_rng = prep_rng or random.Random()
+        self.cook_minutes: dict[int, float] = {}
+
+    def run(self) -> int:
+        self._tenant()
+        self._staff()
+        self._floors_and_tables()
+        self._products()
+        self._orders()
+        self._reservations()
+        self._inventory()
+        self.w.flush()
+        return self.tenant_id
+
+    # ------------------------------------------------------------ setup rows
+
+    def _tenant(self) -> None:
+        self.tenant_id = self.w.reserve_ids(models.Tenant.__table__, 1)
+        self.w.add(models.Tenant.__table__, {
+            "id": self.tenant_id,
+            "name": f"Synthetic Bistro {self.tenant_id}",
+            "business_type": models.BusinessType.restaurant,
+            "currency_code": "EUR",
+            "currency": "€",
+            "default_language": "en",
+            "timezone": TENANT_TIMEZONE,
+            "created_at": self.now - timedelta(days=31 * self.v.months + 30),
+        })
+
+    def _staff(self) -> None:
+        roles = (
+            [models.UserRole.owner, models.UserRole.kitchen, models.UserRole.bartender]
+            + [models.UserRole.waiter] * self.v.waiters
+        )
+        first = self.w.reserve_ids(models.User.__table__, len(roles))
+        self.waiter_ids = []
+        for offset, role in enumerate(roles):
+            user_id = first + offset
+            if role == models.UserRole.waiter:
+                self.waiter_ids.append(user_id)
+            self.w.add(models.User.__table__, {
+                "id": user_id,
+                "email": (
+                    f"synthetic-{self.tenant_id}-owner@example.com" if role == models.UserRole.owner
+                    else f"synthetic-{self.tenant_id}-{role.value}-{user_id}@example.com"
+                ),
+                "hashed_password": self.password_hash,
+                "full_name": f"{role.value.title()} {user_id}",
+                "role": role,
+                "tenant_id": self.tenant_id,
+            })
+        self.owner_id = first
+        self.staff_ids = list(range(first, first + len(roles)))
+
+    def _floors_and_tables(self) -> None:
+        rng, v = self.rng, self.v
+        first_floor = self.w.reserve_ids(models.Floor.__table__, v.floors)
+        n_tables = v.floors * v.tables_per_floor
+        first_table = self.w.reserve_ids(models.Table.__table__, n_tables)
+        self.table_ids = list(range(first_table, first_table + n_tables))
+        self.table_seats = {}
+        for f in range(v.floors):
+            self.w.add(models.Floor.__table__, {
+                "id": first_floor + f,
+                "tenant_id": self.tenant_id,
+                "name": ["Main", "Terrace", "Upstairs", "Garden"][f % 4] + (f" {f // 4 + 1}" if f >= 4 else ""),
+                "sort_order": f,
+                "default_waiter_id": self.waiter_ids[f % len(self.waiter_ids)] if self.waiter_ids else None,
+            })
+        self.table_rows = []
+        for i, table_id in enumerate(self.table_ids):
+            seats = rng.choice([2, 2, 4, 4, 4, 6, 8])
+            self.table_seats[table_id] = seats
+            self.table_rows.append({
+                "id": table_id,
+                "tenant_id": self.tenant_id,
+                "name": f"T{i + 1:02d}",
+                "floor_id": first_floor + i // v.tables_per_floor,
+                "x_position": float((i % 6) * 140),
+                "y_position": float((i // 6) * 110),
+                "seat_count": seats,
+                "shape": "circle" if seats <= 2 else "rectangle",
+                "assigned_waiter_id": rng.choice(self.waiter_ids) if self.waiter_ids and rng.random() < 0.5 else None,
+            })
+        # Tables are written in _orders, once today's open orders are known
+
+    def _products(self) -> None:
+        rng, v = self.rng, self.v
+        first = self.w.reserve_ids(models.Product.__table__, v.products)
+        self.products = []  # (id, name, price_cents)
+        for p in range(v.products):
+            category, subcategory, names, (low, high) = MENU[p % len(MENU)]
+            name = names[(p // len(MENU)) % len(names)]
+            if p >= len(MENU) * len(names):
+                name = f"{name} #{p // (len(MENU) * len(names)) + 1}"
+            price = rng.randrange(low, high, 50)
+            product_id = first + p
+            self.products.append((product_id, name, price))
+            self.w.add(models.Product.__table__, {
+                "id": product_id,
+                "tenant_id": self.tenant_id,
+                "name": name,
+                "price_cents": price,
+                "description": f"House {name.lower()}",
+                "category": category,
+                "subcategory": subcategory,
+            })
+        # Translations: name + description per language
+        n_texts = len(self.products) * len(v.languages) * 2
+        text_id = self.w.reserve_ids(models.I18nText.__table__, n_texts)
+        for product_id, name, _ in self.products:
+            for lang in v.languages:
+                for field, value in (("name", f"{name} ({lang})"), ("description", f"{name} [{lang}]")):
+                    self.w.add(models.I18nText.__table__, {
+                        "id": text_id, "tenant_id": self.tenant_id, "entity_type": "product",
+                        "entity_id": product_id, "field": field, "lang": lang, "text": value,
+                    })
+                    text_id += 1
+        # Zipf-like popularity: a few dishes dominate sales
+        self.product_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(self.products))]
+        rng.shuffle(self.product_weights)
+
+    # ------------------------------------------------------------ orders
+
+    def _local_to_utc(self, day: date, hour: float) -> datetime:
+        local = datetime.combine(day, time(0), tzinfo=self.tz) + timedelta(hours=hour)
+        return local.astimezone(timezone.utc)
+
+    def _order_times(self, day: date) -> list[datetime]:
+        rng = self.rng
+        mean = self.v.orders_per_day * WEEKDAY_FACTOR[day.weekday()]
+        count = max(0, int(rng.gauss(mean, mean * 0.15)))
+        times = []
+        for _ in range(count):
+            share_roll = rng.random()
+            for share, start, end in SERVICES:
+                if share_roll < share:
+                    break
+                share_roll -= share
+            times.append(self._local_to_utc(day, rng.uniform(start, end)))
+        return sorted(times)
+
+    def _orders(self) -> None:
+        today = self.now.astimezone(self.tz).date()
+        first_day = today - timedelta(days=31 * self.v.months)
+        order_table, item_table = models.Order.__table__, models.OrderItem.__table__
+
+        # Today's still-open orders sit on active tables (table.active_order_id)
+        n_open = min(len(self.table_ids), max(1, len(self.table_ids) // 3))
+        open_tables = self.rng.sample(self.table_ids, n_open)
+        first_open = self.w.reserve_ids(order_table, n_open)
+        open_orders = dict(zip(open_tables, range(first_open, first_open + n_open)))
+        for row in self.table_rows:
+            if row["id"] in open_orders:
+                row.update({
+                    "is_active": True,
+                    "order_pin": f"{self.rng.randrange(10_000):04d}",
+                    "active_order_id": open_orders[row["id"]],
+                    "activated_at": self.now - timedelta(minutes=self.rng.randrange(5, 90)),
+                })
+            self.w.add(models.Table.__table__, row)
+
+        day = first_day
+        while day <= today:
+            times = [t for t in self._order_times(day) if t < self.now - timedelta(minutes=90)]
+            first = self.w.reserve_ids(order_table, len(times))
+            orders = [(first + i, t, self._closed_status(), self.rng.choice(self.table_ids))
+                      for i, t in enumerate(times)]
+            self._write_orders(orders, order_table, item_table)
+            day += timedelta(days=1)
+
+        open_rows = []
+        for table_id, order_id in open_orders.items():
+            status = _weighted(self.rng, [
+                (models.OrderStatus.pending, 0.3), (models.OrderStatus.preparing, 0.3),
+                (models.OrderStatus.ready, 0.15), (models.OrderStatus.partially_delivered, 0.25),
+            ])
+            open_rows.append((order_id, self.now - timedelta(minutes=self.rng.randrange(3, 80)), status, table_id))
+        self._write_orders(open_rows, order_table, item_table)
+
+    def _closed_status(self) -> models.OrderStatus:
+        return _weighted(self.rng, [
+            (models.OrderStatus.paid, 0.92), (models.OrderStatus.cancelled, 0.04),
+            (models.OrderStatus.completed, 0.04),
+        ])
+
+    def _write_orders(self, orders, order_table, item_table) -> None:
+        rng = self.rng
+        items = []
+        for order_id, created_at, status, table_id in orders:
+            row = {
+                "id": order_id,
+                "tenant_id": self.tenant_id,
+                "table_id": table_id,
+                "status": status,
+                "created_at": created_at,
+                "session_id": f"s-{order_id}",
+            }
+            if status == models.OrderStatus.paid:
+                row.update({
+                    "paid_at": created_at + timedelta(minutes=rng.randrange(25, 120)),
+                    "paid_by_user_id": rng.choice(self.waiter_ids) if self.waiter_ids else self.owner_id,
+                    "payment_method": _weighted(rng, PAYMENT_METHODS),
+                })
+            elif status == models.OrderStatus.cancelled:
+                row.update({
+                    "cancelled_at": created_at + timedelta(minutes=rng.randrange(1, 20)),
+                    "cancelled_by": rng.choice(["customer", "staff"]),
+                })
+            self.w.add(order_table, row)
+
+            seats = self.table_seats[table_id]
+            lines = max(1, min(int(rng.gauss(seats * 0.9, 1.2)), 10))
+            picks = rng.choices(self.products, weights=self.product_weights, k=lines)
+            for product_id, name, price in {p[0]: p for p in picks}.values():
+                items.append((order_id, created_at, status, product_id, name, price))
+
+        first_item = self.w.reserve_ids(item_table, len(items))
+        transitions = []
+        for offset, (order_id, created_at, status, product_id, name, price) in enumerate(items):
+            item_status = self._item_status(status)
+            transitions += self._item_transitions(first_item + offset, order_id, created_at, product_id, item_status)
+            self.w.add(item_table, {
+                "id": first_item + offset,
+                "order_id": order_id,
+                "product_id": product_id,
+                "product_name": name,
+                "quantity": rng.choices([1, 2, 3, 4], weights=[70, 20, 7, 3])[0],
+                "price_cents": price,
+                "status": item_status,
+                "status_updated_at": created_at + timedelta(minutes=rng.randrange(5, 45)),
+                "prepared_by_user_id": self.staff_ids[1] if item_status != models.OrderItemStatus.pending else None,
+                "delivered_by_user_id": (
+                    rng.choice(self.waiter_ids)
+                    if item_status == models.OrderItemStatus.delivered and self.waiter_ids else None
+                ),
+                "cancelled_reason": "Customer changed mind" if item_status == models.OrderItemStatus.cancelled else None,
+            })
+
+        transition_table = models.OrderItemStatusTransition.__table__
+        first_transition = self.w.reserve_ids(transition_table, len(transitions))
+        for offset, row in enumerate(transitions):
+            self.w.add(transition_table, {"id": first_transition + offset, "tenant_id": self.tenant_id, **row})
+
+    def _item_transitions(self, item_id: int, order_id: int, created_at: datetime, product_id: int,
+                          item_status: models.OrderItemStatus) -> list[dict]:
+        """
+        Status log rows taking the item from pending to item_status. Cook times vary
+        per product and are drawn from prep_rng, so the rest of the data does not
+        depend on them.
+        """
+        S, rng = models.OrderItemStatus, self.prep_rng
+        if product_id not in self.cook_minutes:
+            self.cook_minutes[product_id] = rng.uniform(2, 20)
+        path = {
+            S.pending: [], S.preparing: [S.preparing], S.ready: [S.preparing, S.ready],
+            S.delivered: [S.preparing, S.ready, S.delivered], S.cancelled: [S.cancelled],
+        }[item_status]
+        waits = {
+            S.preparing: rng.uniform(0.5, 8), S.cancelled: rng.uniform(1, 15), S.delivered: rng.uniform(0.5, 6),
+            S.ready: self.cook_minutes[product_id] * rng.lognormvariate(0, 0.35),
+        }
+        rows = [{"order_id": order_id, "item_id": item_id, "from_status": None, "to_status": S.pending,
+                 "changed_at": created_at}]
+        at = created_at
+        for status in path:
+            at = min(at + timedelta(minutes=waits[status]), self.now)
+            rows.append({"order_id": order_id, "item_id": item_id, "from_status": rows[-1]["to_status"],
+                         "to_status": status, "changed_at": at})
+        return rows
+
+    def _item_status(self, order_status: models.OrderStatus) -> models.OrderItemStatus:
+        S = models.OrderItemStatus
+        if order_status == models.OrderStatus.cancelled:
+            return S.cancelled
+        if order_status in (models.OrderStatus.paid, models.OrderStatus.completed):
+            return S.cancelled if self.rng.random() < 0.02 else S.delivered
+        if order_status == models.OrderStatus.pending:
+            return S.pending
+        if order_status == models.OrderStatus.preparing:
+            return _weighted(self.rng, [(S.pending, 0.3), (S.preparing, 0.7)])
+        if order_status == models.OrderStatus.ready:
+            return S.ready
+        return _weighted(self.rng, [(S.delivered, 0.5), (S.ready, 0.2), (S.preparing, 0.3)])
+
+    # ------------------------------------------------------------ reservations
+
+    def _reservations(self) -> None:
+        rng, table = self.rng, models.Reservation.__table__
+        today = self.now.astimezone(self.tz).date()
+        day = today - timedelta(days=31 * self.v.months)
+        last_day = today + timedelta(days=14)
+        R = models.ReservationStatus
+        while day <= last_day:
+            n = max(0, int(rng.gauss(self.v.reservations_per_day * WEEKDAY_FACTOR[day.weekday()], 3)))
+            first = self.w.reserve_ids(table, n)
+            for i in range(n):
+                if day < today:
+                    status = _weighted(rng, [(R.finished, 0.82), (R.cancelled, 0.1), (R.booked, 0.08)])
+                elif day == today:
+                    status = _weighted(rng, [(R.booked, 0.6), (R.seated, 0.3), (R.finished, 0.1)])
+                else:
+                    status = _weighted(rng, [(R.booked, 0.93), (R.cancelled, 0.07)])
+                hour = rng.choice([13, 13, 14, 14, 15, 20, 20, 21, 21, 21, 22])
+                self.w.add(table, {
+                    "id": first + i,
+                    "tenant_id": self.tenant_id,
+                    "customer_name": f"Guest {first + i}",
+                    "customer_phone": f"+34 6{rng.randrange(10**7, 10**8)}",
+                    "reservation_date": day,
+                    "reservation_time": time(hour, rng.choice([0, 15, 30, 45])),
+                    "party_size": rng.choices([2, 3, 4, 5, 6, 8], weights=[40, 12, 28, 8, 8, 4])[0],
+                    "status": status,
+                    "table_id": rng.choice(self.table_ids) if status in (R.seated, R.finished) else None,
+                    "token": f"syn-{self.tenant_id}-{first + i}" if rng.random() < 0.4 else None,
+                    "created_at": self._local_to_utc(day, 10) - timedelta(days=rng.randrange(0, 21)),
+                })
+            day += timedelta(days=1)
+
+    # ------------------------------------------------------------ inventory
+
+    def _inventory(self) -> None:
+        rng, v = self.rng, self.v
+        item_table = inventory_models.InventoryItem.__table__
+        batch_table = inventory_models.InventoryBatch.__table__
+        tx_table = inventory_models.InventoryTransaction.__table__
+        T = inventory_models.TransactionType
+        today = self.now.astimezone(self.tz).date()
+        first_day = today - timedelta(days=31 * v.months)
+        n_days = (today - first_day).days + 1
+
+        first_item = self.w.reserve_ids(item_table, v.inventory_items)
+        plans = []
+        for i in range(v.inventory_items):
+            unit, category = INVENTORY_UNITS[i % len(INVENTORY_UNITS)]
+            daily_use = Decimal(rng.randrange(5, 200)) / 10
+            cost = rng.randrange(80, 2500)
+            plans.append((first_item + i, unit, daily_use, cost))
+            self.w.add(item_table, {
+                "id": first_item + i,
+                "tenant_id": self.tenant_id,
+                "sku": f"SYN-{self.tenant_id}-{i + 1:04d}",
+                "name": f"Stock item {i + 1}",
+                "unit": unit,
+                "category": category,
+                "reorder_level": daily_use * 3,
+                "reorder_quantity": daily_use * 7,
+                "average_cost_cents": cost,
+                "created_at": self._local_to_utc(first_day, 9),
+            })
+
+        balances = []
+        for item_id, unit, daily_use, cost in plans:
+            weekly = daily_use * 7
+            n_batches = n_days // 7 + 1
+            first_batch = self.w.reserve_ids(batch_table, n_batches)
+            # One purchase per batch, one sale per day, occasional waste
+            n_waste = sum(1 for _ in range(n_days) if rng.random() < 0.05)
+            first_tx = self.w.reserve_ids(tx_table, n_batches + n_days + n_waste)
+            tx_id = first_tx
+            balance = Decimal(0)
+            for d in range(n_days):
+                day = first_day + timedelta(days=d)
+                if d % 7 == 0:
+                    batch_id = first_batch + d // 7
+                    received_at = self._local_to_utc(day, 9)
+                    self.w.add(batch_table, {
+                        "id": batch_id, "tenant_id": self.tenant_id, "inventory_item_id": item_id,
+                        "batch_number": f"LOT-{batch_id}", "received_at": received_at,
+                        "quantity_received": weekly, "quantity_remaining": weekly if d + 7 >= n_days else Decimal(0),
+                        "cost_per_unit_cents": cost, "created_at": received_at,
+                    })
+                    balance += weekly
+                    self.w.add(tx_table, {
+                        "id": tx_id, "tenant_id": self.tenant_id, "inventory_item_id": item_id,
+                        "batch_id": batch_id, "transaction_type": T.purchase, "quantity": weekly,
+                        "unit": unit, "unit_cost_cents": cost, "total_cost_cents": int(weekly * cost),
+                        "balance_after": balance, "created_by_id": self.owner_id, "created_at": received_at,
+                    })
+                    tx_id += 1
+                used = (daily_use * Decimal(rng.uniform(0.6, 1.4))).quantize(Decimal("0.0001"))
+                balance -= used
+                self.w.add(tx_table, {
+                    "id": tx_id, "tenant_id": self.tenant_id, "inventory_item_id": item_id,
+                    "transaction_type": T.sale, "quantity": -used, "unit": unit,
+                    "balance_after": balance, "created_at": self._local_to_utc(day, 23.5),
+                })
+                tx_id += 1
+            for _ in range(n_waste):
+                wasted = (daily_use * Decimal("0.2")).quantize(Decimal("0.0001"))
+                balance -= wasted
+                self.w.add(tx_table, {
+                    "id": tx_id, "tenant_id": self.tenant_id, "inventory_item_id": item_id,
+                    "transaction_type": T.waste, "quantity": -wasted, "unit": unit,
+                    "balance_after": balance, "notes": "Spoilage",
+                    "created_at": self._local_to_utc(today, 8),
+                })
+                tx_id += 1
+            balances.append({"item_id": item_id, "balance": balance})
+
+        self.w.flush()
+        self.w.conn.execute(
+            item_table.update()
+            .where(item_table.c.id == bindparam("item_id"))
+            .values(current_quantity=bindparam("balance")),
+            balances,
+        )
+
+
+def generate(conn, volumes: Volumes, seed: int = 1, now: datetime | None = None,
+             batch_size: int = 20_000, progress=None) -> Counter:
+    """
+    Generate `volumes` on an open connection (the caller commits). Returns rows
+    written per table name.
+    """
+    now = now or datetime.now(timezone.utc)
+    writer = RowWriter(conn, batch_size=batch_size)
+    password_hash = get_password_hash(PASSWORD)
+    for t in range(volumes.tenants):
+        rng = random.Random(f"{seed}:{t}")
+        prep_rng = random.Random(f"{seed}:{t}:prep")
+        tenant_id = TenantGenerator(writer, volumes, rng, now, password_hash, prep_rng).run()
+        # Rows went in through COPY / Core, past the ORM hooks that keep the rollup current
+        writer.counts[models.SalesDailyRollup.__tablename__] += rebuild_sales_rollup(conn, tenant_id)
+        if progress:
+            progress(t + 1, tenant_id, writer.counts)
+    return writer.counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    for f in fields(Volumes):
+        if f.name != "languages":
+            parser.add_argument(f"--{f.name.replace('_', '-')}", type=int, help=f"override the preset's {f.name}")
+    parser.add_argument("--languages", help="comma-separated translation languages, e.g. es,de,fr")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (same seed -> same data)")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="rows per COPY/insert batch")
+    parser.add_argument("--force", action="store_true", help="allow running with PRODUCTION=true")
+    args = parser.parse_args()
+
+    if settings.is_production and not args.force:
+        sys.exit("Refusing to write synthetic data to a production database (use --force).")
+
+    overrides = {
+        f.name: getattr(args, f.name) for f in fields(Volumes)
+        if f.name != "languages" and getattr(args, f.name) is not None
+    }
+    if args.languages:
+        overrides["languages"] = tuple(lang.strip() for lang in args.languages.split(",") if lang.strip())
+    volumes = replace(PRESETS[args.preset], **overrides)
+
+    print(f"Generating synthetic data: {volumes}")
+    started = time_module.perf_counter()
+
+    def progress(done, tenant_id, counts):
+        elapsed = time_module.perf_counter() - started
+        print(f"  tenant {tenant_id} done ({done}/{volumes.tenants}), "
+              f"{sum(counts.values()):,} rows, {elapsed:.1f}s, owner synthetic-{tenant_id}-owner@example.com")
+
+    with engine.begin() as conn:
+        counts = generate(conn, volumes, seed=args.seed, batch_size=args.batch_size, progress=progress)
+
+    if engine.dialect.name == "postgresql":
+        # Fresh statistics so benchmark query plans match a settled database
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+
+    elapsed = time_module.perf_counter() - started
+    total = sum(counts.values())
+    for name, count in sorted(counts.items()):
+        print(f"  {name:<24} {count:>12,}")
+    print(f"Done: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s). "
+          f"Users log in with password '{PASSWORD}'.")
+
+
+if __name__ == "__main__":
+    main()
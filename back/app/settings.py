@@ -34,6 +34,20 @@ class Settings(BaseSettings):
     db_password: str = Field(default="pos", validation_alias="DB_PASSWORD")
     db_name: str = Field(default="pos", validation_alias="DB_NAME")
 
+    # Connection pools: at most DB_MAX_CONNECTIONS for the whole backend, split over
+    # the workers and their two engines unless DB_POOL_SIZE / DB_MAX_OVERFLOW (per
+    # engine) are set. See _pool_sizes in app/db.py.
+    db_max_connections: int = Field(default=80, validation_alias="DB_MAX_CONNECTIONS")
+    db_pool_size: int | None = Field(default=None, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int | None = Field(default=None, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=10.0, validation_alias="DB_POOL_TIMEOUT")  # seconds to wait for a connection
+    db_pool_recycle: int = Field(default=1800, validation_alias="DB_POOL_RECYCLE")  # seconds; -1 disables
+    # Server-side statement_timeout in ms (0 disables) and application_name shown in pg_stat_activity
+    db_statement_timeout_ms: int = Field(default=30000, validation_alias="DB_STATEMENT_TIMEOUT_MS")
+    db_application_name: str = Field(default="pos2-back", validation_alias="DB_APPLICATION_NAME")
+    # Check/apply the schema when a worker starts. Disable when deploys run `python -m app.migrate`.
+    migrate_on_startup: bool = Field(default=True, validation_alias="MIGRATE_ON_STARTUP")
+
     secret_key: str = Field(
         default="CHANGE_THIS_IN_PRODUCTION", validation_alias="SECRET_KEY"
     )
@@ -72,6 +86,40 @@ class Settings(BaseSettings):
     email_from_name: str = Field(default="POS2 System", validation_alias="EMAIL_FROM_NAME")
     # Production mode (enables secure cookies, stricter CORS, etc.)
     is_production: bool = Field(default=False, validation_alias="PRODUCTION")
+    # Logging (see app/logging_config.py): root level, json|text (default: json in
+    # production), per-logger overrides "app.main=DEBUG,sqlalchemy.engine=INFO"
+    log_level: str = Field(default="INFO", validation_alias="LOG_LEVEL")
+    log_format: str | None = Field(default=None, validation_alias="LOG_FORMAT")
+    log_levels: str = Field(default="", validation_alias="LOG_LEVELS")
+    # Per-request SQL stats (Server-Timing header; default off in production, where
+    # the header would reach public clients); dev-only N+1 warning when one statement
+    # shape repeats more than this many times in a request (0 disables the warning)
+    query_stats_enabled: bool | None = Field(default=None, validation_alias="QUERY_STATS_ENABLED")
+    n_plus_one_warn_threshold: int = Field(default=10, validation_alias="N_PLUS_ONE_WARN_THRESHOLD")
+    # Dev only: warn when a callback blocks the event loop longer than this (ms, 0 disables)
+    event_loop_block_warn_ms: int = Field(default=100, validation_alias="EVENT_LOOP_BLOCK_WARN_MS")
+    # Prometheus metrics at GET /metrics; when METRICS_TOKEN is set, scrapes must send
+    # `Authorization: Bearer <token>`. In production /metrics is 404 without a token
+    metrics_enabled: bool = Field(default=True, validation_alias="METRICS_ENABLED")
+    metrics_token: str | None = Field(default=None, validation_alias="METRICS_TOKEN")
+    # OpenTelemetry tracing: none | console | file | otlp (see app/tracing.py)
+    tracing_exporter: str = Field(default="none", validation_alias="TRACING_EXPORTER")
+    tracing_file: str = Field(default="traces-{pid}.jsonl", validation_alias="TRACING_FILE")
+    # Background report jobs (see app/report_jobs.py): job files and artifacts live in
+    # REPORT_JOBS_DIR (shared by all workers; default back/report_jobs), kept for the TTL
+    report_jobs_dir: str | None = Field(default=None, validation_alias="REPORT_JOBS_DIR")
+    report_job_ttl_seconds: int = Field(default=3600, validation_alias="REPORT_JOB_TTL_SECONDS")
+    report_job_workers: int = Field(default=2, validation_alias="REPORT_JOB_WORKERS")  # threads per process
+    # Ready-time estimates (see app/prep_eta.py): items each station prepares at once
+    eta_station_capacity: int = Field(default=3, validation_alias="ETA_STATION_CAPACITY")
+    # Inventory worker (see app/inventory_worker.py): stream messages synced per transaction
+    inventory_worker_batch_size: int = Field(default=50, validation_alias="INVENTORY_WORKER_BATCH_SIZE")
+
+    @property
+    def query_stats_active(self) -> bool:
+        if self.query_stats_enabled is None:
+            return not self.is_production
+        return self.query_stats_enabled
 
     @property
     def database_url(self) -> str:
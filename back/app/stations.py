@@ -0,0 +1,29 @@
+"""
+Preparation stations.
+
+Products have no station of their own; it is derived from the product category:
+drinks are made at the bar, everything else in the kitchen (the bartender and
+kitchen roles split the same way). Reports, ready-time estimates and the kitchen
+queue all use this mapping.
+"""
+from sqlalchemy import case, func, or_
+
+from . import models
+
+BAR, KITCHEN = "bar", "kitchen"
+STATIONS = (KITCHEN, BAR)
+# Product categories served from the bar (matched case-insensitively)
+BAR_CATEGORY_WORDS = ("beverage", "drink", "wine", "beer", "cocktail", "coffee")
+
+
+def station_for(category: str | None) -> str:
+    category = (category or "").lower()
+    return BAR if any(word in category for word in BAR_CATEGORY_WORDS) else KITCHEN
+
+
+def station_expr(category=models.Product.category):
+    """SQL for station_for(category), labelled "station"."""
+    category = func.lower(category)
+    return case(
+        (or_(*(category.like(f"%{word}%") for word in BAR_CATEGORY_WORDS)), BAR), else_=KITCHEN
+    ).label("station")
@@ -0,0 +1,247 @@
+"""
+OpenTelemetry tracing for the API backend (off unless TRACING_EXPORTER is set).
+
+Spans:
+- one server span per HTTP request, named by route template and continuing an
+  incoming W3C `traceparent` header;
+- every SQL statement (SQLAlchemy cursor events, sync and async engines);
+- Redis commands and pipelines (clients are wrapped in get_redis/get_async_redis);
+- Stripe API calls and order-event publishing.
+
+publish_order_update adds the current `traceparent` to the event payload, so
+ws-bridge continues the same trace while it fans the event out to WebSockets:
+create_order -> publish -> Redis -> ws-bridge -> ws.send_* is one trace.
+
+Exporters (TRACING_EXPORTER): "console" (stdout), "file" (JSON lines at TRACING_FILE,
+"{pid}" is replaced by the worker pid) or "otlp" (needs the optional
+opentelemetry-exporter-otlp-proto-http package; configured by the standard
+OTEL_EXPORTER_OTLP_* variables). opentelemetry is imported only when enabled.
+"""
+import functools
+import inspect
+import logging
+import os
+from contextlib import nullcontext
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import redis_command_name
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "pos2-api"
+MAX_STATEMENT_LENGTH = 2000
+
+# Set by setup_tracing(); while _tracer is None every helper below is a no-op
+_tracer = None
+_provider = None
+_propagator = None
+_trace = None  # opentelemetry.trace module
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def _make_exporter(name: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        path = settings.tracing_file.replace("{pid}", str(os.getpid()))
+        out = open(path, "a", buffering=1)
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER {name!r} (expected none, console, file or otlp)")
+
+
+def setup_tracing(exporter=None) -> bool:
+    """
+    Start tracing in this process (call once per worker, after fork).
+
+    `exporter` overrides TRACING_EXPORTER and is exported synchronously (tests).
+    Returns True when tracing is active.
+    """
+    global _tracer, _provider, _propagator, _trace
+    if _tracer is not None:
+        return True
+    name = (settings.tracing_exporter or "none").lower()
+    if exporter is None and name == "none":
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+        from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+        if exporter is None:
+            processor = BatchSpanProcessor(_make_exporter(name))
+        else:
+            processor = SimpleSpanProcessor(exporter)
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Tracing disabled: {e}")
+        return False
+
+    service_name = os.getenv("OTEL_SERVICE_NAME") or SERVICE_NAME
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(processor)
+    _tracer = _provider.get_tracer(__name__)
+    _propagator = TraceContextTextMapPropagator()
+    _trace = trace
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    logger.info(f"Tracing enabled ({'custom' if exporter is not None else name} exporter)")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop tracing (worker shutdown)."""
+    global _tracer, _provider
+    if _tracer is None:
+        return
+    event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.remove(Engine, "handle_error", _handle_error)
+    _tracer = None
+    _provider.shutdown()
+    _provider = None
+
+
+def span(name: str, kind: str = "internal", attributes: dict | None = None):
+    """Context manager for a child span of the current one (no-op when tracing is off)."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(
+        name, kind=getattr(_trace.SpanKind, kind.upper()), attributes=attributes
+    )
+
+
+def with_traceparent(payload: dict) -> dict:
+    """
+    Copy of an event payload carrying the current trace context ("traceparent" key).
+    ws-bridge strips the key before sending events to customer (table) sockets.
+    """
+    if _tracer is None:
+        return payload
+    payload = dict(payload)
+    _propagator.inject(payload)
+    return payload
+
+
+# ---------------------------------------------------------------- HTTP
+
+
+class TracingMiddleware:
+    """ASGI middleware: one server span per HTTP request (see module docstring)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            method,
+            context=_propagator.extract(carrier),
+            kind=_trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as server_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    server_span.update_name(f"{method} {route}")
+                    server_span.set_attribute("http.route", route)
+                server_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    server_span.set_status(_trace.Status(_trace.StatusCode.ERROR))
+
+
+# ---------------------------------------------------------------- SQL
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    db_span = _tracer.start_span(
+        f"db {operation}",
+        kind=_trace.SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    conn.info.setdefault("otel_spans", []).append(db_span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    spans = conn.info.get("otel_spans")
+    if spans:
+        db_span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            db_span.set_attribute("db.rowcount", cursor.rowcount)
+        db_span.end()
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is None or conn.closed:
+        return
+    spans = conn.info.get("otel_spans")
+    if spans:
+        db_span = spans.pop()
+        db_span.record_exception(exception_context.original_exception)
+        db_span.set_status(_trace.Status(_trace.StatusCode.ERROR))
+        db_span.end()
+
+
+# ---------------------------------------------------------------- Redis
+
+
+def _traced_redis(func, command_of):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def traced(*args, **kwargs):
+            with span(f"redis {command_of(args)}", "client", {"db.system": "redis"}):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            with span(f"redis {command_of(args)}", "client", {"db.system": "redis"}):
+                return func(*args, **kwargs)
+    return traced
+
+
+def instrument_redis(client):
+    """Span per command (and per pipeline execute) on a redis / redis.asyncio client."""
+    pipeline = client.pipeline
+
+    @functools.wraps(pipeline)
+    def traced_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        pipe.execute = _traced_redis(pipe.execute, lambda args: "PIPELINE")
+        return pipe
+
+    client.execute_command = _traced_redis(client.execute_command, redis_command_name)
+    client.pipeline = traced_pipeline
+    return client
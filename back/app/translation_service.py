@@ -2,8 +2,9 @@
 Translation service for fetching localized content from the database.
 """
 
-from typing import Optional, Dict, Any
-from sqlmodel import Session, select
+from typing import Optional, Dict, Any, Iterable
+from sqlmodel import Session, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .models import I18nText
 
 
@@ -58,6 +59,40 @@ class TranslationService:
         # Return fallback
         return fallback_value
 
+    @staticmethod
+    async def get_translated_fields_async(
+        session: AsyncSession,
+        tenant_id: Optional[int],
+        entity_type: str,
+        entity_ids: Iterable[int],
+        lang: str,
+    ) -> Dict[tuple[int, str], str]:
+        """
+        Batch variant of get_translated_field for an async session.
+
+        Loads every translation for the given entities in `lang` with one query.
+        Returns {(entity_id, field): text}; tenant-specific rows take precedence
+        over global ones, same lookup order as get_translated_field.
+        """
+        ids = list(set(entity_ids))
+        if not ids:
+            return {}
+        tenant_filter = I18nText.tenant_id.is_(None)
+        if tenant_id is not None:
+            tenant_filter = or_(I18nText.tenant_id == tenant_id, I18nText.tenant_id.is_(None))
+        stmt = select(I18nText).where(
+            I18nText.entity_type == entity_type,
+            I18nText.entity_id.in_(ids),
+            I18nText.lang == lang,
+            tenant_filter,
+        )
+        translations: Dict[tuple[int, str], str] = {}
+        for row in (await session.exec(stmt)).all():
+            key = (row.entity_id, row.field)
+            if row.tenant_id is not None or key not in translations:
+                translations[key] = row.text
+        return translations
+
     @staticmethod
     def get_all_translations_for_entity(
         session: Session, tenant_id: Optional[int], entity_type: str, entity_id: int
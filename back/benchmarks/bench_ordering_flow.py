@@ -0,0 +1,158 @@
+"""
+In-process benchmarks (pytest-benchmark) for each step of the customer ordering flow.
+
+The app runs in this process against a sqlite file and fakeredis, so the numbers
+measure the handlers themselves (validation, ORM, serialization, publishing)
+without network or Postgres. Use benchmarks/ordering_flow.py for the end-to-end
+numbers under concurrency.
+
+Usage (from back/; the file name keeps these out of the regular test run):
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks/bench_ordering_flow.py --benchmark-save=baseline
+    python -m pytest benchmarks/bench_ordering_flow.py --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+import os
+import sys
+import tempfile
+from itertools import cycle
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import main, models, security
+from back.app.main import app, get_async_session, get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+MENU_SIZE = 60
+
+
+@pytest.fixture(scope="module")
+def stack():
+    db_dir = tempfile.TemporaryDirectory()
+    db_path = os.path.join(db_dir.name, "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    main.redis_client = fakeredis.FakeRedis()
+    main.async_redis_client = fakeredis.aioredis.FakeRedis()
+
+    with Session(engine) as session:
+        tenant = models.Tenant(name="Bench Bistro", timezone="Europe/Madrid")
+        session.add(tenant)
+        session.commit()
+        owner = models.User(
+            email="bench-owner@example.com",
+            hashed_password=security.get_password_hash("bench"),
+            role=models.UserRole.owner,
+            tenant_id=tenant.id,
+        )
+        table = models.Table(name="T1", tenant_id=tenant.id)
+        products = [
+            models.Product(name=f"Dish {i}", price_cents=500 + i * 10, category="Mains", tenant_id=tenant.id)
+            for i in range(MENU_SIZE)
+        ]
+        session.add_all([owner, table, *products])
+        session.commit()
+        table_id, token = table.id, table.token
+        product_ids = [p.id for p in products]
+
+    client = TestClient(app)
+    response = client.post("/token", data={"username": "bench-owner@example.com", "password": "bench"})
+    headers = {"Authorization": f"Bearer {response.cookies['access_token']}"}
+    client.cookies.clear()
+
+    yield {
+        "client": client,
+        "headers": headers,
+        "table_id": table_id,
+        "token": token,
+        "product_ids": product_ids,
+    }
+
+    app.dependency_overrides = {}
+    main.redis_client = None
+    main.async_redis_client = None
+    engine.dispose()
+    db_dir.cleanup()
+
+
+def _activate(stack) -> str:
+    response = stack["client"].post(f"/tables/{stack['table_id']}/activate", headers=stack["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()["pin"]
+
+
+def _place_order(stack, pin: str, items: int = 3) -> int:
+    response = stack["client"].post(f"/menu/{stack['token']}/order", json={
+        "items": [{"product_id": pid, "quantity": 1, "source": "product"} for pid in stack["product_ids"][:items]],
+        "pin": pin,
+        "session_id": "bench",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["order_id"]
+
+
+def test_menu(benchmark, stack):
+    _activate(stack)
+    response = benchmark(stack["client"].get, f"/menu/{stack['token']}")
+    assert response.status_code == 200
+    assert len(response.json()["products"]) == MENU_SIZE
+
+
+def test_place_order(benchmark, stack):
+    # Fresh guests every round, so each order starts empty like in service
+    benchmark.pedantic(_place_order, setup=lambda: ((stack, _activate(stack)), {}), rounds=100)
+
+
+def test_order_status(benchmark, stack):
+    _place_order(stack, _activate(stack), items=5)
+    response = benchmark(stack["client"].get, f"/menu/{stack['token']}/order", params={"session_id": "bench"})
+    assert response.status_code == 200
+    assert len(response.json()["order"]["items"]) == 5
+
+
+def test_request_payment(benchmark, stack):
+    order_id = _place_order(stack, _activate(stack))
+    response = benchmark(
+        stack["client"].post,
+        f"/menu/{stack['token']}/order/{order_id}/request-payment",
+        json={"payment_method": "cash"},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_staff_item_status(benchmark, stack):
+    order_id = _place_order(stack, _activate(stack))
+    item_id = stack["client"].get(
+        f"/menu/{stack['token']}/order", params={"session_id": "bench"}
+    ).json()["order"]["items"][0]["id"]
+    statuses = cycle(["preparing", "ready"])
+
+    def update():
+        return stack["client"].put(
+            f"/orders/{order_id}/items/{item_id}/status",
+            headers=stack["headers"],
+            json={"status": next(statuses)},
+        )
+
+    response = benchmark(update)
+    assert response.status_code == 200, response.text
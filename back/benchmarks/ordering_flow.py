@@ -0,0 +1,321 @@
+"""
+End-to-end benchmark of the customer ordering flow against a running stack.
+
+Each benchmarked table runs guest journeys back to back, the way a real table turns
+over during service:
+
+  staff_activate_table   POST /tables/{id}/activate (new guests, new PIN)
+  menu                   GET  /menu/{token}
+  place_order            POST /menu/{token}/order
+  order_status           GET  /menu/{token}/order
+  request_payment        POST /menu/{token}/order/{order_id}/request-payment
+
+Meanwhile --staff kitchen/waiter workers move every ordered item through
+preparing -> ready -> delivered (staff_item_status: PUT /orders/{id}/items/{id}/status),
+so the customer requests compete with staff writes on the same orders and rows.
+
+Reports p50/p95/p99 latency, errors and throughput per step. --save-baseline writes
+the report as a JSON baseline; --compare checks a run against one and exits 1 when a
+step got slower (or its throughput dropped) by more than --tolerance percent.
+
+Usage (from back/, against `docker compose up` with seeded data):
+    pip install -r benchmarks/requirements.txt
+    python -m app.seeds.synthetic --preset small     # prints the owner login
+    python benchmarks/ordering_flow.py --base-url http://localhost:8020 \\
+        --email synthetic-1-owner@example.com --password synthetic \\
+        --tables 20 --staff 4 --duration 60 --save-baseline benchmarks/baseline.json
+    python benchmarks/ordering_flow.py ... --compare benchmarks/baseline.json
+
+Benchmarked tables are re-activated (new PIN, new order) on every journey, so use a
+tenant whose tables nobody else is using.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+CUSTOMER_STEPS = ["staff_activate_table", "menu", "place_order", "order_status", "request_payment"]
+STAFF_STEPS = ["staff_item_status"]
+ITEM_FLOW = ["preparing", "ready", "delivered"]
+# Compared against a baseline: latency percentiles (higher is worse) and throughput
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class Recorder:
+    """Latencies (successful requests) and error statuses per step."""
+
+    def __init__(self) -> None:
+        self.latencies_ms: dict[str, list[float]] = {step: [] for step in CUSTOMER_STEPS + STAFF_STEPS}
+        self.errors: dict[str, Counter] = {step: Counter() for step in self.latencies_ms}
+
+    async def request(self, client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs):
+        """Send one request; returns the response, or None when it failed."""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors[step][type(e).__name__] += 1
+            return None
+        if response.status_code >= 400:
+            self.errors[step][str(response.status_code)] += 1
+            return None
+        self.latencies_ms[step].append((time.perf_counter() - started) * 1000)
+        return response
+
+    def summary(self, seconds: float) -> dict:
+        steps = {}
+        for step, values in self.latencies_ms.items():
+            values = sorted(values)
+            steps[step] = {
+                "count": len(values),
+                "errors": sum(self.errors[step].values()),
+                "error_kinds": dict(self.errors[step]),
+                "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+                "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+                "p50_ms": round(_percentile(values, 50), 2),
+                "p95_ms": round(_percentile(values, 95), 2),
+                "p99_ms": round(_percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2) if values else 0.0,
+            }
+        return steps
+
+
+# ============ SETUP ============
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/token", data={"username": email, "password": password})
+    if response.status_code != 200:
+        raise SystemExit(f"Login as {email} failed: {response.status_code} {response.text}")
+    # Staff requests send the token explicitly; customer requests stay anonymous
+    token = response.cookies["access_token"]
+    client.cookies.clear()
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def pick_tables(client: httpx.AsyncClient, headers: dict, count: int) -> list[dict]:
+    response = await client.get("/tables", headers=headers)
+    response.raise_for_status()
+    tables = sorted(response.json(), key=lambda t: t["id"])[:count]
+    if not tables:
+        raise SystemExit("The tenant has no tables to benchmark")
+    if len(tables) < count:
+        print(f"Only {len(tables)} tables available, benchmarking those", file=sys.stderr)
+    return tables
+
+
+# ============ WORKERS ============
+
+
+async def customer_journeys(
+    client: httpx.AsyncClient,
+    staff_headers: dict,
+    table: dict,
+    recorder: Recorder,
+    kitchen: asyncio.Queue,
+    deadline: float,
+    args,
+    rng: random.Random,
+) -> int:
+    """Run guest journeys at one table until the deadline; returns completed journeys."""
+    token = table["token"]
+    journeys = 0
+    while time.monotonic() < deadline:
+        activated = await recorder.request(
+            client, "staff_activate_table", "POST", f"/tables/{table['id']}/activate", headers=staff_headers
+        )
+        if activated is None:
+            await asyncio.sleep(1.0)
+            continue
+        pin = activated.json()["pin"]
+        session_id = f"bench-{table['id']}-{journeys}"
+
+        menu = await recorder.request(client, "menu", "GET", f"/menu/{token}")
+        products = menu.json().get("products", []) if menu is not None else []
+        if not products:
+            await asyncio.sleep(1.0)
+            continue
+
+        picks = rng.sample(products, min(len(products), rng.randint(1, args.max_items)))
+        placed = await recorder.request(client, "place_order", "POST", f"/menu/{token}/order", json={
+            "items": [
+                {"product_id": p["id"], "quantity": rng.randint(1, 3), "source": p.get("_source")}
+                for p in picks
+            ],
+            "pin": pin,
+            "session_id": session_id,
+        })
+        if placed is None:
+            continue
+        order_id = placed.json()["order_id"]
+
+        current = await recorder.request(
+            client, "order_status", "GET", f"/menu/{token}/order", params={"session_id": session_id}
+        )
+        if current is not None and current.json().get("order"):
+            item_ids = [item["id"] for item in current.json()["order"]["items"]]
+            kitchen.put_nowait((order_id, item_ids))
+
+        await recorder.request(
+            client, "request_payment", "POST", f"/menu/{token}/order/{order_id}/request-payment",
+            json={"payment_method": rng.choice(["cash", "card_terminal"])},
+        )
+        journeys += 1
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+    return journeys
+
+
+async def staff_worker(
+    client: httpx.AsyncClient, headers: dict, recorder: Recorder, kitchen: asyncio.Queue, stop: asyncio.Event
+) -> None:
+    """Move queued items through the kitchen statuses, one order at a time."""
+    while not stop.is_set():
+        try:
+            order_id, item_ids = await asyncio.wait_for(kitchen.get(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
+        for new_status in ITEM_FLOW:
+            for item_id in item_ids:
+                if stop.is_set():
+                    return
+                await recorder.request(
+                    client, "staff_item_status", "PUT", f"/orders/{order_id}/items/{item_id}/status",
+                    headers=headers, json={"status": new_status},
+                )
+
+
+# ============ REPORT ============
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    """Print current vs baseline per step; returns the regressions."""
+    regressions = []
+    print(f"\n{'step':<22}{'metric':<9}{'baseline':>11}{'current':>11}{'change':>9}")
+    for step, current in report["steps"].items():
+        base = baseline.get("steps", {}).get(step)
+        if not base or not base["count"] or not current["count"]:
+            continue
+        for metric in LATENCY_METRICS + ["rps"]:
+            old, new = base[metric], current[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            if metric == "rps":
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance and new - old > min_delta_ms
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{step:<22}{metric:<9}{old:>11.2f}{new:>11.2f}{change:>8.1f}%{flag}")
+            if regressed:
+                regressions.append(f"{step} {metric}: {old:.2f} -> {new:.2f} ({change:+.1f}%)")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['journeys']} journeys in {report['duration_s']}s "
+          f"({report['config']['tables']} tables, {report['config']['staff']} staff workers)")
+    print(f"{'step':<22}{'ok':>7}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for step, s in report["steps"].items():
+        print(f"{step:<22}{s['count']:>7}{s['errors']:>6}{s['rps']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+
+
+# ============ MAIN ============
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    kitchen: asyncio.Queue = asyncio.Queue()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.tables + args.staff + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        staff_headers = await login(client, args.email, args.password)
+        tables = await pick_tables(client, staff_headers, args.tables)
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        staff = [
+            asyncio.create_task(staff_worker(client, staff_headers, recorder, kitchen, stop))
+            for _ in range(args.staff)
+        ]
+        journeys = await asyncio.gather(*(
+            customer_journeys(
+                client, staff_headers, table, recorder, kitchen, deadline, args,
+                random.Random(f"{args.seed}:{table['id']}"),
+            )
+            for table in tables
+        ))
+        elapsed = time.monotonic() - started
+        stop.set()
+        await asyncio.gather(*staff)
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "base_url": args.base_url,
+            "tables": len(tables),
+            "staff": args.staff,
+            "duration": args.duration,
+            "max_items": args.max_items,
+            "think": args.think,
+            "seed": args.seed,
+        },
+        "duration_s": round(elapsed, 2),
+        "journeys": sum(journeys),
+        "journeys_per_s": round(sum(journeys) / elapsed, 2) if elapsed else 0.0,
+        "steps": recorder.summary(elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the customer ordering flow end to end")
+    parser.add_argument("--base-url", default="http://localhost:8020", help="API base URL (default: http://localhost:8020)")
+    parser.add_argument("--email", required=True, help="Staff login with table activate and item status permissions")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--tables", type=int, default=10, help="Tables with concurrent guest journeys (default: 10)")
+    parser.add_argument("--staff", type=int, default=2, help="Concurrent staff item-status workers (default: 2)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (default: 30)")
+    parser.add_argument("--max-items", type=int, default=4, help="Max distinct products per order (default: 4)")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean pause between journeys in seconds (default: 0)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds (default: 30)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for product picks (default: 1)")
+    parser.add_argument("--json-out", type=Path, default=None, help="Write the report to this file")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="Write the report as the baseline")
+    parser.add_argument("--compare", type=Path, default=None, help="Compare against this baseline")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="Allowed slowdown / throughput drop in percent (default: 10)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Ignore latency changes smaller than this, however large in percent (default: 2)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    for path in (args.json_out, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance}%:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance}% against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/bin/sh
+# Backend launcher.
+#   SERVER_MODE=production  -> apply the schema once (python -m app.migrate), then
+#                              gunicorn with uvicorn workers (gunicorn.conf.py)
+#   SERVER_MODE=development -> single uvicorn process with --reload
+set -e
+
+case "$(echo "${SERVER_MODE:-production}" | tr '[:upper:]' '[:lower:]')" in
+    dev|development)
+        exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8020}" --reload
+        ;;
+    *)
+        # One-shot schema bootstrap before forking workers (advisory-locked, so
+        # concurrent containers are safe); workers then skip it via MIGRATE_ON_STARTUP=false
+        python -m app.migrate
+        export MIGRATE_ON_STARTUP=false
+        exec gunicorn -c gunicorn.conf.py app.main:app
+        ;;
+esac
@@ -0,0 +1,79 @@
+"""
+Gunicorn settings for the production backend (see entrypoint.sh).
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every value can be overridden through the environment variables read below.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _cpu_count() -> int:
+    # Respect CPU affinity / container cpusets where available
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8020')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# One async worker per core; each worker also runs sync endpoints in its own threadpool.
+# Each worker has its own DB pools (sync + async); app/db.py sizes them from
+# DB_MAX_CONNECTIONS and the worker count exported here, so all workers together
+# stay below Postgres max_connections.
+workers = int(os.getenv("GUNICORN_WORKERS") or os.getenv("WEB_CONCURRENCY") or max(2, _cpu_count()))
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Kill a worker that has not notified the master for this long (seconds); report
+# exports are the slowest requests
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# On SIGTERM/redeploy, let in-flight requests finish for up to this long
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Idle keep-alive (seconds). Longer than HAProxy's 50s server timeout, so the
+# proxy closes idle connections before the worker does (no reset on reuse)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+
+# Recycle workers after N requests (0 = never); jitter avoids restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# Off by default: every worker imports the app itself, so no DB/Redis state crosses fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+# Prometheus multiprocess mode: workers write samples to this directory and /metrics
+# aggregates them, whichever worker serves the scrape. Set before any worker imports
+# prometheus_client (see app/metrics.py).
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc")
+)
+
+
+def on_starting(server):
+    # Samples from a previous master run would be summed into the new one
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # With preload_app the worker inherits the master's module state; drop pooled
+    # DB connections and Redis clients so each worker opens its own.
+    main = sys.modules.get("app.main")
+    if main is not None:
+        main.reset_worker_state()
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (in-flight requests, pool state)
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup import-time report for the backend.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+summarizes where worker cold-start time goes: slowest modules by cumulative and
+self time, plus heavy optional libraries that should stay lazily imported.
+
+Usage (from back/):
+    python importtime_report.py
+    python importtime_report.py --top 40 --module app.main
+    python importtime_report.py --json > importtime.json
+    python importtime_report.py --budget-ms 3000   # exit 1 if app.main is slower
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACK_DIR = Path(__file__).resolve().parent
+
+# Libraries that only some requests need; importing app.main must not load them.
+LAZY_MODULES = ("PIL", "stripe", "redis", "reportlab", "openpyxl")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str = "app.main", cwd: Path = BACK_DIR) -> dict:
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns {"module", "total_us", "entries": [{"name", "self_us", "cumulative_us", "depth"}],
+    "lazy_loaded": [heavy libraries that were imported anyway]}.
+    """
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "name": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": len(indent) // 2,
+            })
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+    total = next((e["cumulative_us"] for e in entries if e["name"] == module), 0)
+    return {
+        "module": module,
+        "total_us": total,
+        "entries": entries,
+        "lazy_loaded": sorted(loaded & set(LAZY_MODULES)),
+    }
+
+
+def _print_report(result: dict, top: int) -> None:
+    entries = result["entries"]
+    print(f"import {result['module']}: {result['total_us'] / 1000:.0f} ms")
+    print()
+    print(f"Top {top} by cumulative time:")
+    for e in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:top]:
+        print(f"  {e['cumulative_us'] / 1000:8.1f} ms  {e['name']}")
+    print()
+    print(f"Top {top} by self time:")
+    for e in sorted(entries, key=lambda e: e["self_us"], reverse=True)[:top]:
+        print(f"  {e['self_us'] / 1000:8.1f} ms  {e['name']}")
+    print()
+    if result["lazy_loaded"]:
+        print(f"Heavy libraries loaded at import: {', '.join(result['lazy_loaded'])}")
+    else:
+        print(f"Heavy libraries deferred: {', '.join(LAZY_MODULES)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import time of the backend app")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Rows per table (default: 25)")
+    parser.add_argument("--json", action="store_true", help="Print the raw measurement as JSON")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Exit with status 1 if the import takes longer than this")
+    args = parser.parse_args()
+
+    result = measure(args.module)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_report(result, args.top)
+
+    if args.budget_ms is not None and result["total_us"] / 1000 > args.budget_ms:
+        print(f"❌ import {args.module} took {result['total_us'] / 1000:.0f} ms "
+              f"(budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+-- Sales reports filter orders by tenant and revenue date (paid_at, else created_at)
+-- in SQL; this index serves that range scan.
+CREATE INDEX IF NOT EXISTS idx_order_tenant_revenue_date
+    ON "order"(tenant_id, (COALESCE(paid_at, created_at)));
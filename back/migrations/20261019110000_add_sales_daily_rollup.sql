@@ -0,0 +1,45 @@
+-- Daily sales rollup read by /reports for closed days (see app/sales_rollup.py).
+-- Rows with product_id NULL are per (day, table, waiter) order totals.
+CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER NOT NULL REFERENCES tenant(id),
+    day DATE NOT NULL,
+    product_id INTEGER,
+    product_name VARCHAR,
+    table_id INTEGER,
+    waiter_id INTEGER,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue_cents INTEGER NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_daily_rollup_tenant_day ON sales_daily_rollup(tenant_id, day);
+
+-- Backfill from existing orders (same rules as sales_rollup.revenue_lines);
+-- `python -m app.sales_rollup` does the same on demand.
+INSERT INTO sales_daily_rollup
+    (tenant_id, day, product_id, product_name, table_id, waiter_id, quantity, revenue_cents, order_count)
+WITH lines AS (
+    SELECT o.tenant_id, o.id AS order_id,
+           DATE(timezone('UTC', COALESCE(o.paid_at, o.created_at))) AS day,
+           o.table_id, COALESCE(t.assigned_waiter_id, f.default_waiter_id) AS waiter_id,
+           i.product_id, i.product_name, i.quantity, i.quantity * i.price_cents AS revenue_cents
+    FROM "order" o
+    JOIN orderitem i ON i.order_id = o.id
+    LEFT JOIN "table" t ON t.id = o.table_id
+    LEFT JOIN floor f ON f.id = t.floor_id
+    WHERE o.status IN ('paid', 'completed')
+      AND NOT i.removed_by_customer
+      AND i.status <> 'cancelled'
+)
+SELECT tenant_id, day, product_id, product_name, table_id, waiter_id,
+       SUM(quantity), SUM(revenue_cents), COUNT(DISTINCT order_id)
+FROM lines
+WHERE NOT EXISTS (SELECT 1 FROM sales_daily_rollup)
+GROUP BY tenant_id, day, product_id, product_name, table_id, waiter_id
+UNION ALL
+SELECT tenant_id, day, NULL, NULL, table_id, waiter_id,
+       SUM(quantity), SUM(revenue_cents), COUNT(DISTINCT order_id)
+FROM lines
+WHERE NOT EXISTS (SELECT 1 FROM sales_daily_rollup)
+GROUP BY tenant_id, day, table_id, waiter_id;
@@ -0,0 +1,17 @@
+-- Append-only log of order item status changes, written by a session hook
+-- (app/item_status_log.py) and read by GET /reports/prep-times.
+-- No foreign keys: rows outlive deleted items and orders.
+CREATE TABLE IF NOT EXISTS order_item_status_transition (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER NOT NULL REFERENCES tenant(id),
+    order_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    from_status VARCHAR(50),
+    to_status VARCHAR(50) NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    user_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_item_status_transition_tenant_changed
+    ON order_item_status_transition(tenant_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_item_status_transition_item ON order_item_status_transition(item_id);
@@ -0,0 +1,31 @@
+-- Moving mean of preparing -> ready seconds per product, updated by a session hook
+-- (app/prep_eta.py) and read for order ready-time estimates.
+CREATE TABLE IF NOT EXISTS product_prep_stats (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER NOT NULL REFERENCES tenant(id),
+    product_id INTEGER NOT NULL,
+    ewma_seconds DOUBLE PRECISION NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    CONSTRAINT uq_product_prep_stats_tenant_product UNIQUE (tenant_id, product_id)
+);
+
+-- Start from the last 14 days of the status log rather than from the defaults
+INSERT INTO product_prep_stats (tenant_id, product_id, ewma_seconds, samples, updated_at)
+SELECT oi_stats.tenant_id, oi_stats.product_id, AVG(oi_stats.seconds), COUNT(*), NOW()
+FROM (
+    SELECT started.tenant_id, oi.product_id,
+           EXTRACT(EPOCH FROM (finished.changed_at - started.changed_at)) AS seconds
+    FROM order_item_status_transition started
+    JOIN order_item_status_transition finished
+      ON finished.item_id = started.item_id
+     AND finished.from_status = 'preparing' AND finished.to_status = 'ready'
+     AND finished.changed_at > started.changed_at
+    JOIN orderitem oi ON oi.id = started.item_id
+    WHERE started.to_status = 'preparing'
+      AND started.changed_at >= NOW() - INTERVAL '14 days'
+      AND oi.product_id IS NOT NULL
+) oi_stats
+WHERE oi_stats.seconds > 0 AND oi_stats.seconds <= 10800
+GROUP BY oi_stats.tenant_id, oi_stats.product_id
+ON CONFLICT (tenant_id, product_id) DO NOTHING;
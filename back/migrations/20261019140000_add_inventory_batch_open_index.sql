@@ -0,0 +1,5 @@
+-- Inventory deduction reads the open batches of all of an order's ingredients in
+-- one query, oldest first; this index serves it without touching emptied batches.
+CREATE INDEX IF NOT EXISTS idx_inventory_batch_open
+    ON inventory_batch(inventory_item_id, received_at)
+    WHERE quantity_remaining > 0;
@@ -0,0 +1,28 @@
+-- Stock deduction moved to the inventory worker (app/inventory_worker.py): ledger rows
+-- now name the order item they were deducted for, inventory_deduction records how many
+-- units of each order item are deducted (what makes the worker idempotent), and
+-- cancelled or reduced items are put back with sale_reversal rows.
+ALTER TABLE inventory_transaction ADD COLUMN IF NOT EXISTS order_item_id INTEGER;
+CREATE INDEX IF NOT EXISTS ix_inventory_transaction_order_item_id
+    ON inventory_transaction(order_item_id);
+
+CREATE TABLE IF NOT EXISTS inventory_deduction (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER NOT NULL REFERENCES tenant(id),
+    order_item_id INTEGER NOT NULL UNIQUE,
+    order_id INTEGER NOT NULL,
+    quantity_deducted INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_inventory_deduction_order_id ON inventory_deduction(order_id);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'transactiontype') AND NOT EXISTS (
+        SELECT 1 FROM pg_enum
+        WHERE enumlabel = 'sale_reversal'
+        AND enumtypid = (SELECT oid FROM pg_type WHERE typname = 'transactiontype')
+    ) THEN
+        ALTER TYPE transactiontype ADD VALUE 'sale_reversal';
+    END IF;
+END $$;
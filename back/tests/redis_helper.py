@@ -0,0 +1,65 @@
+"""
+In-memory Redis (fakeredis) for tests of the publishing paths in app/main.py.
+
+One fake server backs the sync client returned by main.get_redis, a fresh async
+client per main.get_async_redis call (TestClient runs each request on its own
+event loop) and a subscriber that records every publish, so WATCH/MULTI, snapshot
+hashes and the PIN lockout keys behave as they do on a real server.
+"""
+import json
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import fakeredis
+import fakeredis.aioredis
+
+from back.app import main
+
+
+class InMemoryRedis:
+    def __init__(self):
+        self.server = fakeredis.FakeServer()
+        self.client = fakeredis.FakeRedis(server=self.server)
+        self._subscriber = fakeredis.FakeRedis(server=self.server).pubsub()
+        self._subscriber.psubscribe("orders:*")  # the WebSocket channels, not keyspace events
+        self._published = []
+
+    def async_client(self) -> fakeredis.aioredis.FakeRedis:
+        return fakeredis.aioredis.FakeRedis(server=self.server)
+
+    def patches(self) -> list:
+        """Patchers serving main.get_redis and main.get_async_redis from this server."""
+
+        async def get_async_redis():
+            return self.async_client()
+
+        return [
+            patch.object(main, "get_redis", lambda: self.client),
+            patch.object(main, "get_async_redis", get_async_redis),
+        ]
+
+    @contextmanager
+    def installed(self):
+        patches = self.patches()
+        for redis_patch in patches:
+            redis_patch.start()
+        try:
+            yield self
+        finally:
+            for redis_patch in patches:
+                redis_patch.stop()
+
+    def published(self, event_type: str | None = None) -> list[tuple[str, dict]]:
+        """(channel, event) of everything published so far, optionally of one event type."""
+        while (message := self._subscriber.get_message()) is not None:
+            if message["type"] == "pmessage":
+                self._published.append((message["channel"].decode(), json.loads(message["data"])))
+        return [(channel, event) for channel, event in self._published
+                if event_type is None or event["type"] == event_type]
+
+    def clear_published(self) -> None:
+        self.published()
+        self._published.clear()
+
+    def hash_fields(self, key: str) -> list[str]:
+        return sorted(field.decode() for field in self.client.hkeys(key))
@@ -0,0 +1,56 @@
+
+import asyncio
+import inspect
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import main, security
+from back.app.settings import settings
+
+
+class TestEventLoopBlocking(unittest.TestCase):
+    def test_sync_handlers_are_not_coroutines(self):
+        """Handlers/dependencies using the sync Session or Pillow must be plain `def`
+        so FastAPI runs them in the threadpool instead of on the event loop."""
+        for fn in (
+            main.list_catalog,
+            main.get_catalog_categories,
+            main.get_catalog_item,
+            main.upload_product_image,
+            main.upload_tenant_logo,
+            main.provider_upload_product_image,
+            security.get_current_user,
+            security.get_current_user_optional,
+            security.get_current_provider_user,
+        ):
+            self.assertFalse(inspect.iscoroutinefunction(fn), fn.__name__)
+
+    def _run_guard(self) -> tuple[bool, float]:
+        async def run():
+            await main.enable_event_loop_block_guard()
+            loop = asyncio.get_running_loop()
+            return loop.get_debug(), loop.slow_callback_duration
+
+        return asyncio.run(run())
+
+    def test_block_guard_enabled_in_dev(self):
+        with patch.object(settings, "is_production", False), \
+             patch.object(settings, "event_loop_block_warn_ms", 50):
+            debug, threshold = self._run_guard()
+        self.assertTrue(debug)
+        self.assertAlmostEqual(threshold, 0.05)
+
+    def test_block_guard_disabled_in_production(self):
+        with patch.object(settings, "is_production", True), \
+             patch.object(settings, "event_loop_block_warn_ms", 50):
+            debug, _threshold = self._run_guard()
+        self.assertFalse(debug)
+
+
+if __name__ == '__main__':
+    unittest.main()
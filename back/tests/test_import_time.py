@@ -0,0 +1,34 @@
+
+import sys
+import os
+import unittest
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.importtime_report import LAZY_MODULES, measure
+
+# Generous ceiling for `import app.main` (typically well under 2s); catches
+# regressions like a new eager heavy import, not machine noise.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "5000"))
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.result = measure("app.main")
+
+    def test_heavy_libraries_are_not_imported_at_startup(self):
+        self.assertEqual(
+            self.result["lazy_loaded"], [],
+            f"import app.main loaded {self.result['lazy_loaded']}; import them where they are used "
+            f"(deferred: {', '.join(LAZY_MODULES)})",
+        )
+
+    def test_import_time_budget(self):
+        total_ms = self.result["total_us"] / 1000
+        self.assertLess(total_ms, IMPORT_BUDGET_MS, f"import app.main took {total_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
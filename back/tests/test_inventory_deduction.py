@@ -0,0 +1,134 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import models
+from back.app.inventory_models import (
+    InventoryBatch, InventoryItem, InventoryTransaction, ProductRecipe, TransactionType, UnitOfMeasure,
+)
+from back.app.inventory_service import deduct_inventory_for_order
+
+
+class TestInventoryDeduction(unittest.TestCase):
+    """deduct_inventory_for_order: FIFO over batches with a fixed number of statements."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Stock Tapas")
+            session.add(tenant)
+            session.commit()
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            tortilla = models.Product(name="Tortilla", price_cents=800, tenant_id=tenant.id)
+            bravas = models.Product(name="Bravas", price_cents=600, tenant_id=tenant.id)
+            water = models.Product(name="Water", price_cents=200, tenant_id=tenant.id)
+            eggs = InventoryItem(tenant_id=tenant.id, sku="EGG", name="Eggs", current_quantity=Decimal("10"),
+                                 average_cost_cents=20)
+            potatoes = InventoryItem(tenant_id=tenant.id, sku="POT", name="Potatoes", unit=UnitOfMeasure.kilogram,
+                                     current_quantity=Decimal("1"), average_cost_cents=150)
+            session.add_all([table, tortilla, bravas, water, eggs, potatoes])
+            session.commit()
+            received = datetime(2026, 3, 1, tzinfo=timezone.utc)
+            session.add_all([
+                # Newer batch inserted first: FIFO goes by received_at
+                InventoryBatch(tenant_id=tenant.id, inventory_item_id=eggs.id, quantity_received=Decimal("6"),
+                               quantity_remaining=Decimal("6"), cost_per_unit_cents=25,
+                               received_at=received + timedelta(days=1)),
+                InventoryBatch(tenant_id=tenant.id, inventory_item_id=eggs.id, quantity_received=Decimal("6"),
+                               quantity_remaining=Decimal("4"), cost_per_unit_cents=15, received_at=received),
+                InventoryBatch(tenant_id=tenant.id, inventory_item_id=potatoes.id, quantity_received=Decimal("1"),
+                               quantity_remaining=Decimal("1"), cost_per_unit_cents=100, received_at=received),
+                ProductRecipe(tenant_id=tenant.id, product_id=tortilla.id, inventory_item_id=eggs.id,
+                              quantity_required=Decimal("3"), unit=UnitOfMeasure.piece),
+                ProductRecipe(tenant_id=tenant.id, product_id=tortilla.id, inventory_item_id=potatoes.id,
+                              quantity_required=Decimal("200"), unit=UnitOfMeasure.gram),
+                ProductRecipe(tenant_id=tenant.id, product_id=bravas.id, inventory_item_id=potatoes.id,
+                              quantity_required=Decimal("250"), unit=UnitOfMeasure.gram,
+                              waste_percentage=Decimal("20")),
+            ])
+            session.commit()
+            self.tenant_id, self.table_id = tenant.id, table.id
+            self.products = {p.name: (p.id, p.name) for p in (tortilla, bravas, water)}
+            self.eggs_id, self.potatoes_id = eggs.id, potatoes.id
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _deduct(self, lines):
+        with Session(self.engine) as session:
+            order = models.Order(tenant_id=self.tenant_id, table_id=self.table_id)
+            session.add(order)
+            session.commit()
+            session.add_all([
+                models.OrderItem(order_id=order.id, product_id=self.products[name][0], product_name=name,
+                                 quantity=quantity, price_cents=100)
+                for name, quantity in lines
+            ])
+            session.commit()
+            session.refresh(order, ["items"])
+            self.statements.clear()
+            deduct_inventory_for_order(session, order, session.get(models.Tenant, self.tenant_id))
+            session.commit()
+            return order.id, len(self.statements)
+
+    def test_fifo_deduction_and_ledger(self):
+        order_id, _ = self._deduct([("Tortilla", 2), ("Bravas", 1), ("Water", 1)])
+        with Session(self.engine) as session:
+            ledger = session.exec(
+                select(InventoryTransaction).where(InventoryTransaction.order_id == order_id)
+                .order_by(InventoryTransaction.id)
+            ).all()
+            self.assertEqual(
+                [(t.inventory_item_id, t.quantity, t.unit_cost_cents, t.balance_after, t.notes) for t in ledger],
+                [
+                    # 6 eggs: the 4 left of the older batch, then 2 of the newer one
+                    (self.eggs_id, Decimal("-4"), 15, Decimal("6"), f"Order #{order_id} - Tortilla"),
+                    (self.eggs_id, Decimal("-2"), 25, Decimal("4"), f"Order #{order_id} - Tortilla"),
+                    (self.potatoes_id, Decimal("-0.4"), 100, Decimal("0.6"), f"Order #{order_id} - Tortilla"),
+                    # 250 g + 20% waste, in the item's kilograms
+                    (self.potatoes_id, Decimal("-0.3"), 100, Decimal("0.3"), f"Order #{order_id} - Bravas"),
+                ],
+            )
+            self.assertTrue(all(t.transaction_type == TransactionType.sale and t.created_at for t in ledger))
+            self.assertEqual(session.get(InventoryItem, self.eggs_id).current_quantity, Decimal("4"))
+            batches = session.exec(
+                select(InventoryBatch).order_by(InventoryBatch.inventory_item_id, InventoryBatch.received_at)
+            ).all()
+            self.assertEqual([b.quantity_remaining for b in batches], [Decimal("0"), Decimal("4"), Decimal("0.3")])
+
+    def test_negative_stock_and_fixed_statement_count(self):
+        _, small = self._deduct([("Bravas", 1)])
+        order_id, large = self._deduct([("Tortilla", 4), ("Bravas", 3), ("Water", 2), ("Tortilla", 1)])
+        # Order items, recipes, locked items, open batches, updates and one INSERT, at any order size
+        self.assertEqual(small, large)
+        self.assertEqual(sum("INSERT INTO inventory_transaction" in s for s in self.statements), 1)
+        with Session(self.engine) as session:
+            ledger = session.exec(
+                select(InventoryTransaction).where(InventoryTransaction.order_id == order_id,
+                                                   InventoryTransaction.batch_id == None)
+            ).all()
+            self.assertTrue(ledger)
+            self.assertTrue(all(t.notes.endswith("[NEGATIVE STOCK]") for t in ledger))
+            self.assertEqual(session.get(InventoryItem, self.eggs_id).current_quantity, Decimal("-5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
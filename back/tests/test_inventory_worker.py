@@ -0,0 +1,214 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import fakeredis
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import inventory_worker, main, models, security
+from back.app.inventory_models import (
+    InventoryBatch, InventoryItem, InventoryTransaction, ProductRecipe, TransactionType, UnitOfMeasure,
+)
+from back.app.inventory_service import sync_inventory_for_items
+
+
+class TestInventoryWorker(unittest.TestCase):
+    """sync_inventory_for_items deducts and puts back only what changed; the worker acks after commit."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+        # Inventory tracking is off for every tenant until the flag ships
+        self.tracking = patch.object(models.Tenant, "inventory_tracking_enabled", True, create=True)
+        self.tracking.start()
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Worker Tapas")
+            session.add(tenant)
+            session.commit()
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            tortilla = models.Product(name="Tortilla", price_cents=800, tenant_id=tenant.id)
+            eggs = InventoryItem(tenant_id=tenant.id, sku="EGG", name="Eggs", current_quantity=Decimal("10"),
+                                 average_cost_cents=20)
+            session.add_all([table, tortilla, eggs])
+            session.commit()
+            received = datetime(2026, 3, 1, tzinfo=timezone.utc)
+            session.add_all([
+                InventoryBatch(tenant_id=tenant.id, inventory_item_id=eggs.id, quantity_received=Decimal("4"),
+                               quantity_remaining=Decimal("4"), cost_per_unit_cents=15, received_at=received),
+                InventoryBatch(tenant_id=tenant.id, inventory_item_id=eggs.id, quantity_received=Decimal("6"),
+                               quantity_remaining=Decimal("6"), cost_per_unit_cents=25,
+                               received_at=received + timedelta(days=1)),
+                ProductRecipe(tenant_id=tenant.id, product_id=tortilla.id, inventory_item_id=eggs.id,
+                              quantity_required=Decimal("3"), unit=UnitOfMeasure.piece),
+            ])
+            order = models.Order(tenant_id=tenant.id, table_id=table.id)
+            owner = models.User(email="owner@example.com", hashed_password="x", tenant_id=tenant.id,
+                                role=models.UserRole.owner)
+            session.add_all([order, owner])
+            session.commit()
+            item = models.OrderItem(order_id=order.id, product_id=tortilla.id, product_name=tortilla.name,
+                                    quantity=2, price_cents=800)
+            session.add(item)
+            session.commit()
+            self.order_id, self.item_id, self.eggs_id = order.id, item.id, eggs.id
+            self.auth_headers = {"Authorization": "Bearer " + security.create_access_token(
+                {"sub": owner.email, "tenant_id": tenant.id, "token_version": owner.token_version}
+            )}
+
+    def tearDown(self):
+        main.app.dependency_overrides = {}
+        self.tracking.stop()
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _sync(self):
+        with Session(self.engine) as session:
+            changed = sync_inventory_for_items(session, [self.item_id])
+            session.commit()
+            return changed
+
+    def _update_item(self, **values):
+        with Session(self.engine) as session:
+            item = session.get(models.OrderItem, self.item_id)
+            for name, value in values.items():
+                setattr(item, name, value)
+            session.add(item)
+            session.commit()
+
+    def _stock(self):
+        with Session(self.engine) as session:
+            batches = session.exec(select(InventoryBatch).order_by(InventoryBatch.received_at)).all()
+            eggs = session.get(InventoryItem, self.eggs_id)
+            return eggs.current_quantity, [b.quantity_remaining for b in batches]
+
+    def test_sync_applies_only_changes(self):
+        self.assertEqual(self._sync(), 1)
+        self.assertEqual(self._stock(), (Decimal("4"), [Decimal("0"), Decimal("4")]))
+        # Replayed message: nothing deducted twice
+        self.assertEqual(self._sync(), 0)
+        self.assertEqual(self._stock(), (Decimal("4"), [Decimal("0"), Decimal("4")]))
+
+        # One tortilla fewer: half of each batch's share goes back
+        self._update_item(quantity=1)
+        self.assertEqual(self._sync(), 1)
+        self.assertEqual(self._stock(), (Decimal("7"), [Decimal("2"), Decimal("5")]))
+        self._update_item(status=models.OrderItemStatus.cancelled, removed_by_customer=True)
+        self.assertEqual(self._sync(), 1)
+        self.assertEqual(self._sync(), 0)
+        self.assertEqual(self._stock(), (Decimal("10"), [Decimal("4"), Decimal("6")]))
+
+        with Session(self.engine) as session:
+            ledger = session.exec(select(InventoryTransaction).order_by(InventoryTransaction.id)).all()
+            self.assertEqual(
+                [(t.transaction_type, t.quantity, t.unit_cost_cents) for t in ledger],
+                [
+                    (TransactionType.sale, Decimal("-4"), 15), (TransactionType.sale, Decimal("-2"), 25),
+                    (TransactionType.sale_reversal, Decimal("2"), 15),
+                    (TransactionType.sale_reversal, Decimal("1"), 25),
+                    (TransactionType.sale_reversal, Decimal("2"), 15),
+                    (TransactionType.sale_reversal, Decimal("1"), 25),
+                ],
+            )
+            self.assertTrue(all(t.order_item_id == self.item_id for t in ledger))
+            self.assertEqual(ledger[-1].notes, f"Order #{self.order_id} - Tortilla [REVERSED]")
+
+    def _redis(self, *messages):
+        """fakeredis with the worker's consumer group and messages delivered to a worker that then died."""
+        redis = fakeredis.FakeRedis()
+        inventory_worker.ensure_group(redis)
+        for items in messages:
+            redis.xadd(inventory_worker.STREAM, {"items": items})
+        redis.xreadgroup(inventory_worker.GROUP, "worker-1", {inventory_worker.STREAM: ">"})
+        return redis
+
+    def _pending(self, redis):
+        return redis.xpending_range(inventory_worker.STREAM, inventory_worker.GROUP, min="-", max="+", count=10)
+
+    def test_worker_acks_after_commit(self):
+        redis = fakeredis.FakeRedis()
+        inventory_worker.ensure_group(redis)
+        for items in (str(self.item_id), "not-an-id", str(self.item_id)):
+            redis.xadd(inventory_worker.STREAM, {"items": items})
+        [(_, entries)] = redis.xreadgroup(inventory_worker.GROUP, "worker-1", {inventory_worker.STREAM: ">"})
+        # The bad message fails the batch; the others still go through, once
+        self.assertEqual(inventory_worker.process(redis, lambda: Session(self.engine), entries), 2)
+        self.assertEqual([entry["message_id"] for entry in self._pending(redis)], [entries[1][0]])
+        self.assertEqual(self._stock()[0], Decimal("4"))
+
+        # The API queues items on the stream, or syncs inline without Redis
+        self._update_item(quantity=1)
+        with Session(self.engine) as session:
+            with patch.object(main, "get_redis", lambda: redis):
+                main.queue_inventory_sync(session, [self.item_id, self.item_id])
+            _, fields = redis.xrange(inventory_worker.STREAM)[-1]
+            self.assertEqual(fields, {b"items": str(self.item_id).encode()})
+            self.assertEqual(self._stock()[0], Decimal("4"))
+            with patch.object(main, "get_redis", lambda: None):
+                main.queue_inventory_sync(session, [self.item_id])
+        self.assertEqual(self._stock()[0], Decimal("7"))
+
+    def test_reclaim_retries_and_dead_letters(self):
+        redis = self._redis(str(self.item_id), "not-an-id")
+        with patch.object(inventory_worker, "CLAIM_IDLE_MS", 0):
+            # Too recent to claim: nothing happens
+            with patch.object(inventory_worker, "CLAIM_IDLE_MS", 60_000):
+                self.assertEqual(inventory_worker.reclaim(redis, lambda: Session(self.engine), "worker-2"), 0)
+            # Claimed by another worker: the good message is synced, the bad one stays pending
+            self.assertEqual(inventory_worker.reclaim(redis, lambda: Session(self.engine), "worker-2"), 1)
+            self.assertEqual(self._stock()[0], Decimal("4"))
+            [bad] = self._pending(redis)
+            self.assertEqual((bad["consumer"], bad["times_delivered"]), (b"worker-2", 2))
+
+            # The worker loop keeps retrying it until MAX_DELIVERIES, then moves it aside
+            rounds = iter(range(inventory_worker.MAX_DELIVERIES))
+            with patch.object(inventory_worker, "BLOCK_MS", 1):
+                inventory_worker.run(redis, lambda: Session(self.engine), "worker-2",
+                                     stop=lambda: next(rounds, None) is None)
+        self.assertEqual(self._pending(redis), [])
+        [(_, fields)] = redis.xrange(inventory_worker.DEAD_STREAM)
+        self.assertEqual(fields, {b"items": b"not-an-id"})
+        self.assertEqual(self._stock()[0], Decimal("4"))
+
+    def test_staff_status_changes_sync_stock(self):
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        main.app.dependency_overrides[main.get_session] = get_session_override
+        client = TestClient(main.app)
+        self._sync()
+        with patch.object(main, "get_redis", lambda: None):
+            # Cancelling the item puts its eggs back; reopening the cancelled order takes them again
+            response = client.put(f"/orders/{self.order_id}/items/{self.item_id}/status",
+                                  json={"status": "cancelled"}, headers=self.auth_headers)
+            self.assertEqual(response.status_code, 200, response.text)
+            self.assertEqual(self._stock()[0], Decimal("10"))
+            with Session(self.engine) as session:
+                reversals = session.exec(select(InventoryTransaction).where(
+                    InventoryTransaction.transaction_type == TransactionType.sale_reversal,
+                    InventoryTransaction.order_item_id == self.item_id,
+                )).all()
+            self.assertEqual(sum(t.quantity for t in reversals), Decimal("6"))
+
+            self._update_item(status=models.OrderItemStatus.pending)
+            for status, stock in (("cancelled", Decimal("10")), ("pending", Decimal("4"))):
+                response = client.put(f"/orders/{self.order_id}/status", json={"status": status},
+                                      headers=self.auth_headers)
+                self.assertEqual(response.status_code, 200, response.text)
+                self.assertEqual(self._stock()[0], stock, status)
+
+
+if __name__ == '__main__':
+    unittest.main()
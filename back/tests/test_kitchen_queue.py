@@ -0,0 +1,176 @@
+
+import json
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import fakeredis
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, update
+from sqlmodel import Session, SQLModel, create_engine
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import app, get_session
+from back.app import kitchen_queue, main, models, security
+from back.tests.redis_helper import InMemoryRedis
+
+PENDING, PREPARING, READY = (
+    models.OrderItemStatus.pending, models.OrderItemStatus.preparing, models.OrderItemStatus.ready,
+)
+
+
+class TestKitchenQueue(unittest.TestCase):
+    """GET /kitchen/queue groups open items across orders; changes publish deltas."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant, other = models.Tenant(name="Queue Pizzeria"), models.Tenant(name="Other Pizzeria")
+            session.add_all([tenant, other])
+            session.commit()
+            owner = models.User(email="owner@example.com", hashed_password="x",
+                                tenant_id=tenant.id, role=models.UserRole.owner)
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            other_table = models.Table(name="X1", tenant_id=other.id)
+            pizza = models.Product(name="Margherita", price_cents=900, category="Pizza", tenant_id=tenant.id)
+            beer = models.Product(name="Lager", price_cents=400, category="Beer", tenant_id=tenant.id)
+            session.add_all([owner, table, other_table, pizza, beer])
+            session.commit()
+            self.tenant_id, self.other_id = tenant.id, other.id
+            self.table_id, self.other_table_id = table.id, other_table.id
+            self.pizza, self.beer = (pizza.id, pizza.name), (beer.id, beer.name)
+            self.auth_headers = {
+                "Authorization": "Bearer " + security.create_access_token(
+                    {"sub": owner.email, "tenant_id": tenant.id, "token_version": owner.token_version}
+                )
+            }
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _order(self, *lines, status=models.OrderStatus.pending, other_tenant=False):
+        """lines: (product, quantity, notes, item status)."""
+        with Session(self.engine) as session:
+            order = models.Order(tenant_id=self.other_id if other_tenant else self.tenant_id,
+                                 table_id=self.other_table_id if other_tenant else self.table_id, status=status)
+            session.add(order)
+            session.commit()
+            items = [
+                models.OrderItem(order_id=order.id, product_id=product[0], product_name=product[1],
+                                 quantity=quantity, notes=notes, price_cents=100, status=item_status)
+                for product, quantity, notes, item_status in lines
+            ]
+            session.add_all(items)
+            session.commit()
+            return order.id, [item.id for item in items]
+
+    def _queue(self, **params):
+        response = self.client.get("/kitchen/queue", params=params, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()["groups"]
+
+    def test_items_grouped_across_orders(self):
+        first_order, (first_pizza, _) = self._order((self.pizza, 3, None, PENDING), (self.beer, 2, None, PENDING))
+        self._order((self.pizza, 2, "", PREPARING), (self.pizza, 1, "no basil", PENDING))
+        self._order((self.pizza, 4, "  ", PENDING), (self.beer, 1, None, READY))
+        # Not queued: removed item, paid order, other tenant
+        order_id, (removed,) = self._order((self.pizza, 5, None, PENDING))
+        with Session(self.engine) as session:
+            item = session.get(models.OrderItem, removed)
+            item.removed_by_customer = True
+            session.add(item)
+            session.commit()
+        self._order((self.pizza, 6, None, PENDING), status=models.OrderStatus.paid)
+        self._order((self.pizza, 7, None, PENDING), other_tenant=True)
+        # The first pizza was ordered ten minutes ago
+        log = models.OrderItemStatusTransition.__table__
+        with self.engine.begin() as conn:
+            conn.execute(update(log).where(log.c.item_id == first_pizza).values(
+                changed_at=datetime.now(timezone.utc) - timedelta(minutes=10),
+            ))
+            # A second creation-like row must not count the item twice
+            conn.execute(insert(log).values(
+                tenant_id=self.tenant_id, order_id=first_order, item_id=first_pizza, from_status=None,
+                to_status=PENDING, changed_at=datetime.now(timezone.utc),
+            ))
+
+        groups = self._queue()
+        self.assertEqual(
+            [(g["product_name"], g["notes"], g["station"], g["quantity"], g["pending"], g["preparing"], g["orders"])
+             for g in groups],
+            [("Margherita", None, "kitchen", 9, 7, 2, 3), ("Lager", None, "bar", 2, 2, 0, 1),
+             ("Margherita", "no basil", "kitchen", 1, 1, 0, 1)],
+        )
+        self.assertEqual(groups[0]["key"], f"{self.pizza[0]}:")
+        self.assertGreaterEqual(groups[0]["oldest_age_seconds"], 600)
+        self.assertEqual([g["product_name"] for g in self._queue(station="bar")], ["Lager"])
+
+        response = self.client.get("/kitchen/queue", params={"station": "grill"}, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/kitchen/queue").status_code, 401)
+
+    def test_status_changes_publish_deltas(self):
+        redis = InMemoryRedis()
+        order_id, (pizza_item, beer_item) = self._order((self.pizza, 2, None, PENDING), (self.beer, 1, None, PENDING))
+        with redis.installed():
+            self.client.put(f"/orders/{order_id}/items/{pizza_item}/status", json={"status": "preparing"},
+                            headers=self.auth_headers)
+            first = [event for _, event in redis.published("kitchen_queue_delta")]
+            redis.clear_published()
+            self.client.put(f"/orders/{order_id}/items/{beer_item}/status", json={"status": "ready"},
+                            headers=self.auth_headers)
+            second = redis.published("kitchen_queue_delta")
+
+        # Nothing published yet: every group is new
+        self.assertEqual([(g["product_name"], g["preparing"]) for g in first[0]["groups"]],
+                         [("Lager", 0), ("Margherita", 2)])
+        # Then only what changed: the beer left the queue, the pizzas did not move
+        channel, event = second[0]
+        self.assertEqual(channel, f"orders:tenant:{self.tenant_id}")
+        self.assertEqual((event["groups"], event["removed"]), ([], [f"{self.beer[0]}:"]))
+        self.assertEqual(redis.hash_fields(kitchen_queue.snapshot_key(self.tenant_id)), [f"{self.pizza[0]}:"])
+
+    def test_snapshot_race_recomputes(self):
+        redis = InMemoryRedis()
+        order_id, (pizza_item,) = self._order((self.pizza, 2, None, PENDING))
+        key = kitchen_queue.snapshot_key(self.tenant_id)
+        compute = main._kitchen_update_events
+        calls = []
+
+        def racing_compute(*args):
+            # Between our WATCH and EXEC, another worker writes the snapshot
+            calls.append(args)
+            if len(calls) == 1:
+                fakeredis.FakeRedis(server=redis.server).hset(key, mapping={"stale:": "{}"})
+            return compute(*args)
+
+        with redis.installed(), patch.object(main, "_kitchen_update_events", racing_compute):
+            self.client.put(f"/orders/{order_id}/items/{pizza_item}/status", json={"status": "preparing"},
+                            headers=self.auth_headers)
+        self.assertEqual(len(calls), 2)
+        # The retry read the other worker's snapshot: its group is removed, ours sent once
+        [(_, delta)] = redis.published("kitchen_queue_delta")
+        self.assertEqual(([g["preparing"] for g in delta["groups"]], delta["removed"]), ([2], ["stale:"]))
+        self.assertEqual(redis.hash_fields(key), [f"{self.pizza[0]}:"])
+
+
+if __name__ == '__main__':
+    unittest.main()
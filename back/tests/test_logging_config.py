@@ -0,0 +1,112 @@
+
+import sys
+import os
+import io
+import json
+import logging
+import logging.handlers
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import logging_config, models
+from back.app.main import app, get_async_session, get_session
+from back.app.settings import settings
+
+
+class TestLoggingConfig(unittest.TestCase):
+    def tearDown(self):
+        # Back to the configuration app.main installed
+        logging_config.configure_logging()
+
+    def _configure(self, **overrides):
+        out = io.StringIO()
+        with patch.multiple(settings, **overrides), patch.object(sys, "stdout", out):
+            logging_config.configure_logging()
+        return out
+
+    def test_json_lines_are_written_by_the_listener(self):
+        out = self._configure(log_format="json", log_level="INFO", log_levels="tests.noisy=ERROR")
+        root = logging.getLogger()
+        self.assertEqual(len(root.handlers), 1)
+        self.assertIsInstance(root.handlers[0], logging.handlers.QueueHandler)
+
+        logging.getLogger("tests.orders").info("order %s placed", 42, extra={"tenant_id": 7})
+        logging.getLogger("tests.orders").debug("gated out %s", "x")
+        logging.getLogger("tests.noisy").warning("below the per-module level")
+        logging_config.stop_logging()
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["message"], "order 42 placed")
+        self.assertEqual(lines[0]["level"], "INFO")
+        self.assertEqual(lines[0]["logger"], "tests.orders")
+        self.assertEqual(lines[0]["tenant_id"], 7)
+
+    def test_parse_levels(self):
+        self.assertEqual(
+            logging_config.parse_levels(" app.main=debug, sqlalchemy.engine=INFO,,bad"),
+            {"app.main": "DEBUG", "sqlalchemy.engine": "INFO"},
+        )
+
+
+class TestNoPrintInOrderPath(unittest.TestCase):
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Quiet Bar")
+            session.add(tenant)
+            session.commit()
+            table = models.Table(name="T1", tenant_id=tenant.id, is_active=True, order_pin="1234")
+            product = models.Product(name="Olives", price_cents=300, tenant_id=tenant.id)
+            session.add_all([table, product])
+            session.commit()
+            self.table_token = table.token
+            self.product_id = product.id
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def test_menu_and_order_write_nothing_to_stdout(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(self.client.get(f"/menu/{self.table_token}").status_code, 200)
+            response = self.client.post(
+                f"/menu/{self.table_token}/order",
+                json={"items": [{"product_id": self.product_id, "quantity": 1}], "pin": "1234"},
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(out.getvalue(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import app, get_async_session, get_session
+from back.app import metrics, models
+from back.app.settings import settings
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Metrics Cafe")
+            session.add(tenant)
+            session.commit()
+            table = models.Table(name="T1", tenant_id=tenant.id, is_active=True, order_pin="1234")
+            product = models.Product(name="Soup", price_cents=500, tenant_id=tenant.id)
+            session.add_all([table, product])
+            session.commit()
+            self.table_token = table.token
+            self.product_id = product.id
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def test_routes_are_labelled_by_template(self):
+        labels = {"method": "GET", "route": "/menu/{table_token}", "status": "200"}
+        before = _sample("http_requests_total", **labels)
+        unmatched_before = _sample("http_requests_total", method="GET", route="unmatched", status="404")
+
+        self.assertEqual(self.client.get(f"/menu/{self.table_token}").status_code, 200)
+        self.client.get("/no-such-path/12345")
+
+        self.assertEqual(_sample("http_requests_total", **labels), before + 1)
+        self.assertEqual(
+            _sample("http_requests_total", method="GET", route="unmatched", status="404"),
+            unmatched_before + 1,
+        )
+        body = self.client.get("/metrics").text
+        self.assertIn('route="/menu/{table_token}"', body)
+        self.assertNotIn(self.table_token, body)
+        self.assertIn("db_pool_connections", body)
+
+    def test_order_counters(self):
+        created = _sample("orders_created_total")
+        items = _sample("order_items_added_total")
+        pin_failures = _sample("pin_failures_total")
+        url = f"/menu/{self.table_token}/order"
+        item = {"product_id": self.product_id, "quantity": 2, "source": "product"}
+
+        self.assertEqual(self.client.post(url, json={"items": [item], "pin": "0000"}).status_code, 403)
+        self.assertEqual(self.client.post(url, json={"items": [item], "pin": "1234"}).status_code, 200)
+        self.assertEqual(self.client.post(url, json={"items": [item, item], "pin": "1234"}).status_code, 200)
+
+        self.assertEqual(_sample("pin_failures_total"), pin_failures + 1)
+        self.assertEqual(_sample("orders_created_total"), created + 1)
+        self.assertEqual(_sample("order_items_added_total"), items + 3)
+
+    def test_metrics_token(self):
+        with patch.object(settings, "metrics_token", "s3cret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            self.assertEqual(
+                self.client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code, 401
+            )
+            response = self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("http_requests_total", response.text)
+
+    def test_production_requires_token(self):
+        with patch.object(settings, "is_production", True):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+            with patch.object(settings, "metrics_token", "s3cret"):
+                response = self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+
+
+class _FakePipeline:
+    def execute(self):
+        return [1, 1]
+
+
+class _FakeRedis:
+    def execute_command(self, *args, **options):
+        if args[0] == "GET":
+            raise ConnectionError("down")
+        return 1
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline()
+
+
+class TestRedisInstrumentation(unittest.TestCase):
+    def test_commands_and_errors_are_recorded(self):
+        client = metrics.instrument_redis(_FakeRedis())
+        publishes = _sample("redis_command_duration_seconds_count", command="PUBLISH")
+        pipelines = _sample("redis_command_duration_seconds_count", command="PIPELINE")
+        errors = _sample("redis_errors_total", command="GET")
+
+        client.execute_command("PUBLISH", "orders:tenant:1", "{}")
+        client.pipeline(transaction=False).execute()
+        with self.assertRaises(ConnectionError):
+            client.execute_command("GET", "key")
+
+        self.assertEqual(_sample("redis_command_duration_seconds_count", command="PUBLISH"), publishes + 1)
+        self.assertEqual(_sample("redis_command_duration_seconds_count", command="PIPELINE"), pipelines + 1)
+        self.assertEqual(_sample("redis_errors_total", command="GET"), errors + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlmodel import SQLModel, create_engine, text
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import migrate
+
+
+class TestSchemaBootstrap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self.tmp.name}/test.db")
+        self.runner = migrate.MigrationRunner(Path(self.tmp.name))
+        # Two fake migrations; their contents are never executed in these tests
+        for name in ("20260101000000_first.sql", "20260102000000_second.sql"):
+            (Path(self.tmp.name) / name).write_text("SELECT 1;")
+        self.engine_patch = patch.object(migrate, "engine", self.engine)
+        self.engine_patch.start()
+
+    def tearDown(self):
+        self.engine_patch.stop()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _mark_applied(self, version: int) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version BIGINT PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+    def test_empty_database_is_not_current(self):
+        with self.engine.connect() as conn:
+            self.assertEqual(self.runner.schema_state(conn), (0, False))
+
+    def test_pending_migration_is_not_current(self):
+        SQLModel.metadata.create_all(self.engine)
+        self._mark_applied(20260101000000)
+        with self.engine.connect() as conn:
+            self.assertEqual(self.runner.schema_state(conn), (20260101000000, False))
+
+    def test_missing_model_table_is_not_current(self):
+        self._mark_applied(20260102000000)
+        with self.engine.connect() as conn:
+            self.assertEqual(self.runner.schema_state(conn), (20260102000000, False))
+
+    def test_current_database_takes_fast_path(self):
+        SQLModel.metadata.create_all(self.engine)
+        self._mark_applied(20260102000000)
+        with patch.object(self.runner, "locked_connection") as locked, \
+             patch.object(self.runner, "run_migrations") as run:
+            self.assertEqual(self.runner.bootstrap(), 20260102000000)
+        locked.assert_not_called()
+        run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+
+import json
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import _eta_update_events, app, get_async_session, get_session
+from back.app import models, prep_eta, security
+
+PENDING, PREPARING = models.OrderItemStatus.pending, models.OrderItemStatus.preparing
+NOW = datetime(2026, 3, 2, 20, tzinfo=timezone.utc)
+
+
+def _row(item_id, order_id, status, station="kitchen", ewma=None, started=None, table_id=1):
+    return SimpleNamespace(id=item_id, order_id=order_id, table_id=table_id, status=status,
+                           status_updated_at=started, station=station, ewma_seconds=ewma)
+
+
+class TestOrderEta(unittest.TestCase):
+    """Per-product EWMA prep times and order ready-time estimates."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Eta Bistro")
+            session.add(tenant)
+            session.commit()
+            owner = models.User(email="owner@example.com", hashed_password="x",
+                                tenant_id=tenant.id, role=models.UserRole.owner)
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            burger = models.Product(name="Burger", price_cents=1200, category="Main Course", tenant_id=tenant.id)
+            wine = models.Product(name="Rioja", price_cents=500, category="Beverages", tenant_id=tenant.id)
+            session.add_all([owner, table, burger, wine])
+            session.commit()
+            self.tenant_id, self.table_id, self.table_token = tenant.id, table.id, table.token
+            self.burger, self.wine = (burger.id, burger.name), (wine.id, wine.name)
+            self.auth_headers = {
+                "Authorization": "Bearer " + security.create_access_token(
+                    {"sub": owner.email, "tenant_id": tenant.id, "token_version": owner.token_version}
+                )
+            }
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _order(self, *products, status=PENDING, started=None):
+        with Session(self.engine) as session:
+            order = models.Order(tenant_id=self.tenant_id, table_id=self.table_id)
+            session.add(order)
+            session.commit()
+            items = [
+                models.OrderItem(order_id=order.id, product_id=product[0], product_name=product[1], quantity=1,
+                                 price_cents=100, status=status, status_updated_at=started)
+                for product in products
+            ]
+            session.add_all(items)
+            session.commit()
+            return order.id, [item.id for item in items]
+
+    def _stats(self, product_id):
+        stats = models.ProductPrepStats
+        with Session(self.engine) as session:
+            row = session.exec(select(stats).where(stats.tenant_id == self.tenant_id,
+                                                   stats.product_id == product_id)).first()
+            return (round(row.ewma_seconds, 3), row.samples) if row else None
+
+    def _ready(self, order_id, item_id):
+        response = self.client.put(f"/orders/{order_id}/items/{item_id}/status", json={"status": "ready"},
+                                   headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+
+    def test_ready_items_update_moving_mean(self):
+        started = datetime.now(timezone.utc) - timedelta(seconds=300)
+        order_id, (first, second) = self._order(self.burger, self.burger, status=PREPARING, started=started)
+        self._ready(order_id, first)
+        self.assertEqual(self._stats(self.burger[0])[1], 1)
+        self.assertAlmostEqual(self._stats(self.burger[0])[0], 300, delta=5)
+
+        with Session(self.engine) as session:
+            item = session.get(models.OrderItem, second)
+            item.status_updated_at = datetime.now(timezone.utc) - timedelta(seconds=800)
+            session.add(item)
+            session.commit()
+        self._ready(order_id, second)
+        ewma, samples = self._stats(self.burger[0])
+        self.assertEqual(samples, 2)
+        self.assertAlmostEqual(ewma, 300 * (1 - prep_eta.EWMA_ALPHA) + 800 * prep_eta.EWMA_ALPHA, delta=5)
+
+        # Straight from pending: no preparing time to measure
+        order_id, (item_id,) = self._order(self.wine)
+        self._ready(order_id, item_id)
+        self.assertIsNone(self._stats(self.wine[0]))
+
+    def test_estimate_queues_behind_station_work(self):
+        rows = [
+            # Order 1: a burger started 100s ago (mean 400), a pending wine (no stats)
+            _row(1, 1, PREPARING, ewma=400.0, started=NOW - timedelta(seconds=100)),
+            _row(2, 1, PENDING, station="bar"),
+            # Order 2: two pending burgers wait for order 1's kitchen work
+            _row(3, 2, PENDING, ewma=400.0, table_id=2),
+            _row(4, 2, PENDING, ewma=400.0, table_id=2),
+        ]
+        etas = prep_eta.estimate(rows, NOW, capacity=1)
+        self.assertEqual(etas[1]["items"], {1: NOW + timedelta(seconds=300), 2: NOW + timedelta(seconds=120)})
+        self.assertEqual(etas[1]["estimated_wait_seconds"], 300)
+        # 300s left on the burger under way, then each burger's own 400s
+        self.assertEqual(etas[2]["items"][3], NOW + timedelta(seconds=700))
+        self.assertEqual(etas[2]["estimated_wait_seconds"], 700)
+        self.assertEqual(prep_eta.estimate(rows, NOW, capacity=3)[2]["estimated_wait_seconds"], 500)
+        self.assertEqual(prep_eta.public(None), {"estimated_ready_at": None, "estimated_wait_seconds": None})
+
+        events = _eta_update_events(etas)
+        self.assertEqual([channel for channel, _ in events], ["orders:table:1", "orders:table:2"])
+        self.assertEqual(json.loads(events[1][1]), {
+            "type": "eta_update", "order_id": 2,
+            "estimated_ready_at": (NOW + timedelta(seconds=700)).isoformat(), "estimated_wait_seconds": 700,
+        })
+
+    def test_current_order_includes_estimate(self):
+        order_id, (burger_item, wine_item) = self._order(self.burger, self.wine)
+        with Session(self.engine) as session:
+            table = session.get(models.Table, self.table_id)
+            table.active_order_id = order_id
+            session.add(table)
+            session.commit()
+
+        order = self.client.get(f"/menu/{self.table_token}/order").json()["order"]
+        self.assertEqual(order["id"], order_id)
+        self.assertAlmostEqual(order["estimated_wait_seconds"], prep_eta.DEFAULT_PREP_SECONDS["kitchen"], delta=2)
+        items = {item["id"]: item for item in order["items"]}
+        self.assertEqual(order["estimated_ready_at"], items[burger_item]["estimated_ready_at"])
+        self.assertLess(items[wine_item]["estimated_ready_at"], order["estimated_ready_at"])
+
+        for item_id in (burger_item, wine_item):
+            self._ready(order_id, item_id)
+        order = self.client.get(f"/menu/{self.table_token}/order").json()["order"]
+        self.assertIsNone(order["estimated_ready_at"])
+        self.assertIsNone(order["estimated_wait_seconds"])
+        self.assertTrue(all(item["estimated_ready_at"] is None for item in order["items"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
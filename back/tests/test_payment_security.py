@@ -1,26 +1,32 @@
 
 import sys
 import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine, select
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Adjust path to import app
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from back.app.main import app, get_session
+from back.app.main import app, get_async_session, get_session
 from back.app import models
 
 class TestPaymentSecurity(unittest.TestCase):
     def setUp(self):
-        # Create in-memory database
+        # File-backed sqlite so the sync engine and the async (aiosqlite) engine
+        # used by the public menu endpoints share one database
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
         self.engine = create_engine(
-            "sqlite://",
+            f"sqlite:///{db_path}",
             connect_args={"check_same_thread": False},
-            poolclass=StaticPool
         )
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
         SQLModel.metadata.create_all(self.engine)
 
         # Override get_session dependency
@@ -28,7 +34,12 @@ class TestPaymentSecurity(unittest.TestCase):
             with Session(self.engine) as session:
                 yield session
 
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
         self.client = TestClient(app)
         self.session = Session(self.engine)
 
@@ -65,6 +76,8 @@ class TestPaymentSecurity(unittest.TestCase):
     def tearDown(self):
         app.dependency_overrides.clear()
         self.session.close()
+        self.engine.dispose()
+        self.db_dir.cleanup()
 
     @patch("stripe.PaymentIntent.retrieve")
     def test_prevent_payment_bypass_amount_mismatch(self, mock_retrieve):
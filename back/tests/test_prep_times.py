@@ -0,0 +1,200 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import app, get_session
+from back.app import models, security
+
+PENDING, PREPARING, READY, DELIVERED, CANCELLED = (
+    models.OrderItemStatus.pending, models.OrderItemStatus.preparing, models.OrderItemStatus.ready,
+    models.OrderItemStatus.delivered, models.OrderItemStatus.cancelled,
+)
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestPrepTimes(unittest.TestCase):
+    """Item status transition log and GET /reports/prep-times percentiles."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Prep Bistro", timezone="Europe/Madrid")
+            other = models.Tenant(name="Other Bistro")
+            session.add_all([tenant, other])
+            session.commit()
+            owner = models.User(email="owner@example.com", hashed_password="x",
+                                tenant_id=tenant.id, role=models.UserRole.owner)
+            cook = models.User(email="cook@example.com", hashed_password="x",
+                               tenant_id=tenant.id, role=models.UserRole.kitchen)
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            other_table = models.Table(name="X1", tenant_id=other.id)
+            burger = models.Product(name="Burger", price_cents=1200, category="Main Course", tenant_id=tenant.id)
+            wine = models.Product(name="Rioja", price_cents=500, category="Beverages", tenant_id=tenant.id)
+            session.add_all([owner, cook, table, other_table, burger, wine])
+            session.commit()
+            self.tenant_id, self.other_id = tenant.id, other.id
+            self.table_id, self.other_table_id = table.id, other_table.id
+            self.burger, self.wine = (burger.id, burger.name), (wine.id, wine.name)
+            self.cook_id = cook.id
+            self.auth_headers = {
+                "Authorization": "Bearer " + security.create_access_token(
+                    {"sub": owner.email, "tenant_id": tenant.id, "token_version": owner.token_version}
+                )
+            }
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _order(self, product, quantity=1, created_at=None, table_id=None):
+        with Session(self.engine) as session:
+            order = models.Order(tenant_id=self.tenant_id if table_id is None else self.other_id,
+                                 table_id=table_id or self.table_id, created_at=created_at or _utc(2026, 3, 2))
+            session.add(order)
+            session.commit()
+            item = models.OrderItem(order_id=order.id, product_id=product[0], product_name=product[1],
+                                    quantity=quantity, price_cents=100)
+            session.add(item)
+            session.commit()
+            return order.id, item.id, order.tenant_id
+
+    def _transitions(self, item_id):
+        log = models.OrderItemStatusTransition
+        with Session(self.engine) as session:
+            return [
+                (row.from_status, row.to_status, row.user_id)
+                for row in session.exec(select(log).where(log.item_id == item_id).order_by(log.id)).all()
+            ]
+
+    def _log(self, item, ordered_at, **seconds):
+        """Write an item's history directly: creation (unless ordered_at is None) and stage offsets."""
+        order_id, item_id, tenant_id = item
+        rows = []
+        if ordered_at is not None:
+            rows.append({"from_status": None, "to_status": PENDING, "changed_at": ordered_at})
+        previous = PENDING
+        base = ordered_at or _utc(2026, 3, 2, 19)
+        for stage, offset in seconds.items():
+            status = models.OrderItemStatus(stage)
+            rows.append({"from_status": previous, "to_status": status, "changed_at": base + timedelta(seconds=offset)})
+            previous = status
+        with self.engine.begin() as conn:
+            conn.execute(insert(models.OrderItemStatusTransition.__table__), [
+                {"tenant_id": tenant_id, "order_id": order_id, "item_id": item_id, "user_id": None, **row}
+                for row in rows
+            ])
+
+    def _report(self, group_by, **params):
+        response = self.client.get("/reports/prep-times", params={
+            "from_date": "2026-03-02", "to_date": "2026-03-02", "group_by": group_by, **params,
+        }, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_status_endpoints_append_to_log(self):
+        order_id, item_id, _ = self._order(self.burger)
+        self.assertEqual(self._transitions(item_id), [(None, PENDING, None)])
+        for status, extra in ((PREPARING, {}), (READY, {"user_id": self.cook_id})):
+            response = self.client.put(f"/orders/{order_id}/items/{item_id}/status",
+                                       json={"status": status.value, **extra}, headers=self.auth_headers)
+            self.assertEqual(response.status_code, 200, response.text)
+        # Same status again: no transition
+        self.client.put(f"/orders/{order_id}/items/{item_id}/status", json={"status": "ready"},
+                        headers=self.auth_headers)
+        response = self.client.put(f"/orders/{order_id}/items/{item_id}/cancel", json={"reason": "dropped"},
+                                   headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        owner_id = self.client.get("/users/me", headers=self.auth_headers).json()["id"]
+        self.assertEqual(self._transitions(item_id), [
+            (None, PENDING, None), (PENDING, PREPARING, None), (PREPARING, READY, self.cook_id),
+            (READY, CANCELLED, owner_id),
+        ])
+
+        order_id, item_id, _ = self._order(self.wine, quantity=2)
+        self.client.put(f"/orders/{order_id}/items/{item_id}/status", json={"status": "preparing"},
+                        headers=self.auth_headers)
+        self.client.put(f"/orders/{order_id}/items/{item_id}/reset-status", headers=self.auth_headers)
+        self.client.put(f"/orders/{order_id}/status", json={"status": "ready"}, headers=self.auth_headers)
+        self.assertEqual([t[:2] for t in self._transitions(item_id)], [
+            (None, PENDING), (PENDING, PREPARING), (PREPARING, PENDING), (PENDING, READY),
+        ])
+
+    def test_change_after_commit_is_not_logged_as_creation(self):
+        _, item_id, _ = self._order(self.burger)
+        with Session(self.engine) as session:
+            item = session.get(models.OrderItem, item_id)
+            session.commit()  # expires the item, status included
+            item.status = PREPARING
+            session.add(item)
+            session.commit()
+        self.assertEqual([t[:2] for t in self._transitions(item_id)], [(None, PENDING), (PENDING, PREPARING)])
+
+    def test_percentiles_per_group(self):
+        lunch = _utc(2026, 3, 2, 12)  # 13:00 in Madrid
+        ready = [300, 600, 900, 1200, 3000]
+        for i, seconds in enumerate(ready):
+            stages = {"preparing": 60, "ready": seconds}
+            if i < 2:
+                stages["delivered"] = seconds + 100
+            self._log(self._order(self.burger), lunch, **stages)
+        for seconds in (120, 180):
+            self._log(self._order(self.wine), _utc(2026, 3, 2, 20), ready=seconds)
+        # Logged only from ready on: timed from the order (19:00 UTC, 20:00 in Madrid)
+        self._log(self._order(self.wine, created_at=_utc(2026, 3, 2, 19)), None, ready=600)
+        # Outside the range / other tenant
+        self._log(self._order(self.burger), _utc(2026, 3, 3, 12), ready=5)
+        self._log(self._order(self.burger, table_id=self.other_table_id), lunch, ready=5)
+
+        report = self._report("product")
+        self.assertEqual(report["timezone"], "Europe/Madrid")
+        burger, wine = report["groups"]
+        self.assertEqual(burger, {
+            "product_id": self.burger[0], "product_name": "Burger", "items": 5,
+            "to_preparing": {"count": 5, "p50": 60.0, "p90": 60.0, "p99": 60.0},
+            "to_ready": {"count": 5, "p50": 900.0, "p90": 2280.0, "p99": 2928.0},
+            "to_delivered": {"count": 2, "p50": 550.0, "p90": 670.0, "p99": 697.0},
+        })
+        self.assertEqual((wine["items"], wine["to_ready"]["p50"]), (3, 180.0))
+        self.assertEqual(wine["to_delivered"], {"count": 0, "p50": None, "p90": None, "p99": None})
+
+        stations = self._report("station")["groups"]
+        self.assertEqual([(g["station"], g["items"]) for g in stations], [("kitchen", 5), ("bar", 3)])
+        self.assertEqual([g["category"] for g in self._report("category")["groups"]],
+                         ["Main Course", "Beverages"])
+        hours = self._report("hour")["groups"]
+        self.assertEqual([(g["hour"], g["items"], g["to_ready"]["p50"]) for g in hours],
+                         [(13, 5, 900.0), (20, 1, 600.0), (21, 2, 150.0)])
+
+        response = self.client.get("/reports/prep-times", params={
+            "from_date": "2026-03-02", "to_date": "2026-03-02", "group_by": "waiter",
+        }, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+
+import sys
+import os
+import re
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import inventory_models, models, security
+from back.app.main import app, get_async_session, get_session
+from back.tests.redis_helper import InMemoryRedis
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# Maximum SQL statements per request (including the auth user lookup). Each endpoint
+# must also issue the same number of statements at every data size: a per-row query
+# (N+1) fails test_budgets_hold_as_data_grows even while under budget.
+BUDGETS = {
+    "GET /menu/{token}": 11,
+    "GET /menu/{token}/order": 4,  # + the tenant's open-item queue for the ready-time estimate
+    # Endpoints that change the kitchen queue include the two queries of publish_kitchen_updates
+    "POST /menu/{token}/order": 10,
+    "PUT /orders/{id}/status": 11,
+    "PUT /orders/{id}/items/{item_id}/status": 13,
+    "GET /orders": 4,
+    "GET /kitchen/queue": 2,
+    "GET /tables/with-status": 6,
+    "GET /catalog": 3,
+    "GET /reports/sales": 7,
+    "GET /inventory/transactions": 3,
+}
+
+
+class TestQueryBudgets(unittest.TestCase):
+    """Seeds a tenant, grows it, and checks statement counts from the Server-Timing header."""
+
+    def setUp(self):
+        # File-backed sqlite shared by the sync and async (aiosqlite) engines
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False},
+        )
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
+        self.client = TestClient(app)
+
+        # Endpoints that change the kitchen queue publish from it within the request
+        self.redis_patches = InMemoryRedis().patches()
+        for redis_patch in self.redis_patches:
+            redis_patch.start()
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Budget Bistro")
+            session.add(tenant)
+            session.commit()
+            self.tenant_id = tenant.id
+
+            owner = models.User(
+                email="owner@example.com", hashed_password="x",
+                tenant_id=self.tenant_id, role=models.UserRole.owner,
+            )
+            waiter = models.User(
+                email="waiter@example.com", hashed_password="x", full_name="Wendy",
+                tenant_id=self.tenant_id, role=models.UserRole.waiter,
+            )
+            session.add(owner)
+            session.add(waiter)
+            session.commit()
+            self.waiter_id = waiter.id
+
+            floor = models.Floor(name="Main", tenant_id=self.tenant_id, default_waiter_id=waiter.id)
+            session.add(floor)
+            session.commit()
+            self.floor_id = floor.id
+
+            table = models.Table(
+                name="Menu table", tenant_id=self.tenant_id, floor_id=floor.id,
+                is_active=True, order_pin="1234",
+            )
+            session.add(table)
+            session.commit()
+            self.table_token = table.token
+
+            self.auth_headers = {
+                "Authorization": "Bearer " + security.create_access_token(
+                    {"sub": owner.email, "tenant_id": self.tenant_id, "token_version": owner.token_version}
+                )
+            }
+        self.units = 0
+        self.first_product_id = None
+        self.open_items = []  # (order_id, item_id) of each unit's pending order
+
+    def tearDown(self):
+        for redis_patch in self.redis_patches:
+            redis_patch.stop()
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _grow(self, n: int) -> None:
+        """Add n more of everything the hot endpoints read (tables, products, orders, ...)."""
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        with Session(self.engine) as session:
+            for _ in range(n):
+                self.units += 1
+                i = self.units
+                table = models.Table(
+                    name=f"T{i}", tenant_id=self.tenant_id, floor_id=self.floor_id,
+                    assigned_waiter_id=self.waiter_id if i % 2 else None,
+                )
+                product = models.Product(
+                    name=f"Dish {i}", price_cents=1000 + i, tenant_id=self.tenant_id,
+                    category="Mains", subcategory="Grill",
+                )
+                provider = models.Provider(name=f"Provider {i}")
+                catalog = models.ProductCatalog(
+                    name=f"Wine {i}", category="Beverages", subcategory="Red Wine",
+                    barcode=None, normalized_name=f"wine {i}",
+                )
+                inv_item = inventory_models.InventoryItem(
+                    tenant_id=self.tenant_id, sku=f"SKU-{i}", name=f"Stock {i}",
+                )
+                session.add_all([table, product, provider, catalog, inv_item])
+                session.flush()
+                if self.first_product_id is None:
+                    self.first_product_id = product.id
+
+                provider_product = models.ProviderProduct(
+                    catalog_id=catalog.id, provider_id=provider.id,
+                    external_id=f"ext-{i}", name=f"Wine {i}", price_cents=900 + i,
+                )
+                tenant_product = models.TenantProduct(
+                    tenant_id=self.tenant_id, catalog_id=catalog.id, name=f"Wine {i}",
+                    price_cents=1500 + i,
+                )
+                session.add_all([provider_product, tenant_product])
+                session.flush()
+                tenant_product.provider_product_id = provider_product.id
+                session.add(models.I18nText(
+                    tenant_id=self.tenant_id, entity_type="product", entity_id=product.id,
+                    field="name", lang="es", text=f"Plato {i}",
+                ))
+
+                paid = models.Order(
+                    tenant_id=self.tenant_id, table_id=table.id,
+                    status=models.OrderStatus.paid, paid_at=now,
+                )
+                active = models.Order(
+                    tenant_id=self.tenant_id, table_id=table.id, status=models.OrderStatus.pending,
+                )
+                session.add_all([paid, active])
+                session.flush()
+                for order in (paid, active):
+                    item = models.OrderItem(
+                        order_id=order.id, product_id=product.id, product_name=product.name,
+                        quantity=2, price_cents=product.price_cents,
+                    )
+                    session.add(item)
+                session.flush()
+                self.open_items.append((active.id, item.id))
+                session.add(models.Reservation(
+                    tenant_id=self.tenant_id, table_id=table.id, customer_name=f"Guest {i}",
+                    customer_phone="600000000", reservation_date=today,
+                    reservation_time=time(20, 0), party_size=2,
+                    status=models.ReservationStatus.booked if i % 2 else models.ReservationStatus.seated,
+                ))
+                for qty in (10, -2):
+                    session.add(inventory_models.InventoryTransaction(
+                        tenant_id=self.tenant_id, inventory_item_id=inv_item.id,
+                        transaction_type=(
+                            inventory_models.TransactionType.purchase if qty > 0
+                            else inventory_models.TransactionType.sale
+                        ),
+                        quantity=Decimal(qty), unit=inventory_models.UnitOfMeasure.piece,
+                        balance_after=Decimal(10),
+                    ))
+            session.commit()
+
+    def _query_count(self, response) -> int:
+        self.assertLess(response.status_code, 400, response.text)
+        match = _SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+        self.assertIsNotNone(match, "missing Server-Timing header")
+        return int(match.group(1))
+
+    def _measure(self) -> dict[str, int]:
+        today = date.today()
+        token = self.table_token
+        order_body = {
+            "items": [{"product_id": self.first_product_id, "quantity": 1, "source": "product"}],
+            "pin": "1234",
+        }
+        # Untouched pending orders from the latest growth step
+        (status_order, _), (item_order, item_id) = self.open_items[-2:]
+        requests = {
+            "GET /menu/{token}": lambda: self.client.get(f"/menu/{token}?lang=es"),
+            "POST /menu/{token}/order": lambda: self.client.post(f"/menu/{token}/order", json=order_body),
+            "GET /menu/{token}/order": lambda: self.client.get(f"/menu/{token}/order"),
+            "PUT /orders/{id}/status": lambda: self.client.put(
+                f"/orders/{status_order}/status", json={"status": "preparing"}, headers=self.auth_headers
+            ),
+            "PUT /orders/{id}/items/{item_id}/status": lambda: self.client.put(
+                f"/orders/{item_order}/items/{item_id}/status", json={"status": "preparing"},
+                headers=self.auth_headers,
+            ),
+            "GET /orders": lambda: self.client.get("/orders", headers=self.auth_headers),
+            "GET /kitchen/queue": lambda: self.client.get("/kitchen/queue", headers=self.auth_headers),
+            "GET /tables/with-status": lambda: self.client.get("/tables/with-status", headers=self.auth_headers),
+            "GET /catalog": lambda: self.client.get("/catalog", headers=self.auth_headers),
+            "GET /reports/sales": lambda: self.client.get(
+                "/reports/sales",
+                params={"from_date": (today - timedelta(days=1)).isoformat(), "to_date": (today + timedelta(days=1)).isoformat()},
+                headers=self.auth_headers,
+            ),
+            "GET /inventory/transactions": lambda: self.client.get(
+                "/inventory/transactions", headers=self.auth_headers
+            ),
+        }
+        return {name: self._query_count(send()) for name, send in requests.items()}
+
+    def test_budgets_hold_as_data_grows(self):
+        self._grow(3)
+        # Open the table's order first so both POST measurements take the "add items" path
+        self.client.post(
+            f"/menu/{self.table_token}/order",
+            json={"items": [{"product_id": self.first_product_id, "quantity": 1, "source": "product"}], "pin": "1234"},
+        )
+        small = self._measure()
+        self._grow(20)
+        large = self._measure()
+
+        for name, budget in BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(large[name], budget, f"{name}: {large[name]} queries (budget {budget})")
+                self.assertEqual(
+                    small[name], large[name],
+                    f"{name}: {small[name]} queries with 3 units, {large[name]} with 23 (N+1?)",
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, text
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.query_stats import QueryStatsMiddleware, statement_shape
+from back.app.settings import settings
+
+
+class TestStatementShape(unittest.TestCase):
+    def test_parameters_and_in_lists_are_normalized(self):
+        a = statement_shape("SELECT * FROM orderitem WHERE order_id = %(order_id_1)s LIMIT 10")
+        b = statement_shape("SELECT *\n FROM orderitem WHERE order_id = %(order_id_1)s LIMIT 20")
+        self.assertEqual(a, b)
+        self.assertEqual(
+            statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)"),
+            statement_shape("SELECT * FROM t WHERE id IN (?)"),
+        )
+
+
+class TestQueryStatsMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        app = FastAPI()
+        app.add_middleware(QueryStatsMiddleware)
+
+        def get_session():
+            with Session(self.engine) as session:
+                yield session
+
+        @app.get("/loop/{n}")
+        def loop(n: int, session: Session = Depends(get_session)):
+            for i in range(n):
+                session.exec(text("SELECT :i"), params={"i": i}).first()
+            return {"n": n}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_server_timing_counts_queries(self):
+        response = self.client.get("/loop/3")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="3 queries"', response.headers["server-timing"])
+        self.assertTrue(response.headers["server-timing"].startswith("db;dur="))
+
+    def test_no_header_in_production_unless_enabled(self):
+        with patch.object(settings, "is_production", True):
+            self.assertNotIn("server-timing", self.client.get("/loop/1").headers)
+            with patch.object(settings, "query_stats_enabled", True):
+                self.assertIn("server-timing", self.client.get("/loop/1").headers)
+        with patch.object(settings, "query_stats_enabled", False):
+            self.assertNotIn("server-timing", self.client.get("/loop/1").headers)
+
+    def test_repeated_statement_warns_in_dev(self):
+        with patch.object(settings, "is_production", False), \
+             patch.object(settings, "n_plus_one_warn_threshold", 5):
+            with self.assertLogs("back.app.query_stats", level="WARNING") as logs:
+                self.client.get("/loop/6")
+        self.assertIn("Possible N+1: GET /loop/6 ran the same statement 6 times", logs.output[0])
+
+    def test_no_warning_below_threshold_or_in_production(self):
+        with patch.object(settings, "n_plus_one_warn_threshold", 5):
+            with patch.object(settings, "is_production", False), \
+                 self.assertNoLogs("back.app.query_stats", level="WARNING"):
+                self.client.get("/loop/5")
+            with patch.object(settings, "is_production", True), \
+                 self.assertNoLogs("back.app.query_stats", level="WARNING"):
+                self.client.get("/loop/50")
+
+
+if __name__ == '__main__':
+    unittest.main()
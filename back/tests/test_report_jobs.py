@@ -0,0 +1,257 @@
+
+import csv
+import io
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import app, get_session
+from back.app import models, report_jobs, reports_routes, security
+from back.app.settings import settings
+
+RANGE = {"from_date": "2026-03-01", "to_date": "2026-03-31"}
+
+
+class TestReportJobs(unittest.TestCase):
+    """POST /reports/jobs: background reports and exports, polling, dedupe, expiry."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.jobs_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        self.settings_patch = mock.patch.multiple(settings, report_jobs_dir=self.jobs_dir.name,
+                                                  report_job_ttl_seconds=3600)
+        self.settings_patch.start()
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant, other = models.Tenant(name="Jobs Bistro"), models.Tenant(name="Other Bistro")
+            session.add_all([tenant, other])
+            session.commit()
+            owner = models.User(email="owner@example.com", hashed_password="x",
+                                tenant_id=tenant.id, role=models.UserRole.owner)
+            other_owner = models.User(email="other@example.com", hashed_password="x",
+                                      tenant_id=other.id, role=models.UserRole.owner)
+            table = models.Table(name="T1", tenant_id=tenant.id)
+            wine = models.Product(name="Rioja", price_cents=500, category="Wine", tenant_id=tenant.id)
+            session.add_all([owner, other_owner, table, wine])
+            session.commit()
+            for day in range(1, 6):
+                paid_at = datetime(2026, 3, day, 21, tzinfo=timezone.utc)
+                order = models.Order(tenant_id=tenant.id, table_id=table.id, status=models.OrderStatus.paid,
+                                     created_at=paid_at, paid_at=paid_at)
+                session.add(order)
+                session.commit()
+                session.add(models.OrderItem(order_id=order.id, product_id=wine.id, product_name="Rioja",
+                                             quantity=day, price_cents=500))
+                session.commit()
+            self.headers, self.other_headers = (
+                {"Authorization": "Bearer " + security.create_access_token(
+                    {"sub": user.email, "tenant_id": user.tenant_id, "token_version": user.token_version}
+                )}
+                for user in (owner, other_owner)
+            )
+
+    def tearDown(self):
+        report_jobs.shutdown(wait=True)
+        self.settings_patch.stop()
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+        self.jobs_dir.cleanup()
+
+    def _submit(self, headers=None, **body):
+        response = self.client.post("/reports/jobs", json={**RANGE, **body}, headers=headers or self.headers)
+        self.assertEqual(response.status_code, 202, response.text)
+        return response.json()
+
+    def _wait(self, job_id, status="done"):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = self.client.get(f"/reports/jobs/{job_id}", headers=self.headers).json()
+            if job["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.02)
+        self.assertEqual(job["status"], status, job)
+        return job
+
+    def test_json_and_export_jobs(self):
+        job = self._submit()
+        self.assertIn(job["status"], ("queued", "running"))
+        self.assertFalse(job["deduplicated"])
+        done = self._wait(job["id"])
+        self.assertEqual(done["progress"], 1.0)
+        download = self.client.get(done["download_url"], headers=self.headers)
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download.json(), self.client.get("/reports/sales", params=RANGE, headers=self.headers).json())
+        self.assertEqual(download.json()["summary"]["total_revenue_cents"], 500 * 15)
+
+        job = self._wait(self._submit(format="csv", report="lines")["id"])
+        self.assertEqual(job["rows"], 5)
+        self.assertEqual(job["filename"], "pos2-sales-lines-2026-03-01-2026-03-31.csv")
+        download = self.client.get(job["download_url"], headers=self.headers)
+        self.assertIn('filename="pos2-sales-lines-2026-03-01-2026-03-31.csv"', download.headers["content-disposition"])
+        export = self.client.get("/reports/export", params={**RANGE, "report": "lines"}, headers=self.headers)
+        self.assertEqual(download.text, export.text)
+        self.assertEqual(len(list(csv.reader(io.StringIO(download.text)))), 6)
+
+        job = self._wait(self._submit(format="xlsx")["id"])
+        self.assertTrue(self.client.get(job["download_url"], headers=self.headers).content.startswith(b"PK"))
+
+        response = self.client.post("/reports/jobs", json={**RANGE, "format": "pdf"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_identical_requests_share_the_running_job(self):
+        release = threading.Event()
+        build = reports_routes._build_report_payload
+
+        def slow_build(*args):
+            release.wait(5)
+            return build(*args)
+
+        with mock.patch.object(reports_routes, "_build_report_payload", slow_build):
+            first = self._submit()
+            again = self._submit(**{"from_date": RANGE["to_date"], "to_date": RANGE["from_date"]})
+            other_range = self._submit(to_date="2026-03-02")
+            other_tenant = self._submit(headers=self.other_headers)
+            release.set()
+            self._wait(first["id"])
+            self._wait(other_range["id"])
+
+        self.assertTrue(again["deduplicated"])
+        self.assertEqual(again["id"], first["id"])
+        self.assertNotEqual(other_range["id"], first["id"])
+        self.assertNotEqual(other_tenant["id"], first["id"])
+        # Once finished, the same request starts a fresh job (the data may have changed)
+        fresh = self._submit()
+        self.assertNotEqual(fresh["id"], first["id"])
+        self._wait(fresh["id"])
+
+    def test_key_never_points_at_a_missing_job(self):
+        release = threading.Event()
+        build = reports_routes._build_report_payload
+        claim = report_jobs._claim_key
+        found = []
+
+        def slow_build(*args):
+            release.wait(5)
+            return build(*args)
+
+        def checked_claim(key_path, job_id):
+            # What a concurrent request reading the key would find
+            found.append(report_jobs._read_job(job_id) is not None)
+            return claim(key_path, job_id)
+
+        with mock.patch.object(reports_routes, "_build_report_payload", slow_build), \
+             mock.patch.object(report_jobs, "_claim_key", checked_claim):
+            first = self._submit()
+            again = self._submit()
+            release.set()
+            self._wait(first["id"])
+        self.assertEqual(found, [True, True])
+        self.assertTrue(again["deduplicated"])
+        # The losing request's job file is gone
+        self.assertEqual([p.name for p in report_jobs.jobs_dir().glob("job-*.json")], [f"job-{first['id']}.json"])
+
+    def test_tenant_isolation_and_expiry(self):
+        job = self._wait(self._submit()["id"])
+        for path in (f"/reports/jobs/{job['id']}", job["download_url"]):
+            self.assertEqual(self.client.get(path, headers=self.other_headers).status_code, 404)
+        self.assertEqual(self.client.get("/reports/jobs/../../etc", headers=self.headers).status_code, 404)
+
+        with mock.patch.object(settings, "report_job_ttl_seconds", 0):
+            self.assertEqual(report_jobs.purge_expired(), 0)  # expiry is fixed when the job ends
+        path = os.path.join(self.jobs_dir.name, f"job-{job['id']}.json")
+        with open(path) as f:
+            stored = json.load(f)
+        stored["expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+        with open(path, "w") as f:
+            json.dump(stored, f)
+        self.assertEqual(report_jobs.purge_expired(), 1)
+        self.assertEqual(os.listdir(self.jobs_dir.name), [])
+        self.assertEqual(self.client.get(job["download_url"], headers=self.headers).status_code, 404)
+
+    def test_interrupted_job_is_reported_and_replaced(self):
+        with mock.patch.object(report_jobs, "_get_executor") as executor:
+            stuck = self._submit()  # never runs: as if its worker died
+            self.assertTrue(executor.return_value.submit.called)
+        path = os.path.join(self.jobs_dir.name, f"job-{stuck['id']}.json")
+        with open(path) as f:
+            stored = json.load(f)
+        stored["status"] = "running"
+        stored["updated_at"] = (datetime.now(timezone.utc) - timedelta(seconds=report_jobs.STALE_AFTER + 1)).isoformat()
+        with open(path, "w") as f:
+            json.dump(stored, f)
+
+        replacement = self._submit()
+        self.assertFalse(replacement["deduplicated"])
+        self.assertNotEqual(replacement["id"], stuck["id"])
+        self._wait(stuck["id"], status="failed")
+        self._wait(replacement["id"])
+
+    def _stored(self, job_id):
+        with open(os.path.join(self.jobs_dir.name, f"job-{job_id}.json")) as f:
+            return json.load(f)
+
+    def test_shutdown_fails_queued_jobs(self):
+        release = threading.Event()
+        build = reports_routes._build_report_payload
+
+        def slow_build(*args):
+            release.wait(5)
+            return build(*args)
+
+        with mock.patch.object(settings, "report_job_workers", 1), \
+             mock.patch.object(reports_routes, "_build_report_payload", slow_build):
+            running = self._submit()
+            queued = self._submit(to_date="2026-03-02")
+            report_jobs.shutdown()
+            self.assertEqual(self._stored(queued["id"])["status"], "failed")
+            # Its key is released: the same request starts a new job instead of waiting on the dead one
+            again = self._submit(to_date="2026-03-02")
+            self.assertFalse(again["deduplicated"])
+            release.set()
+            self._wait(running["id"])
+            self._wait(again["id"])
+
+    def test_heartbeat_keeps_long_jobs_fresh(self):
+        release = threading.Event()
+        build = reports_routes._build_report_payload
+
+        def slow_build(*args):
+            release.wait(5)
+            return build(*args)
+
+        with mock.patch.object(report_jobs, "HEARTBEAT_INTERVAL", 0.05), \
+             mock.patch.object(reports_routes, "_build_report_payload", slow_build):
+            job = self._submit()  # json: reports no progress of its own
+            time.sleep(0.1)
+            first = self._stored(job["id"])["updated_at"]
+            time.sleep(0.2)
+            self.assertGreater(self._stored(job["id"])["updated_at"], first)
+            release.set()
+            self._wait(job["id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,330 @@
+
+import csv
+import io
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date, datetime, time, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app.main import app, get_session
+from back.app import models, reports_routes, sales_rollup, security
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestSalesReport(unittest.TestCase):
+    """GET /reports/sales breakdowns, computed in SQL, and the daily rollup behind them."""
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Report Bistro")
+            other = models.Tenant(name="Other Bistro")
+            session.add_all([tenant, other])
+            session.commit()
+            owner = models.User(email="owner@example.com", hashed_password="x",
+                                tenant_id=tenant.id, role=models.UserRole.owner)
+            wendy = models.User(email="wendy@example.com", hashed_password="x", full_name="Wendy",
+                                tenant_id=tenant.id, role=models.UserRole.waiter)
+            walt = models.User(email="walt@example.com", hashed_password="x", full_name="",
+                               tenant_id=tenant.id, role=models.UserRole.waiter)
+            session.add_all([owner, wendy, walt])
+            session.commit()
+            terrace = models.Floor(name="Terrace", tenant_id=tenant.id, default_waiter_id=wendy.id)
+            session.add(terrace)
+            session.commit()
+            # T1: floor default waiter; T2: own waiter (no full name); T3: nobody
+            t1 = models.Table(name="T1", tenant_id=tenant.id, floor_id=terrace.id)
+            t2 = models.Table(name="T2", tenant_id=tenant.id, floor_id=terrace.id, assigned_waiter_id=walt.id)
+            t3 = models.Table(name="T3", tenant_id=tenant.id)
+            t_other = models.Table(name="X1", tenant_id=other.id)
+            wine = models.Product(name="Rioja", price_cents=500, category="Wine", tenant_id=tenant.id)
+            bread = models.Product(name="Bread", price_cents=200, category="", tenant_id=tenant.id)
+            session.add_all([t1, t2, t3, t_other, wine, bread])
+            session.commit()
+
+            def order(table, status, created_at, paid_at=None, items=()):
+                o = models.Order(tenant_id=table.tenant_id, table_id=table.id, status=status,
+                                 created_at=created_at, paid_at=paid_at)
+                session.add(o)
+                session.commit()
+                for product, quantity, extra in items:
+                    session.add(models.OrderItem(
+                        order_id=o.id, product_id=product.id, product_name=product.name,
+                        quantity=quantity, price_cents=product.price_cents, **extra,
+                    ))
+                session.commit()
+
+            paid, completed = models.OrderStatus.paid, models.OrderStatus.completed
+            # Created before the range but paid inside it: counts on the paid day
+            order(t1, paid, _utc(2026, 2, 28, 23, 0), _utc(2026, 3, 1, 0, 30),
+                  [(wine, 2, {}), (bread, 1, {})])
+            # Cancelled and removed items are excluded
+            order(t2, completed, _utc(2026, 3, 1, 20, 0), None, [
+                (wine, 1, {}),
+                (bread, 5, {"status": models.OrderItemStatus.cancelled}),
+                (wine, 3, {"removed_by_customer": True}),
+            ])
+            order(t3, paid, _utc(2026, 3, 2, 13, 0), _utc(2026, 3, 2, 14, 0), [(bread, 3, {})])
+            # Not counted: open order, order paid after the range, other tenant, order with only removed items
+            order(t1, models.OrderStatus.pending, _utc(2026, 3, 1, 12, 0), None, [(wine, 9, {})])
+            order(t1, paid, _utc(2026, 3, 2, 23, 0), _utc(2026, 3, 3, 0, 10), [(wine, 9, {})])
+            order(t_other, paid, _utc(2026, 3, 1, 12, 0), _utc(2026, 3, 1, 13, 0), [(wine, 9, {})])
+            order(t3, paid, _utc(2026, 3, 1, 12, 0), _utc(2026, 3, 1, 13, 0),
+                  [(bread, 1, {"removed_by_customer": True})])
+
+            session.add_all([
+                models.Reservation(tenant_id=tenant.id, customer_name="A", customer_phone="1",
+                                   reservation_date=date(2026, 3, 1),
+                                   reservation_time=time(20), party_size=2, token="abc"),
+                models.Reservation(tenant_id=tenant.id, customer_name="B", customer_phone="2",
+                                   reservation_date=date(2026, 3, 2),
+                                   reservation_time=time(21), party_size=4),
+                # Empty token: created by staff, like no token
+                models.Reservation(tenant_id=tenant.id, customer_name="C", customer_phone="3",
+                                   reservation_date=date(2026, 3, 2),
+                                   reservation_time=time(21), party_size=4, token=""),
+            ])
+            session.commit()
+            self.tenant_id = tenant.id
+            self.t3_id = t3.id
+            self.bread_id = bread.id
+            self.auth_headers = {
+                "Authorization": "Bearer " + security.create_access_token(
+                    {"sub": owner.email, "tenant_id": tenant.id, "token_version": owner.token_version}
+                )
+            }
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _report(self, from_date, to_date):
+        response = self.client.get(
+            "/reports/sales", params={"from_date": from_date, "to_date": to_date}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_breakdowns(self):
+        report = self._report("2026-03-01", "2026-03-02")
+        self.assertEqual(report["summary"], {
+            "total_revenue_cents": 1200 + 500 + 600,
+            "total_orders": 3,
+            "daily": [
+                {"date": "2026-03-01", "revenue_cents": 1700, "order_count": 2},
+                {"date": "2026-03-02", "revenue_cents": 600, "order_count": 1},
+            ],
+        })
+        self.assertEqual(report["by_product"], [
+            {"product_id": report["by_product"][0]["product_id"], "product_name": "Rioja",
+             "category": "Wine", "quantity": 3, "revenue_cents": 1500},
+            {"product_id": report["by_product"][1]["product_id"], "product_name": "Bread",
+             "category": "Uncategorized", "quantity": 4, "revenue_cents": 800},
+        ])
+        self.assertEqual(report["by_category"], [
+            {"category": "Wine", "quantity": 3, "revenue_cents": 1500},
+            {"category": "Uncategorized", "quantity": 4, "revenue_cents": 800},
+        ])
+        self.assertEqual(report["by_table"], [
+            {"table_name": "T1", "revenue_cents": 1200, "order_count": 1},
+            {"table_name": "T3", "revenue_cents": 600, "order_count": 1},
+            {"table_name": "T2", "revenue_cents": 500, "order_count": 1},
+        ])
+        self.assertEqual(report["by_waiter"], [
+            {"waiter_name": "Wendy", "revenue_cents": 1200, "order_count": 1},
+            {"waiter_name": "Unassigned", "revenue_cents": 600, "order_count": 1},
+            {"waiter_name": "walt@example.com", "revenue_cents": 500, "order_count": 1},
+        ])
+        self.assertEqual(report["reservations"], {
+            "total": 3,
+            "by_source": [{"source": "staff", "count": 2}, {"source": "public", "count": 1}],
+        })
+
+    def test_swapped_and_empty_ranges(self):
+        report = self._report("2026-03-02", "2026-03-01")
+        self.assertEqual(report["from_date"], "2026-03-01")
+        self.assertEqual(report["summary"]["total_orders"], 3)
+
+        empty = self._report("2025-01-01", "2025-01-31")
+        self.assertEqual(empty["summary"], {"total_revenue_cents": 0, "total_orders": 0, "daily": []})
+        self.assertEqual(empty["by_waiter"], [])
+        self.assertEqual(empty["reservations"], {"total": 0, "by_source": []})
+
+    def _heatmap(self, **params):
+        response = self.client.get(
+            "/reports/heatmap", params={"from_date": "2026-03-01", "to_date": "2026-03-02", **params},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def _set_timezone(self, tz):
+        with Session(self.engine) as session:
+            session.get(models.Tenant, self.tenant_id).timezone = tz
+            session.commit()
+
+    def test_heatmap_in_tenant_timezone(self):
+        # Madrid is UTC+1 in early March; 2026-03-01 is a Sunday (ISO weekday 7)
+        self._set_timezone("Europe/Madrid")
+        heatmap = self._heatmap()
+        self.assertEqual(heatmap["timezone"], "Europe/Madrid")
+        self.assertEqual(heatmap["weekday_counts"], [1, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(heatmap["cells"], [
+            {"weekday": 1, "hour": 15, "revenue_cents": 600, "order_count": 1, "item_count": 3},
+            {"weekday": 7, "hour": 1, "revenue_cents": 1200, "order_count": 1, "item_count": 3},
+            {"weekday": 7, "hour": 21, "revenue_cents": 500, "order_count": 1, "item_count": 1},
+        ])
+        by_station = self._heatmap(split="station")["cells"]
+        self.assertEqual(
+            [(c["weekday"], c["hour"], c["station"], c["revenue_cents"], c["order_count"]) for c in by_station],
+            [(1, 15, "kitchen", 600, 1), (7, 1, "bar", 1000, 1), (7, 1, "kitchen", 200, 1), (7, 21, "bar", 500, 1)],
+        )
+        self.assertEqual({c["category"] for c in self._heatmap(split="category")["cells"]}, {"Wine", "Uncategorized"})
+
+        # +05:45: the local range shifts and cells land on quarter-hour offsets
+        self._set_timezone("Asia/Kathmandu")
+        self.assertEqual([(c["weekday"], c["hour"], c["revenue_cents"]) for c in self._heatmap()["cells"]],
+                         [(1, 1, 500), (1, 19, 600), (7, 6, 1200)])
+        self._set_timezone(None)
+        self.assertEqual(self._heatmap(from_date="2026-03-03", to_date="2026-03-03")["cells"], [
+            {"weekday": 2, "hour": 0, "revenue_cents": 4500, "order_count": 1, "item_count": 9},
+        ])
+        response = self.client.get("/reports/heatmap", params={"from_date": "2026-03-01", "to_date": "2026-03-02",
+                                                                "split": "waiter"}, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+
+    def _rollup(self):
+        rollup = models.SalesDailyRollup.__table__
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(*(rollup.c[name] for name in sales_rollup.ROLLUP_COLUMNS))).all()
+        return sorted(map(tuple, rows), key=repr)
+
+    def _assert_rollup_matches_rebuild(self):
+        incremental = self._rollup()
+        with self.engine.begin() as conn:
+            sales_rollup.rebuild(conn)
+        self.assertEqual(incremental, self._rollup())
+
+    def test_rollup_follows_staff_cancel_on_paid_order(self):
+        self._assert_rollup_matches_rebuild()
+        with Session(self.engine) as session:
+            order = session.exec(select(models.Order).where(
+                models.Order.table_id == self.t3_id, models.Order.paid_at == _utc(2026, 3, 2, 14, 0)
+            )).one()
+            item_id = order.items[0].id
+        response = self.client.put(
+            f"/orders/{order.id}/items/{item_id}/cancel", json={"reason": "wrong dish"}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+
+        report = self._report("2026-03-01", "2026-03-02")
+        self.assertEqual(report["summary"]["daily"], [
+            {"date": "2026-03-01", "revenue_cents": 1700, "order_count": 2},
+        ])
+        self.assertNotIn("T3", [t["table_name"] for t in report["by_table"]])
+        self._assert_rollup_matches_rebuild()
+
+    def test_mark_paid_moves_revenue_to_today(self):
+        today = datetime.now(timezone.utc).date()
+        with Session(self.engine) as session:
+            order = models.Order(tenant_id=self.tenant_id, table_id=self.t3_id,
+                                 status=models.OrderStatus.completed, created_at=_utc(2026, 3, 1, 21, 0))
+            session.add(order)
+            session.commit()
+            session.add(models.OrderItem(order_id=order.id, product_id=self.bread_id, product_name="Bread",
+                                         quantity=2, price_cents=200, status=models.OrderItemStatus.delivered))
+            session.commit()
+            order_id = order.id
+        # Completed orders count on their created day until paid
+        self.assertEqual(self._report("2026-03-01", "2026-03-01")["summary"]["total_revenue_cents"], 1700 + 400)
+
+        response = self.client.put(
+            f"/orders/{order_id}/mark-paid", json={"payment_method": "cash"}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+
+        self.assertEqual(self._report("2026-03-01", "2026-03-01")["summary"]["total_revenue_cents"], 1700)
+        report = self._report(str(today - timedelta(days=1)), str(today))
+        self.assertEqual(report["summary"]["daily"], [
+            {"date": today.isoformat(), "revenue_cents": 400, "order_count": 1},
+        ])
+        self.assertEqual(report["by_table"], [{"table_name": "T3", "revenue_cents": 400, "order_count": 1}])
+        self._assert_rollup_matches_rebuild()
+
+    def _export(self, **params):
+        response = self.client.get("/reports/export", params={
+            "from_date": "2026-03-01", "to_date": "2026-03-02", **params,
+        }, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response
+
+    def test_csv_export(self):
+        rows = list(csv.reader(io.StringIO(self._export(report="summary").text)))
+        self.assertEqual(rows, [
+            ["date", "revenue_cents", "order_count"], ["2026-03-01", "1700", "2"], ["2026-03-02", "600", "1"],
+        ])
+
+        with mock.patch.object(reports_routes, "EXPORT_CHUNK_ROWS", 2):
+            response = self._export(report="lines")
+        self.assertIn("pos2-sales-lines-2026-03-01-2026-03-02.csv", response.headers["content-disposition"])
+        lines = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual(list(lines[0]), reports_routes.LINE_HEADERS)
+        self.assertEqual(
+            [(l["date"], l["table_name"], l["waiter_name"], l["product_name"], l["category"], l["quantity"],
+              l["unit_price_cents"], l["revenue_cents"], l["order_status"]) for l in lines],
+            [
+                ("2026-03-01", "T1", "Wendy", "Rioja", "Wine", "2", "500", "1000", "paid"),
+                ("2026-03-01", "T1", "Wendy", "Bread", "Uncategorized", "1", "200", "200", "paid"),
+                ("2026-03-01", "T2", "walt@example.com", "Rioja", "Wine", "1", "500", "500", "completed"),
+                ("2026-03-02", "T3", "Unassigned", "Bread", "Uncategorized", "3", "200", "600", "paid"),
+            ],
+        )
+        self.assertEqual(lines[0]["revenue_at_utc"], "2026-03-01T00:30:00+00:00")
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(io.BytesIO(self._export(format="xlsx").content))
+        self.assertEqual(workbook.sheetnames,
+                         ["Summary", "Reservations", "By Product", "By Category", "By Table", "By Waiter"])
+        self.assertEqual([list(r) for r in workbook["Summary"].iter_rows(values_only=True)], [
+            ["Date", "Revenue (cents)", "Orders"], ["2026-03-01", 1700, 2], ["2026-03-02", 600, 1],
+            [None, None, None], ["Total", 2300, 3],
+        ])
+
+        # Past Excel's row limit the lines continue on another sheet
+        with mock.patch.object(reports_routes, "XLSX_MAX_ROWS", 3):
+            workbook = load_workbook(io.BytesIO(self._export(format="xlsx", report="lines").content))
+        self.assertEqual(workbook.sheetnames, ["Order lines", "Order lines (2)"])
+        first, second = (list(ws.iter_rows(values_only=True)) for ws in workbook.worksheets)
+        self.assertEqual([len(first), len(second)], [3, 3])
+        self.assertEqual(first[0], tuple(reports_routes.LINE_HEADERS))
+        self.assertEqual(first[1][:3], (datetime(2026, 3, 1), datetime(2026, 3, 1, 0, 30), first[1][2]))
+        self.assertEqual(second[2][7], "Bread")
+
+
+if __name__ == '__main__':
+    unittest.main()
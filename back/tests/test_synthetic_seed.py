@@ -0,0 +1,105 @@
+
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select, text
+from sqlmodel import SQLModel, create_engine
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import inventory_models, models
+from back.app.seeds import synthetic
+
+NOW = datetime(2026, 3, 14, 21, 30, tzinfo=timezone.utc)
+VOLUMES = synthetic.Volumes(
+    tenants=2, floors=2, tables_per_floor=3, waiters=2, products=12, languages=("es",),
+    months=1, orders_per_day=10, reservations_per_day=3, inventory_items=3,
+)
+
+
+class TestSyntheticSeed(unittest.TestCase):
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}")
+        SQLModel.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _generate(self, seed=1):
+        with self.engine.begin() as conn:
+            conn.execute(text("PRAGMA foreign_keys=ON"))
+            return synthetic.generate(conn, VOLUMES, seed=seed, now=NOW, batch_size=50)
+
+    def _count(self, conn, model):
+        return conn.execute(select(func.count()).select_from(model.__table__)).scalar_one()
+
+    def test_volumes_and_integrity(self):
+        counts = self._generate()
+        with self.engine.connect() as conn:
+            for model in (models.Tenant, models.Table, models.Product, models.Order, models.OrderItem,
+                          models.Reservation, inventory_models.InventoryTransaction, models.SalesDailyRollup,
+                          models.OrderItemStatusTransition):
+                self.assertEqual(counts[model.__tablename__], self._count(conn, model))
+            self.assertEqual(self._count(conn, models.Tenant), 2)
+            self.assertEqual(self._count(conn, models.Table), 12)
+            self.assertEqual(self._count(conn, models.I18nText), 2 * 12 * 2)
+            self.assertGreater(self._count(conn, models.Order), 400)
+            self.assertEqual(conn.execute(text("PRAGMA foreign_key_check")).fetchall(), [])
+
+            # Every open table points at an open order of its own tenant
+            open_orders = conn.execute(text(
+                'SELECT o.status, o.tenant_id = t.tenant_id FROM "table" t '
+                'JOIN "order" o ON o.id = t.active_order_id'
+            )).fetchall()
+            self.assertTrue(open_orders)
+            self.assertTrue(all(same_tenant for _, same_tenant in open_orders))
+            self.assertFalse({status for status, _ in open_orders} & {"paid", "completed", "cancelled"})
+
+            # Paid orders are mostly the history; each has payment details
+            paid = conn.execute(text(
+                "SELECT count(*), count(paid_at), count(payment_method) FROM \"order\" WHERE status = 'paid'"
+            )).one()
+            self.assertEqual(paid[0], paid[1])
+            self.assertEqual(paid[0], paid[2])
+            self.assertGreater(paid[0], 0.8 * self._count(conn, models.Order))
+            self.assertEqual(conn.execute(text(
+                "SELECT count(*) FROM orderitem i JOIN \"order\" o ON o.id = i.order_id "
+                "WHERE o.status = 'cancelled' AND i.status != 'cancelled'"
+            )).scalar_one(), 0)
+            # Each item's status log starts at creation and ends at its current status
+            self.assertEqual(conn.execute(text(
+                "SELECT count(*) FROM orderitem i WHERE i.status != (SELECT l.to_status "
+                "FROM order_item_status_transition l WHERE l.item_id = i.id ORDER BY l.id DESC LIMIT 1)"
+            )).scalar_one(), 0)
+            self.assertEqual(conn.execute(text(
+                "SELECT count(*) FROM order_item_status_transition WHERE from_status IS NULL"
+            )).scalar_one(), self._count(conn, models.OrderItem))
+
+            # Stock levels match the last running balance
+            items = conn.execute(text(
+                "SELECT i.current_quantity, (SELECT balance_after FROM inventory_transaction t "
+                "WHERE t.inventory_item_id = i.id ORDER BY t.id DESC LIMIT 1) FROM inventory_item i"
+            )).fetchall()
+            self.assertTrue(all(abs(float(a) - float(b)) < 1e-3 for a, b in items))
+
+    def test_same_seed_same_data(self):
+        self._generate(seed=3)
+        with self.engine.connect() as conn:
+            first = conn.execute(text('SELECT created_at, status FROM "order" ORDER BY id')).fetchall()
+        self.tearDown()
+        self.setUp()
+        self._generate(seed=3)
+        with self.engine.connect() as conn:
+            second = conn.execute(text('SELECT created_at, status FROM "order" ORDER BY id')).fetchall()
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
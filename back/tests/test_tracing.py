@@ -0,0 +1,113 @@
+
+import sys
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Adjust path to import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from back.app import models, tracing
+from back.app.main import app, get_async_session, get_session
+from back.tests.redis_helper import InMemoryRedis
+
+INCOMING_TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.db_dir.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_session_override():
+            with Session(self.engine) as session:
+                yield session
+
+        async def get_async_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = get_async_session_override
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            tenant = models.Tenant(name="Trace Tapas")
+            session.add(tenant)
+            session.commit()
+            table = models.Table(name="T1", tenant_id=tenant.id, is_active=True, order_pin="1234")
+            product = models.Product(name="Patatas", price_cents=450, tenant_id=tenant.id)
+            session.add_all([table, product])
+            session.commit()
+            self.table_token = table.token
+            self.product_id = product.id
+
+        self.redis = InMemoryRedis()
+        self.redis_patches = self.redis.patches()
+        for redis_patch in self.redis_patches:
+            redis_patch.start()
+        self.exporter = InMemorySpanExporter()
+        self.assertTrue(tracing.setup_tracing(exporter=self.exporter))
+
+    def tearDown(self):
+        tracing.shutdown_tracing()
+        for redis_patch in self.redis_patches:
+            redis_patch.stop()
+        app.dependency_overrides = {}
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def _place_order(self, headers=None):
+        response = self.client.post(
+            f"/menu/{self.table_token}/order",
+            json={"items": [{"product_id": self.product_id, "quantity": 1}], "pin": "1234"},
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+
+    def test_order_trace_reaches_published_event(self):
+        self._place_order()
+        spans = self.exporter.get_finished_spans()
+        server = [s for s in spans if s.name == "POST /menu/{table_token}/order"]
+        self.assertEqual(len(server), 1)
+        trace_id = server[0].context.trace_id
+
+        db_spans = [s for s in spans if s.name.startswith("db ")]
+        self.assertTrue(db_spans)
+        self.assertTrue(all(s.context.trace_id == trace_id for s in db_spans))
+        self.assertIn("db.statement", db_spans[0].attributes)
+        publish = [s for s in spans if s.name == "publish order_update"]
+        self.assertEqual([s.context.trace_id for s in publish], [trace_id])
+
+        # Both order channels, the table's eta_update and the kitchen queue delta carry
+        # the trace context, for ws-bridge to continue the trace
+        self.assertEqual([event["type"] for _, event in self.redis.published()[2:]],
+                         ["eta_update", "kitchen_queue_delta"])
+        for _, event in self.redis.published():
+            self.assertIn("order_id" if event["type"] != "kitchen_queue_delta" else "groups", event)
+            self.assertEqual(event["traceparent"].split("-")[1], f"{trace_id:032x}")
+
+    def test_incoming_traceparent_is_continued(self):
+        self._place_order(headers={"traceparent": f"00-{INCOMING_TRACE_ID}-00f067aa0ba902b7-01"})
+        server = [s for s in self.exporter.get_finished_spans() if s.name.startswith("POST ")]
+        self.assertEqual(f"{server[0].context.trace_id:032x}", INCOMING_TRACE_ID)
+
+    def test_disabled_tracing_leaves_payload_untouched(self):
+        tracing.shutdown_tracing()
+        self._place_order()
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+        self.assertNotIn("traceparent", self.redis.published()[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
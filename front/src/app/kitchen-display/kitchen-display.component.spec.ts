@@ -9,13 +9,19 @@ import { of } from 'rxjs';
 
 describe('KitchenDisplayComponent', () => {
   let orderUpdates$: Subject<unknown>;
-  let mockApi: { getOrders: jasmine.Spy; connectWebSocket: jasmine.Spy; orderUpdates$: Subject<unknown> };
+  let mockApi: {
+    getOrders: jasmine.Spy;
+    getKitchenQueue: jasmine.Spy;
+    connectWebSocket: jasmine.Spy;
+    orderUpdates$: Subject<unknown>;
+  };
   let mockAudio: { setEnabled: jasmine.Spy; playRestaurantOrderChange: jasmine.Spy };
 
   beforeEach(async () => {
     orderUpdates$ = new Subject<unknown>();
     mockApi = {
       getOrders: jasmine.createSpy('getOrders').and.returnValue(of([])),
+      getKitchenQueue: jasmine.createSpy('getKitchenQueue').and.returnValue(of({ generated_at: '', groups: [] })),
       connectWebSocket: jasmine.createSpy('connectWebSocket'),
       orderUpdates$,
     };
@@ -119,4 +125,35 @@ describe('KitchenDisplayComponent', () => {
     fixture.detectChanges();
     expect(mockApi.getOrders).toHaveBeenCalledWith(false);
   }));
+
+  it('should apply kitchen queue deltas in the batch view', () => {
+    const group = (key: string, name: string, station: string, quantity: number, oldest: string) => ({
+      key, product_id: 1, product_name: name, notes: null, station, quantity, pending: quantity, preparing: 0,
+      orders: 1, oldest_at: oldest, oldest_age_seconds: 0,
+    });
+    spyOn(localStorage, 'getItem').and.callFake((key: string) => (key === 'kitchen-display-view' ? 'batch' : null));
+    mockApi.getKitchenQueue.and.returnValue(of({
+      generated_at: '',
+      groups: [
+        group('1:', 'Margherita', 'kitchen', 3, '2026-03-02T19:00:00+00:00'),
+        group('2:', 'Lager', 'bar', 2, '2026-03-02T19:05:00+00:00'),
+      ],
+    }));
+    const fixture = TestBed.createComponent(KitchenDisplayComponent);
+    fixture.detectChanges();
+    expect(mockApi.getOrders).not.toHaveBeenCalled();
+    const component = fixture.componentInstance;
+    expect(component.visibleQueue().map((g) => g.quantity)).toEqual([3, 2]);
+
+    orderUpdates$.next({
+      type: 'kitchen_queue_delta',
+      groups: [group('1:', 'Margherita', 'kitchen', 5, '2026-03-02T19:00:00+00:00')],
+      removed: ['2:'],
+    });
+    expect(component.visibleQueue().map((g) => [g.key, g.quantity])).toEqual([['1:', 5]]);
+    expect(mockApi.getKitchenQueue).toHaveBeenCalledTimes(1);
+
+    component.setStation({ target: { value: 'bar' } } as unknown as Event);
+    expect(component.visibleQueue()).toEqual([]);
+  });
 });
@@ -8,13 +8,15 @@ import {
   ChangeDetectionStrategy,
 } from '@angular/core';
 import { RouterLink } from '@angular/router';
-import { ApiService, Order, OrderItem } from '../services/api.service';
+import { ApiService, KitchenQueueDelta, KitchenQueueGroup, Order, OrderItem } from '../services/api.service';
 import { AudioService } from '../services/audio.service';
 import { Subscription } from 'rxjs';
 import { TranslateModule, TranslateService } from '@ngx-translate/core';
 
 const REFRESH_INTERVAL_MS = 15000;
 const SOUND_STORAGE_KEY = 'kitchen-display-sound';
+const VIEW_STORAGE_KEY = 'kitchen-display-view';
+const STATION_STORAGE_KEY = 'kitchen-display-station';
 
 @Component({
   selector: 'app-kitchen-display',
@@ -32,6 +34,17 @@ const SOUND_STORAGE_KEY = 'kitchen-display-sound';
         </a>
         <h1 class="kitchen-title">{{ 'KITCHEN_DISPLAY.TITLE' | translate }}</h1>
         <div class="header-actions">
+          <div class="view-toggle" role="group">
+            <button type="button" [class.active]="view() === 'orders'" (click)="setView('orders')">{{ 'KITCHEN_DISPLAY.VIEW_ORDERS' | translate }}</button>
+            <button type="button" [class.active]="view() === 'batch'" (click)="setView('batch')">{{ 'KITCHEN_DISPLAY.VIEW_BATCH' | translate }}</button>
+          </div>
+          @if (view() === 'batch') {
+            <select class="station-select" [value]="station()" (change)="setStation($event)">
+              <option value="">{{ 'KITCHEN_DISPLAY.ALL_STATIONS' | translate }}</option>
+              <option value="kitchen">{{ 'KITCHEN_DISPLAY.STATION_KITCHEN' | translate }}</option>
+              <option value="bar">{{ 'KITCHEN_DISPLAY.STATION_BAR' | translate }}</option>
+            </select>
+          }
           <label class="sound-toggle">
             <input type="checkbox" [checked]="soundEnabled()" (change)="toggleSound($event)" />
             <span class="sound-label">{{ soundEnabled() ? ('KITCHEN_DISPLAY.SOUND_ON' | translate) : ('KITCHEN_DISPLAY.SOUND_OFF' | translate) }}</span>
@@ -45,6 +58,31 @@ const SOUND_STORAGE_KEY = 'kitchen-display-sound';
           <div class="empty-state">
             <p>{{ 'ORDERS.LOADING' | translate }}</p>
           </div>
+        } @else if (view() === 'batch') {
+          @if (visibleQueue().length === 0) {
+            <div class="empty-state">
+              <h2>{{ 'KITCHEN_DISPLAY.QUEUE_EMPTY' | translate }}</h2>
+            </div>
+          } @else {
+            <ul class="queue-list">
+              @for (group of visibleQueue(); track group.key) {
+                <li class="queue-row" [class]="'station-' + group.station">
+                  <span class="queue-qty">{{ group.quantity }}×</span>
+                  <span class="queue-name">{{ group.product_name }}</span>
+                  <span class="queue-age" [title]="formatExactTime(group.oldest_at)">{{ formatOrderTime(group.oldest_at) }}</span>
+                  @if (group.notes) {
+                    <span class="item-notes">{{ group.notes }}</span>
+                  }
+                  <span class="queue-meta">
+                    {{ 'KITCHEN_DISPLAY.ORDERS_COUNT' | translate: { count: group.orders } }}
+                    @if (group.preparing > 0) {
+                      · <span class="item-status status-preparing">{{ 'KITCHEN_DISPLAY.PREPARING_COUNT' | translate: { count: group.preparing } }}</span>
+                    }
+                  </span>
+                </li>
+              }
+            </ul>
+          }
         } @else if (activeOrders().length === 0) {
           <div class="empty-state">
             <div class="empty-icon">
@@ -144,6 +182,55 @@ const SOUND_STORAGE_KEY = 'kitchen-display-sound';
       color: var(--color-text);
     }
     .sound-toggle input { cursor: pointer; width: 18px; height: 18px; }
+    .view-toggle {
+      display: inline-flex;
+      border: 1px solid var(--color-border);
+      border-radius: var(--radius-md);
+      overflow: hidden;
+    }
+    .view-toggle button {
+      padding: var(--space-2) var(--space-3);
+      border: none;
+      background: var(--color-surface);
+      color: var(--color-text);
+      font-size: 0.9375rem;
+      font-weight: 500;
+      cursor: pointer;
+    }
+    .view-toggle button.active { background: var(--color-primary); color: #fff; }
+    .station-select {
+      padding: var(--space-2) var(--space-3);
+      border: 1px solid var(--color-border);
+      border-radius: var(--radius-md);
+      background: var(--color-surface);
+      color: var(--color-text);
+      font-size: 0.9375rem;
+    }
+    .queue-list {
+      list-style: none;
+      margin: 0;
+      padding: 0;
+      display: flex;
+      flex-direction: column;
+      gap: var(--space-3);
+    }
+    .queue-row {
+      display: grid;
+      grid-template-columns: 4rem 1fr auto;
+      align-items: baseline;
+      gap: var(--space-2) var(--space-4);
+      padding: var(--space-4) var(--space-5);
+      background: var(--color-surface);
+      border: 2px solid var(--color-border);
+      border-left: 6px solid var(--color-warning);
+      border-radius: var(--radius-lg);
+      font-size: 1.25rem;
+    }
+    .queue-row.station-bar { border-left-color: #8B5CF6; }
+    .queue-qty { font-size: 1.75rem; font-weight: 700; color: var(--color-primary); }
+    .queue-name { font-weight: 600; color: var(--color-text); }
+    .queue-age { font-size: 1rem; color: var(--color-text-muted); }
+    .queue-meta { grid-column: 2 / -1; font-size: 0.9375rem; color: var(--color-text-muted); }
     .last-refresh {
       font-size: 0.875rem;
       color: var(--color-text-muted);
@@ -270,6 +357,9 @@ export class KitchenDisplayComponent implements OnInit, OnDestroy {
   private wsSub: Subscription | null = null;
 
   orders = signal<Order[]>([]);
+  queue = signal<KitchenQueueGroup[]>([]);
+  view = signal<'orders' | 'batch'>('orders');
+  station = signal<'' | 'kitchen' | 'bar'>('');
   loading = signal(true);
   lastRefreshAt = signal<Date | null>(null);
   soundEnabled = signal(true);
@@ -280,6 +370,13 @@ export class KitchenDisplayComponent implements OnInit, OnDestroy {
     )
   );
 
+  /** Queue groups for the selected station, oldest first (as sent by the API). */
+  visibleQueue = computed(() => {
+    const station = this.station();
+    const groups = station ? this.queue().filter((g) => g.station === station) : this.queue();
+    return [...groups].sort((a, b) => a.oldest_at.localeCompare(b.oldest_at) || a.product_name.localeCompare(b.product_name));
+  });
+
   lastRefreshRelative = computed(() => {
     const at = this.lastRefreshAt();
     if (!at) return '—';
@@ -299,19 +396,28 @@ export class KitchenDisplayComponent implements OnInit, OnDestroy {
     const stored = localStorage.getItem(SOUND_STORAGE_KEY);
     this.soundEnabled.set(stored !== 'false');
     this.audio.setEnabled(this.soundEnabled());
+    this.view.set(localStorage.getItem(VIEW_STORAGE_KEY) === 'batch' ? 'batch' : 'orders');
+    const station = localStorage.getItem(STATION_STORAGE_KEY);
+    this.station.set(station === 'kitchen' || station === 'bar' ? station : '');
 
-    this.loadOrders();
-    this.refreshIntervalId = setInterval(() => this.loadOrders(), REFRESH_INTERVAL_MS);
+    this.refresh();
+    this.refreshIntervalId = setInterval(() => this.refresh(), REFRESH_INTERVAL_MS);
 
     try {
       this.api.connectWebSocket();
       this.wsSub = this.api.orderUpdates$.subscribe((update: unknown) => {
         if (update && typeof update === 'object' && 'type' in update) {
           const type = (update as { type: string }).type;
+          if (type === 'kitchen_queue_delta') {
+            this.applyQueueDelta(update as KitchenQueueDelta);
+            return;
+          }
           if (this.soundEnabled() && ['new_order', 'items_added'].includes(type)) {
             this.audio.playRestaurantOrderChange();
           }
-          this.loadOrders();
+          if (this.view() === 'orders') {
+            this.loadOrders();
+          }
         }
       });
     } catch {
@@ -339,6 +445,46 @@ export class KitchenDisplayComponent implements OnInit, OnDestroy {
     });
   }
 
+  /** Orders for the card view, or the grouped queue for the batch view. */
+  refresh(): void {
+    if (this.view() === 'batch') {
+      this.loadQueue();
+    } else {
+      this.loadOrders();
+    }
+  }
+
+  loadQueue(): void {
+    this.api.getKitchenQueue().subscribe({
+      next: (response) => {
+        this.queue.set(response.groups);
+        this.lastRefreshAt.set(new Date());
+        this.loading.set(false);
+      },
+      error: () => this.loading.set(false),
+    });
+  }
+
+  /** Changed groups replace the ones with the same key; removed keys are dropped. */
+  applyQueueDelta(delta: KitchenQueueDelta): void {
+    const gone = new Set([...delta.removed, ...delta.groups.map((g) => g.key)]);
+    this.queue.update((groups) => [...groups.filter((g) => !gone.has(g.key)), ...delta.groups]);
+    this.lastRefreshAt.set(new Date());
+  }
+
+  setView(view: 'orders' | 'batch'): void {
+    this.view.set(view);
+    localStorage.setItem(VIEW_STORAGE_KEY, view);
+    this.loading.set(true);
+    this.refresh();
+  }
+
+  setStation(event: Event): void {
+    const value = (event.target as HTMLSelectElement).value;
+    this.station.set(value === 'kitchen' || value === 'bar' ? value : '');
+    localStorage.setItem(STATION_STORAGE_KEY, this.station());
+  }
+
   toggleSound(event: Event): void {
     const checked = (event.target as HTMLInputElement).checked;
     this.soundEnabled.set(checked);
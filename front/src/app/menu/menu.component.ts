@@ -23,6 +23,7 @@ interface PlacedOrder {
   notes: string;
   total: number;
   status: string;
+  estimatedReadyAt?: string | null;
 }
 
 @Component({
@@ -367,6 +368,10 @@ export class MenuComponent implements OnInit, OnDestroy {
             );
           }
           this.loadStoredOrders();
+        } else if (data.type === 'eta_update') {
+          this.placedOrders.update(orders =>
+            orders.map(o => o.id === data.order_id ? { ...o, estimatedReadyAt: data.estimated_ready_at } : o)
+          );
         } else if (data.type === 'item_removed' || data.type === 'item_updated' || data.type === 'order_cancelled' || data.type === 'items_added' || data.type === 'new_order') {
           this.audio.playCustomerOrderChange();
           this.loadStoredOrders();
@@ -958,7 +963,8 @@ export class MenuComponent implements OnInit, OnDestroy {
             } as CartItem))),
             notes: response.order.notes || '',
             total: response.order.total_cents,
-            status: response.order.status
+            status: response.order.status,
+            estimatedReadyAt: response.order.estimated_ready_at
           };
           this.placedOrders.set([order]);
           this.saveOrders();
@@ -1012,6 +1018,11 @@ export class MenuComponent implements OnInit, OnDestroy {
       d.toLocaleTimeString(undefined, { hour: '2-digit', minute: '2-digit' });
   }
 
+  /** Whole minutes until the estimated ready time, at least 1. */
+  minutesUntil(readyAt: string): number {
+    return Math.max(1, Math.ceil((new Date(readyAt).getTime() - Date.now()) / 60000));
+  }
+
   canCancelOrder(order: PlacedOrder): boolean {
     // Can cancel if order is pending and has no items in preparing/ready/delivered status
     if (order.status === 'paid' || order.status === 'completed' || order.status === 'cancelled') {
@@ -118,6 +118,11 @@ export class ReportsComponent implements OnInit {
     this.export('csv', 'summary');
   }
 
+  /** One CSV row per order item, for accountants. */
+  exportLines() {
+    this.export('csv', 'lines');
+  }
+
   exportExcel() {
     this.exporting.set(true);
     const from = this.fromDate();
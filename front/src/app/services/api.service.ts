@@ -335,6 +335,26 @@ export interface Order {
   payment_method?: string | null;
 }
 
+export interface KitchenQueueGroup {
+  key: string;  // product id and notes
+  product_id: number;
+  product_name: string;
+  notes: string | null;
+  station: 'kitchen' | 'bar';
+  quantity: number;
+  pending: number;
+  preparing: number;
+  orders: number;
+  oldest_at: string;
+  oldest_age_seconds: number;
+}
+
+export interface KitchenQueueDelta {
+  type: 'kitchen_queue_delta';
+  groups: KitchenQueueGroup[];
+  removed: string[];
+}
+
 export interface MenuResponse {
   table_name: string;
   table_id: number;
@@ -784,6 +804,10 @@ export class ApiService {
     return this.http.get<Order[]>(`${this.apiUrl}/orders`, params);
   }
 
+  getKitchenQueue(): Observable<{ generated_at: string; groups: KitchenQueueGroup[] }> {
+    return this.http.get<{ generated_at: string; groups: KitchenQueueGroup[] }>(`${this.apiUrl}/kitchen/queue`);
+  }
+
   updateOrderStatus(orderId: number, status: string): Observable<any> {
     return this.http.put(`${this.apiUrl}/orders/${orderId}/status`, { status });
   }
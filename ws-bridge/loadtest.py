@@ -0,0 +1,366 @@
+"""
+WebSocket Bridge load test
+
+Starts ws-bridge (main.py) in a subprocess against a local Redis (or an
+in-process fakeredis TCP server), stubs the backend's table-validation
+endpoint, opens N table and tenant WebSocket clients and publishes synthetic
+order events at a fixed rate. Reports delivery latency percentiles, bridge
+memory per connection and bridge CPU.
+
+Usage (from repo root):
+    pip install -r ws-bridge/requirements.txt -r ws-bridge/requirements-loadtest.txt
+    python ws-bridge/loadtest.py --tables 2000 --tenants 20 --tenant-clients 5 --rate 200 --duration 30
+    python ws-bridge/loadtest.py --redis-url redis://localhost:6379 --json-out bridge-load.json
+
+Table clients connect to /ws/table/table-{id}; the stub validation endpoint maps
+that token to table {id} of tenant {id % tenants + 1}. Tenant clients use a JWT
+signed with the same SECRET_KEY that is passed to the bridge.
+
+The fakeredis server shares this process (and its GIL) with the clients, so it
+caps the publish rate; check "publish_rate_achieved" and use --redis-url with a
+real Redis for numbers you intend to compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO
+
+import msgpack
+import psutil
+import redis.asyncio as redis
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from jose import jwt
+from websockets.asyncio.client import connect
+
+BRIDGE_DIR = Path(__file__).resolve().parent
+SECRET_KEY = "loadtest-secret"
+ALGORITHM = "HS256"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _raise_fd_limit() -> None:
+    """Each client and each bridge-side socket needs a file descriptor."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+# ============ STUBS ============
+
+
+def start_validation_stub(port: int, tenants: int) -> uvicorn.Server:
+    """Serve /internal/validate-table/{token} the way the backend does, without a DB."""
+    stub = FastAPI()
+
+    @stub.get("/internal/validate-table/{table_token}")
+    def validate(table_token: str) -> dict:
+        if not table_token.startswith("table-"):
+            raise HTTPException(status_code=404, detail="Table not found")
+        table_id = int(table_token.split("-", 1)[1])
+        return {"table_id": table_id, "tenant_id": table_id % tenants + 1, "valid": True}
+
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    return server
+
+
+def start_fake_redis(port: int):
+    """In-process fakeredis speaking the Redis protocol, for runs without a Redis server."""
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_bridge(
+    port: int, redis_url: str, api_url: str, log_path: Path | None
+) -> tuple[subprocess.Popen, IO | None]:
+    """The bridge process and its log file (None without --bridge-log); the caller closes the file."""
+    env = {
+        **os.environ,
+        "REDIS_URL": redis_url,
+        "API_URL": api_url,
+        "SECRET_KEY": SECRET_KEY,
+        "ALGORITHM": ALGORITHM,
+    }
+    log = open(log_path, "w") if log_path else None
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--ws", "websockets", "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BRIDGE_DIR,
+        env=env,
+        stdout=log if log is not None else subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+    )
+    return process, log
+
+
+async def wait_for_bridge(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            await writer.wait_closed()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"ws-bridge did not start on port {port}")
+
+
+# ============ CLIENTS ============
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies_ms: list[float] = []
+        self.received = 0
+        self.connect_failures = 0
+        self.failure_reasons: dict[str, int] = {}
+
+
+async def run_client(
+    url: str,
+    subprotocols: list[str] | None,
+    compression: str | None,
+    stats: Stats,
+    ready: asyncio.Event,
+    stop: asyncio.Event,
+):
+    try:
+        async with connect(
+            url, subprotocols=subprotocols, compression=compression, open_timeout=30, ping_interval=None
+        ) as ws:
+            ready.set()
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                now_ns = time.time_ns()
+                if isinstance(raw, bytes):
+                    event = msgpack.unpackb(raw)
+                else:
+                    event = json.loads(raw)
+                sent_ns = event.get("sent_at_ns")
+                if sent_ns:
+                    stats.latencies_ms.append((now_ns - sent_ns) / 1e6)
+                stats.received += 1
+    except Exception as e:
+        stats.connect_failures += 1
+        reason = type(e).__name__
+        stats.failure_reasons[reason] = stats.failure_reasons.get(reason, 0) + 1
+        ready.set()
+
+
+async def publish_events(redis_url: str, tables: int, tenants: int, rate: float, duration: float) -> int:
+    """Publish order events to table and tenant channels, like publish_order_update does."""
+    r = redis.from_url(redis_url)
+    published = 0
+    interval = 1.0 / rate
+    deadline = time.monotonic() + duration
+    next_at = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            table_id = random.randint(1, tables)
+            tenant_id = table_id % tenants + 1
+            payload = json.dumps({
+                "type": "items_added",
+                "order_id": published,
+                "table_name": f"T{table_id}",
+                "status": "pending",
+                "sent_at_ns": time.time_ns(),
+            }, separators=(",", ":"))
+            pipe = r.pipeline(transaction=False)
+            pipe.publish(f"orders:tenant:{tenant_id}", payload)
+            pipe.publish(f"orders:table:{table_id}", payload)
+            await pipe.execute()
+            published += 1
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    finally:
+        await r.aclose()
+    return published
+
+
+async def open_clients(args, bridge_port: int, stats: Stats, stop: asyncio.Event) -> list[asyncio.Task]:
+    tasks = []
+    subprotocols = ["pos2.msgpack"] if args.encoding == "msgpack" else None
+    compression = None if args.no_compression else "deflate"
+    batch: list[asyncio.Event] = []
+
+    async def flush_batch():
+        await asyncio.gather(*(e.wait() for e in batch))
+        batch.clear()
+
+    for table_id in range(1, args.tables + 1):
+        for _ in range(args.clients_per_table):
+            ready = asyncio.Event()
+            url = f"ws://127.0.0.1:{bridge_port}/ws/table/table-{table_id}"
+            tasks.append(asyncio.create_task(run_client(url, subprotocols, compression, stats, ready, stop)))
+            batch.append(ready)
+            if len(batch) >= args.connect_batch:
+                await flush_batch()
+    for tenant_id in range(1, args.tenants + 1):
+        token = jwt.encode({"sub": f"loadtest{tenant_id}@example.com", "tenant_id": tenant_id}, SECRET_KEY, algorithm=ALGORITHM)
+        for _ in range(args.tenant_clients):
+            ready = asyncio.Event()
+            url = f"ws://127.0.0.1:{bridge_port}/ws/tenant/{tenant_id}?token={token}"
+            tasks.append(asyncio.create_task(run_client(url, subprotocols, compression, stats, ready, stop)))
+            batch.append(ready)
+            if len(batch) >= args.connect_batch:
+                await flush_batch()
+    await flush_batch()
+    return tasks
+
+
+# ============ MAIN ============
+
+
+async def run(args) -> dict:
+    _raise_fd_limit()
+    stub_port = _free_port()
+    bridge_port = _free_port()
+    fake_redis = None
+    redis_url = args.redis_url
+    if not redis_url:
+        redis_port = _free_port()
+        fake_redis = start_fake_redis(redis_port)
+        redis_url = f"redis://127.0.0.1:{redis_port}"
+    stub = start_validation_stub(stub_port, args.tenants)
+    bridge, bridge_log = start_bridge(bridge_port, redis_url, f"http://127.0.0.1:{stub_port}", args.bridge_log)
+    proc = psutil.Process(bridge.pid)
+    stats = Stats()
+    stop = asyncio.Event()
+    try:
+        await wait_for_bridge(bridge_port)
+        await asyncio.sleep(1.0)  # let the Redis listener subscribe
+        rss_idle = proc.memory_info().rss
+
+        t0 = time.monotonic()
+        tasks = await open_clients(args, bridge_port, stats, stop)
+        connect_seconds = time.monotonic() - t0
+        await asyncio.sleep(1.0)
+        rss_connected = proc.memory_info().rss
+        connections = len(tasks) - stats.connect_failures
+
+        proc.cpu_percent(None)
+        cpu_before = proc.cpu_times()
+        t_publish = time.monotonic()
+        published = await publish_events(redis_url, args.tables, args.tenants, args.rate, args.duration)
+        publish_seconds = time.monotonic() - t_publish
+        await asyncio.sleep(args.drain)
+        cpu_after = proc.cpu_times()
+        cpu_percent = proc.cpu_percent(None)
+        rss_peak = proc.memory_info().rss
+
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        bridge.terminate()
+        try:
+            bridge.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            bridge.kill()
+        if bridge_log is not None:
+            bridge_log.close()
+        stub.should_exit = True
+        if fake_redis is not None:
+            fake_redis.shutdown()
+
+    latencies = sorted(stats.latencies_ms)
+    # Every event goes to one table channel and one tenant channel.
+    expected = published * (args.clients_per_table + args.tenant_clients)
+    cpu_seconds = (cpu_after.user + cpu_after.system) - (cpu_before.user + cpu_before.system)
+    return {
+        "config": {
+            "tables": args.tables,
+            "clients_per_table": args.clients_per_table,
+            "tenants": args.tenants,
+            "tenant_clients": args.tenant_clients,
+            "rate": args.rate,
+            "duration": args.duration,
+            "encoding": args.encoding,
+            "compression": not args.no_compression,
+            "redis": "fakeredis" if fake_redis is not None else redis_url,
+        },
+        "connections": connections,
+        "connect_failures": stats.connect_failures,
+        "connect_failure_reasons": stats.failure_reasons,
+        "connect_seconds": round(connect_seconds, 2),
+        "published": published,
+        "publish_rate_achieved": round(published / publish_seconds, 1) if publish_seconds else 0.0,
+        "delivered": stats.received,
+        "expected_deliveries": expected,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p90": round(_percentile(latencies, 90), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "memory": {
+            "rss_idle_mb": round(rss_idle / 2**20, 1),
+            "rss_connected_mb": round(rss_connected / 2**20, 1),
+            "rss_peak_mb": round(rss_peak / 2**20, 1),
+            "bytes_per_connection": int((rss_connected - rss_idle) / connections) if connections else 0,
+        },
+        "cpu": {
+            "seconds": round(cpu_seconds, 2),
+            "percent_of_core": round(cpu_percent, 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ws-bridge with synthetic order events")
+    parser.add_argument("--tables", type=int, default=500, help="Number of tables (default: 500)")
+    parser.add_argument("--clients-per-table", type=int, default=2, help="Customer sockets per table (default: 2)")
+    parser.add_argument("--tenants", type=int, default=10, help="Number of tenants (default: 10)")
+    parser.add_argument("--tenant-clients", type=int, default=3, help="Staff sockets per tenant (default: 3)")
+    parser.add_argument("--rate", type=float, default=100.0, help="Published events per second (default: 100)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Publishing duration in seconds (default: 20)")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for in-flight frames (default: 2)")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json", help="Client subprotocol (default: json)")
+    parser.add_argument("--no-compression", action="store_true", help="Do not offer permessage-deflate")
+    parser.add_argument("--connect-batch", type=int, default=200, help="Concurrent connection attempts (default: 200)")
+    parser.add_argument("--redis-url", default=None, help="Use this Redis instead of an in-process fakeredis")
+    parser.add_argument("--bridge-log", type=Path, default=None, help="Write bridge stdout/stderr to this file")
+    parser.add_argument("--json-out", type=Path, default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.json_out:
+        args.json_out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
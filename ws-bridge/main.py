@@ -4,12 +4,22 @@ WebSocket Bridge Microservice
 Subscribes to Redis pub/sub channels and broadcasts messages to connected WebSocket clients.
 - Table-specific channel: orders:table:{table_id} (for customers)
 - Tenant-wide channel: orders:tenant:{tenant_id} (for restaurant owners)
+
+Payload encoding is negotiated per socket through Sec-WebSocket-Protocol:
+"pos2.msgpack" gets binary MessagePack frames, anything else gets the JSON text
+published by the backend. Each message is encoded at most once per encoding.
+permessage-deflate is negotiated by uvicorn (see Dockerfile).
+
+Tracing (optional, TRACING_EXPORTER=console|file|otlp): the backend puts a W3C
+`traceparent` into each published event; the fan-out of that event to sockets is
+recorded as a child span, so one trace covers order -> Redis -> WebSocket clients.
+The field is removed before events reach customer (table) sockets.
 """
 import asyncio
 import json
 import logging
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 from typing import Optional
 from urllib.parse import unquote
 
@@ -22,6 +32,17 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp, Receive, Scope, Send
 from jose import JWTError, jwt
 
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients then only get JSON
+    msgpack = None
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+except ImportError:  # opentelemetry is optional; tracing is then disabled
+    otel_trace = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,11 +55,88 @@ logger = logging.getLogger(__name__)
 # Key: "table:{table_id}" or "tenant:{tenant_id}"
 table_connections: dict[int, set[WebSocket]] = {}  # table_id -> set of WebSockets
 tenant_connections: dict[int, set[WebSocket]] = {}  # tenant_id -> set of WebSockets
+connection_encodings: dict[WebSocket, str] = {}  # WebSocket -> negotiated payload encoding
+
+# Payload encodings, negotiated via Sec-WebSocket-Protocol.
+# "pos2.msgpack" sends binary MessagePack frames; "pos2.json" (or no subprotocol) sends JSON text.
+SUBPROTOCOL_MSGPACK = "pos2.msgpack"
+SUBPROTOCOL_JSON = "pos2.json"
+ENCODING_MSGPACK = "msgpack"
+ENCODING_JSON = "json"
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_THIS_IN_PRODUCTION")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 API_URL = os.getenv("API_URL", "http://localhost:8020")
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "ws-bridge-traces.jsonl")
+
+tracer = None  # set by setup_tracing() when TRACING_EXPORTER is not "none"
+
+
+def setup_tracing() -> None:
+    """Start exporting spans (console, JSON-lines file or OTLP) if TRACING_EXPORTER asks for it."""
+    global tracer
+    if TRACING_EXPORTER == "none":
+        return
+    if otel_trace is None:
+        logger.warning("TRACING_EXPORTER is set but opentelemetry is not installed; tracing disabled")
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if TRACING_EXPORTER == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter()
+        elif TRACING_EXPORTER == "file":
+            exporter = ConsoleSpanExporter(
+                out=open(TRACING_FILE, "a", buffering=1),
+                formatter=lambda span: span.to_json(indent=None) + "\n",
+            )
+        else:
+            exporter = ConsoleSpanExporter()
+    except (ImportError, OSError) as e:
+        logger.warning(f"Tracing disabled: {e}")
+        return
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME") or "pos2-ws-bridge"})
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    logger.info(f"Tracing enabled ({TRACING_EXPORTER} exporter)")
+
+
+def _fanout_span(channel: str, data: bytes):
+    """Span for broadcasting one event, continuing the publisher's trace when it sent one."""
+    if tracer is None:
+        return nullcontext()
+    context = None
+    if b'"traceparent"' in data:
+        try:
+            context = TraceContextTextMapPropagator().extract(json.loads(data))
+        except ValueError:
+            pass
+    return tracer.start_as_current_span(
+        "ws fan-out",
+        context=context,
+        kind=otel_trace.SpanKind.CONSUMER,
+        attributes={"messaging.system": "redis", "messaging.destination.name": channel},
+    )
+
+
+def _without_traceparent(data: bytes) -> bytes:
+    """The event without the backend's internal trace context, for customer sockets."""
+    if b'"traceparent"' not in data:
+        return data
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return data
+    if not isinstance(event, dict) or event.pop("traceparent", None) is None:
+        return data
+    return json.dumps(event, separators=(",", ":")).encode()
 
 
 async def validate_table_token(table_token: str) -> Optional[dict]:
@@ -66,6 +164,57 @@ def validate_jwt_token(token: str) -> Optional[dict]:
         return None
 
 
+def _select_encoding(websocket: WebSocket) -> tuple[str, Optional[str]]:
+    """
+    Pick the payload encoding from the client's offered subprotocols.
+
+    Returns (encoding, subprotocol to echo in accept()). Clients that offer no
+    known subprotocol get JSON text frames, as before.
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    for proto in offered:
+        if proto == SUBPROTOCOL_MSGPACK and msgpack is not None:
+            return ENCODING_MSGPACK, proto
+        if proto == SUBPROTOCOL_JSON:
+            return ENCODING_JSON, proto
+    return ENCODING_JSON, None
+
+
+async def _broadcast(connections: set[WebSocket], data: bytes) -> int:
+    """
+    Send one published message to every socket, encoding it once per encoding.
+    Returns the number of sockets it was delivered to.
+    """
+    text_payload = data.decode()
+    msgpack_payload: Optional[bytes] = None
+    if msgpack is not None and any(connection_encodings.get(ws) == ENCODING_MSGPACK for ws in connections):
+        try:
+            msgpack_payload = msgpack.packb(json.loads(data), use_bin_type=True)
+        except (ValueError, TypeError):
+            # Not JSON: MessagePack sockets cannot get it, JSON sockets still do
+            logger.warning("Skipping MessagePack clients for a non-JSON payload")
+    dead_connections = set()
+    skipped = 0
+
+    for ws in list(connections):
+        try:
+            if connection_encodings.get(ws) == ENCODING_MSGPACK:
+                if msgpack_payload is None:
+                    skipped += 1
+                    continue
+                await ws.send_bytes(msgpack_payload)
+            else:
+                await ws.send_text(text_payload)
+        except Exception:
+            dead_connections.add(ws)
+
+    sent = len(connections) - len(dead_connections) - skipped
+    connections -= dead_connections
+    for ws in dead_connections:
+        connection_encodings.pop(ws, None)
+    return sent
+
+
 async def redis_listener():
     """Subscribe to Redis and broadcast to WebSocket clients."""
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -81,35 +230,30 @@ async def redis_listener():
             async for message in pubsub.listen():
                 if message["type"] == "pmessage":
                     channel = message["channel"].decode()
-                    data = message["data"].decode()
+                    data = message["data"]
                     
                     # Parse channel: orders:table:{table_id} or orders:tenant:{tenant_id}
                     parts = channel.split(":")
                     if len(parts) == 3:
                         channel_type = parts[1]  # "table" or "tenant"
                         entity_id = int(parts[2])
-                        
-                        dead_connections = set()
-                        
-                        if channel_type == "table":
-                            # Broadcast to all clients connected to this table
-                            if entity_id in table_connections:
-                                for ws in table_connections[entity_id]:
-                                    try:
-                                        await ws.send_text(data)
-                                    except Exception:
-                                        dead_connections.add(ws)
-                                table_connections[entity_id] -= dead_connections
-                        
-                        elif channel_type == "tenant":
-                            # Broadcast to all clients connected to this tenant
-                            if entity_id in tenant_connections:
-                                for ws in tenant_connections[entity_id]:
-                                    try:
-                                        await ws.send_text(data)
-                                    except Exception:
-                                        dead_connections.add(ws)
-                                tenant_connections[entity_id] -= dead_connections
+                        sent = 0
+
+                        with _fanout_span(channel, data) as span:
+                            if channel_type == "table":
+                                # Broadcast to all clients connected to this table
+                                if entity_id in table_connections:
+                                    sent = await _broadcast(
+                                        table_connections[entity_id], _without_traceparent(data)
+                                    )
+
+                            elif channel_type == "tenant":
+                                # Broadcast to all clients connected to this tenant
+                                if entity_id in tenant_connections:
+                                    sent = await _broadcast(tenant_connections[entity_id], data)
+
+                            if span is not None:
+                                span.set_attribute("ws.recipients", sent)
                         
         except Exception as e:
             logger.error(f"Redis connection error: {e}", exc_info=True)
@@ -118,6 +262,7 @@ async def redis_listener():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    setup_tracing()
     # Start Redis listener on startup
     task = asyncio.create_task(redis_listener())
     yield
@@ -316,9 +461,10 @@ async def websocket_table_endpoint(websocket: WebSocket, table_token: str):
     """WebSocket endpoint for customers - validates table_token and only sends table-specific updates."""
     client_host = websocket.client.host if websocket.client else "unknown"
     logger.info(f"WebSocket connection attempt: /ws/table/{table_token} from {client_host}")
+    encoding, subprotocol = _select_encoding(websocket)
     
     try:
-        await websocket.accept()
+        await websocket.accept(subprotocol=subprotocol)
     except Exception as e:
         logger.error(f"Failed to accept WebSocket connection for /ws/table/{table_token}: {e}")
         return
@@ -336,16 +482,20 @@ async def websocket_table_endpoint(websocket: WebSocket, table_token: str):
     if table_id not in table_connections:
         table_connections[table_id] = set()
     table_connections[table_id].add(websocket)
+    connection_encodings[websocket] = encoding
     
     try:
         while True:
-            # Keep connection alive, handle any incoming messages
-            data = await websocket.receive_text()
+            # Keep connection alive, handle any incoming messages (text or binary)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
             # Could handle client messages here if needed (e.g., ping/pong)
     except WebSocketDisconnect:
         pass
     finally:
         # Remove from connections
+        connection_encodings.pop(websocket, None)
         if table_id in table_connections:
             table_connections[table_id].discard(websocket)
             if not table_connections[table_id]:
@@ -372,9 +522,10 @@ async def websocket_tenant_endpoint(websocket: WebSocket, tenant_id: int):
     client_host = websocket.client.host if websocket.client else "unknown"
     token = _get_ws_token(websocket)
     logger.info(f"WebSocket connection attempt: /ws/tenant/{tenant_id} from {client_host} (token present: {bool(token)})")
+    encoding, subprotocol = _select_encoding(websocket)
 
     try:
-        await websocket.accept()
+        await websocket.accept(subprotocol=subprotocol)
     except Exception as e:
         logger.error(f"Failed to accept WebSocket connection for /ws/tenant/{tenant_id}: {e}")
         return
@@ -408,13 +559,17 @@ async def websocket_tenant_endpoint(websocket: WebSocket, tenant_id: int):
     if tenant_id not in tenant_connections:
         tenant_connections[tenant_id] = set()
     tenant_connections[tenant_id].add(websocket)
+    connection_encodings[websocket] = encoding
 
     try:
         while True:
-            data = await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
         pass
     finally:
+        connection_encodings.pop(websocket, None)
         if tenant_id in tenant_connections:
             tenant_connections[tenant_id].discard(websocket)
             if not tenant_connections[tenant_id]: